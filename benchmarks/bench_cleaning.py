@@ -0,0 +1,86 @@
+"""Cleaning benchmark: vectorized get_clean_data vs the original row-wise engine.
+
+    python benchmarks/bench_cleaning.py --sizes 1000,100000,10000000
+
+First checks that both engines produce identical frames (through the
+full get_clean_data CSV path) on a table of edge cases and on every
+generated input, then reports cleaning rows/sec on an already-loaded frame.
+"""
+import argparse
+import contextlib
+import io
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+sys.path.append(str(Path(__file__).parent))
+from data_cleaning import clean_frame, get_clean_data
+from synthetic import make_raw
+
+EDGE_CASES = pd.DataFrame({
+    'name': ['A', None, 'C', 'D', 'E', 'F', 'G', 'H', 'I', 'J', 'K', 'L', 'M', 'N'],
+    'price': ['US$1,299.00', '$5', ' 19.99 ', None, '', 'abc', 'inf', '-3', '1e2',
+              '1_000', 'US$20', '$50.00', 'nan', '.5'],
+    'rating': ['4.5', None, 'x', '5', '0', '4.9', '3', '', '4.5', '1', '4.5', '5', '2', '4.6'],
+    'reviews': ['1,234 reviews', None, '', '0 reviews', 'no reviews', '5', '²', '٣ reviews',
+                '12 (34)', '99999999999999999999', '7 reviews', ' 8 ', 'reviews', '1'],
+    'category': ['Tops'] * 14,
+    'url': [f'https://www.banggood.com/x-p-{i}.html' for i in range(14)],
+})
+
+
+def clean(csv_path, engine):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return get_clean_data(csv_path, engine=engine)
+
+
+def check_equivalence(csv_path):
+    expected = clean(csv_path, 'rowwise')
+    actual = clean(csv_path, 'vectorized')
+    pd.testing.assert_frame_equal(actual, expected)
+
+
+def bench(raw, engine):
+    df = raw.copy()
+    start = time.perf_counter()
+    clean_frame(df, engine)
+    return len(raw), time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='1000,100000,10000000')
+    parser.add_argument('--skip-rowwise-above', type=int, default=None,
+                        help="don't time the row-wise engine above this many rows")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        edge_path = Path(tmp) / "edge.csv"
+        EDGE_CASES.to_csv(edge_path, index=False)
+        check_equivalence(edge_path)
+        print("✅ Edge cases: engines agree.")
+
+        for rows in (int(x) for x in args.sizes.split(',')):
+            csv_path = Path(tmp) / f"raw_{rows}.csv"
+            make_raw(rows).to_csv(csv_path, index=False)
+            raw = pd.read_csv(csv_path, encoding='utf-8')
+
+            line = f"   {rows:>10,} rows |"
+            for engine in ('rowwise', 'vectorized'):
+                if engine == 'rowwise' and args.skip_rowwise_above and rows > args.skip_rowwise_above:
+                    line += f" {engine}: skipped |"
+                    continue
+                n, elapsed = bench(raw, engine)
+                line += f" {engine}: {n / elapsed:>12,.0f} rows/sec |"
+            print(line)
+
+            if not args.skip_rowwise_above or rows <= args.skip_rowwise_above:
+                check_equivalence(csv_path)
+
+
+if __name__ == '__main__':
+    main()
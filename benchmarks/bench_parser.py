@@ -0,0 +1,136 @@
+"""Listing-page parse benchmark: lxml listing_parser vs the old BeautifulSoup loop.
+
+    python benchmarks/bench_parser.py --corpus data/html_corpus --repeat 3
+
+The corpus is a directory of saved listing pages (*.html or *.html.gz).
+Reports pages/sec and peak tracemalloc allocation per page for both parsers
+and checks they extract identical records.
+"""
+import argparse
+import gzip
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+from listing_parser import parse_listing
+
+
+def extract_products_bs4(page_source, category_name):
+    """The scraper's original BeautifulSoup card loop, kept as the baseline"""
+    soup = BeautifulSoup(page_source, 'lxml')
+    product_cards = soup.find_all('div', class_='p-wrap')
+
+    products = []
+    for card in product_cards:
+        item = {}
+        try:
+            title_tag = card.find('a', class_='title')
+            item['name'] = title_tag.text.strip() if title_tag else None
+
+            price_tag = card.find('span', class_='price')
+            item['price'] = price_tag.text.strip() if price_tag else None
+
+            item['url'] = title_tag['href'] if title_tag else None
+
+            try: item['rating'] = card.find('span', class_='review-text').text.strip()
+            except: item['rating'] = "0"
+
+            try: item['reviews'] = card.find('a', class_='review').text.strip()
+            except: item['reviews'] = "0 reviews"
+
+            item['category'] = category_name
+
+            if item['name'] and item['price']:
+                products.append(item)
+        except:
+            continue
+    return products
+
+
+def extract_products_lxml(page_source, category_name):
+    return [record.as_dict() for record in parse_listing(page_source, category_name).records]
+
+
+PARSERS = {
+    'bs4': extract_products_bs4,
+    'lxml': extract_products_lxml,
+}
+
+
+def load_corpus(corpus_dir):
+    pages = []
+    for path in sorted(Path(corpus_dir).iterdir()):
+        if path.name.endswith('.html.gz'):
+            pages.append(gzip.decompress(path.read_bytes()).decode('utf-8', errors='replace'))
+        elif path.suffix == '.html':
+            pages.append(path.read_text(encoding='utf-8', errors='replace'))
+    return pages
+
+
+def bench_parser(parse, pages, repeat=3):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for page in pages:
+            parse(page, "Bench")
+    elapsed = time.perf_counter() - start
+
+    # Peak bytes allocated while parsing each page, averaged over the corpus
+    peaks = []
+    tracemalloc.start()
+    for page in pages:
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        parse(page, "Bench")
+        peaks.append(tracemalloc.get_traced_memory()[1] - base)
+    tracemalloc.stop()
+
+    return {
+        'pages_per_sec': repeat * len(pages) / elapsed,
+        'alloc_kb_per_page': sum(peaks) / len(peaks) / 1024,
+    }
+
+
+def check_equivalence(pages):
+    mismatches = 0
+    for page in pages:
+        if extract_products_bs4(page, "Bench") != extract_products_lxml(page, "Bench"):
+            mismatches += 1
+    return mismatches
+
+
+def run(pages, repeat=3):
+    results = {name: bench_parser(parse, pages, repeat) for name, parse in PARSERS.items()}
+    results['mismatched_pages'] = check_equivalence(pages)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--corpus', default=str(Path(__file__).parent.parent / "data" / "html_corpus"))
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    pages = load_corpus(args.corpus) if Path(args.corpus).is_dir() else []
+    if not pages:
+        print(f"❌ No saved pages found in {args.corpus}")
+        sys.exit(1)
+
+    print(f"📊 Parsing {len(pages)} pages x {args.repeat}...")
+    results = run(pages, args.repeat)
+    for name in PARSERS:
+        r = results[name]
+        print(f"   {name:5s} {r['pages_per_sec']:8.1f} pages/sec | {r['alloc_kb_per_page']:8.1f} KB peak alloc/page")
+    print(f"   speedup: {results['lxml']['pages_per_sec'] / results['bs4']['pages_per_sec']:.1f}x")
+
+    if results['mismatched_pages']:
+        print(f"⚠️ {results['mismatched_pages']} page(s) parsed differently!")
+    else:
+        print("✅ Both parsers extracted identical records.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""One-pass sketch statistics vs exact pandas: speed and rank error.
+
+    python benchmarks/bench_sketches.py --rows 1000000 --chunksize 100000
+
+The exact path materializes the whole frame; the sketch path sees it one
+chunk at a time (sketches.StatsAccumulator). Reports rows/sec for both
+and the worst observed rank error of the box-plot quartiles. Small inputs
+(below the sketch size per category) must match exactly.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+sys.path.append(str(Path(__file__).parent))
+from bench_cleaning import make_raw
+from data_cleaning import clean_frame
+from queries import FrameQueries
+from rollups import compute_rollups, rollups_from_stats
+from sketches import StatsAccumulator
+
+
+def check_exact(rows=3_000):
+    df = clean_frame(make_raw(rows))
+    sketched = rollups_from_stats(StatsAccumulator().update(df))
+    exact = compute_rollups(FrameQueries(df))
+    for name in ('category_stats', 'price_box', 'tier_counts', 'top_reviewed'):
+        pd.testing.assert_frame_equal(sketched[name], exact[name], check_dtype=False)
+
+
+def rank_error(df, box):
+    worst = 0.0
+    for row in box.itertuples(index=False):
+        prices = np.sort(df.loc[df['category'] == row.category, 'price'].dropna().to_numpy())
+        for name, q in (('q1', 0.25), ('median', 0.5), ('q3', 0.75)):
+            rank = np.searchsorted(prices, getattr(row, name), side='right') / len(prices)
+            worst = max(worst, abs(rank - q))
+    return worst
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--chunksize', type=int, default=100_000)
+    args = parser.parse_args()
+
+    check_exact()
+    print("✅ Sketches match exact rollups on small input")
+
+    df = clean_frame(make_raw(args.rows))
+
+    start = time.perf_counter()
+    compute_rollups(FrameQueries(df))
+    exact_rate = len(df) / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    accumulator = StatsAccumulator()
+    for offset in range(0, len(df), args.chunksize):
+        accumulator.update(df.iloc[offset:offset + args.chunksize])
+    box = rollups_from_stats(accumulator)['price_box']
+    sketch_rate = len(df) / (time.perf_counter() - start)
+
+    print(f"📊 {len(df):,} rows")
+    print(f"   exact (in memory)   {exact_rate:>14,.0f} rows/sec")
+    print(f"   sketch (one pass)   {sketch_rate:>14,.0f} rows/sec")
+    print(f"   max quartile rank error: {rank_error(df, box):.4%}")
+
+
+if __name__ == '__main__':
+    main()
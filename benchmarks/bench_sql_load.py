@@ -0,0 +1,90 @@
+"""SQL load benchmark: rows/sec per bulk_load strategy and batch size.
+
+    python benchmarks/bench_sql_load.py --rows 200000
+    python benchmarks/bench_sql_load.py --url "mssql+pyodbc://..." --stage-dir //server/share
+
+Uses a throwaway SQLite file unless --url points at a real database.
+Plain DataFrame.to_sql is included as the baseline.
+"""
+import argparse
+import contextlib
+import io
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import text
+
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+sys.path.append(str(Path(__file__).parent))
+from bench_cleaning import make_raw
+from bulk_load import STRATEGIES, bulk_insert
+from db import create_db_engine
+from data_cleaning import clean_frame
+from data_loader import add_product_keys
+
+BENCH_TABLE = 'bench_bulk_load'
+
+
+def make_clean(rows):
+    df = clean_frame(make_raw(rows))
+    return add_product_keys(df, dedupe=False)
+
+
+def _reset_table(engine, df):
+    with engine.begin() as conn:
+        df.head(0).to_sql(BENCH_TABLE, con=conn, if_exists='replace', index=False)
+
+
+def bench_strategy(engine, df, strategy, batch_size, stage_dir=None):
+    _reset_table(engine, df)
+    start = time.perf_counter()
+    if strategy == 'to_sql':
+        with engine.begin() as conn:
+            df.to_sql(BENCH_TABLE, con=conn, if_exists='append', index=False)
+    else:
+        kwargs = {'stage_dir': stage_dir} if strategy == 'bulkcopy' else {}
+        bulk_insert(df, BENCH_TABLE, engine, strategy=strategy, batch_size=batch_size, **kwargs)
+    elapsed = time.perf_counter() - start
+
+    with engine.connect() as conn:
+        count = conn.execute(text(f"SELECT COUNT(*) FROM {BENCH_TABLE}")).scalar()
+    assert count == len(df), f"{strategy}: wrote {count} of {len(df)} rows"
+    return len(df) / elapsed
+
+
+def run(engine, rows, batch_sizes, stage_dir=None):
+    df = make_clean(rows)
+    results = {'to_sql': bench_strategy(engine, df, 'to_sql', None)}
+    for strategy in STRATEGIES:
+        for batch_size in batch_sizes:
+            results[f"{strategy}@{batch_size}"] = bench_strategy(engine, df, strategy, batch_size, stage_dir)
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE {BENCH_TABLE}"))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default=None, help="SQLAlchemy URL (default: temporary SQLite file)")
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--batch-sizes', default='1000,10000')
+    parser.add_argument('--stage-dir', default=None, help="bulkcopy staging dir the DB server can read")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.url or f"sqlite:///{Path(tmp) / 'bench.db'}"
+        engine = create_db_engine(url)
+        batch_sizes = [int(x) for x in args.batch_sizes.split(',')]
+
+        print(f"📊 Loading {args.rows:,} rows into {engine.dialect.name}...")
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = run(engine, args.rows, batch_sizes, args.stage_dir)
+        for name, rate in results.items():
+            print(f"   {name:22s} {rate:>12,.0f} rows/sec")
+        engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
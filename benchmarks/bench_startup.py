@@ -0,0 +1,108 @@
+"""CLI startup benchmark: what `main.py <command>` costs before it does any work.
+
+    python benchmarks/bench_startup.py --repeat 5 --budget 0.5
+
+Times `main.py <command> --help` in a fresh interpreter per subcommand
+(interpreter start + main's imports + argument parsing) and reports its
+peak RSS. None of the heavy libraries may be loaded by then. It then
+imports each stage's own modules in isolation. A stage may only pull in
+its own dependencies: load must not import selenium or matplotlib, clean
+must not import the scraper, and so on. Exits 1 on any violation or if
+startup exceeds --budget seconds.
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+SRC_DIR = Path(__file__).parent.parent / "src"
+COMMANDS = ('scrape', 'clean', 'analyze', 'history', 'load', 'run')
+HEAVY = ('pandas', 'numpy', 'pyarrow', 'sqlalchemy', 'pyodbc', 'matplotlib',
+         'selenium', 'undetected_chromedriver', 'bs4', 'lxml')
+
+# stage -> (modules its stage functions import, libraries it must not load)
+STAGE_MODULES = {
+    'scrape': (['web_scraper'], ['matplotlib', 'sqlalchemy', 'pyodbc', 'pyarrow', 'pandas']),
+    'clean': (['data_cleaning', 'storage'], ['selenium', 'undetected_chromedriver', 'bs4', 'matplotlib', 'sqlalchemy']),
+    'analyze': (['rollups', 'analysis'], ['selenium', 'undetected_chromedriver', 'bs4']),
+    'history': (['price_history'], ['selenium', 'undetected_chromedriver', 'bs4', 'matplotlib', 'sqlalchemy']),
+    'load': (['data_loader', 'rollups'], ['selenium', 'undetected_chromedriver', 'bs4', 'matplotlib']),
+}
+
+# Runs in the child; prints one JSON line after whatever the code printed
+PROBE = """
+import json, resource, runpy, sys, time
+sys.path.insert(0, {src!r})
+start = time.perf_counter()
+try:
+{body}
+except SystemExit:
+    pass
+seconds = time.perf_counter() - start
+print("@@" + json.dumps({{'seconds': seconds, 'modules': sorted({{m.split('.')[0] for m in sys.modules}}),
+                          'rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}}))
+"""
+
+
+def probe(body):
+    code = PROBE.format(src=str(SRC_DIR), body="\n".join("    " + line for line in body.splitlines()))
+    start = time.perf_counter()
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    wall = time.perf_counter() - start
+    result = json.loads(out[out.rindex("@@") + 2:])
+    result['wall'] = wall
+    return result
+
+
+def bench_command(command, repeat):
+    body = f"sys.argv = ['main.py', {command!r}, '--help']\nrunpy.run_path({str(SRC_DIR / 'main.py')!r}, run_name='__main__')"
+    runs = [probe(body) for _ in range(repeat)]
+    loaded = [m for m in HEAVY if m in runs[0]['modules']]
+    return statistics.median(r['wall'] for r in runs), runs[0]['rss_mb'], loaded
+
+
+def bench_stage(modules):
+    result = probe("\n".join(f"import {m}" for m in modules))
+    return result['seconds'], result['rss_mb'], set(result['modules'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--budget', type=float, default=0.5, help="max median startup seconds per command")
+    args = parser.parse_args()
+    problems = []
+
+    print(f"🚀 main.py <command> --help (median of {args.repeat})")
+    for command in COMMANDS:
+        seconds, rss, loaded = bench_command(command, args.repeat)
+        flag = "✅"
+        if loaded:
+            problems.append(f"{command}: startup imports {', '.join(loaded)}")
+            flag = "❌"
+        elif seconds > args.budget:
+            problems.append(f"{command}: startup {seconds:.2f}s over the {args.budget:.2f}s budget")
+            flag = "⚠️"
+        print(f"   {flag} {command:8s} {seconds * 1000:8.0f} ms {rss:8.1f} MB RSS")
+
+    print("📦 Stage imports")
+    for stage, (modules, forbidden) in STAGE_MODULES.items():
+        seconds, rss, loaded = bench_stage(modules)
+        leaked = [m for m in forbidden if m in loaded]
+        heavy = [m for m in HEAVY if m in loaded]
+        if leaked:
+            problems.append(f"{stage}: imports {', '.join(leaked)}")
+        print(f"   {'❌' if leaked else '✅'} {stage:8s} {seconds * 1000:8.0f} ms {rss:8.1f} MB RSS  "
+              f"({', '.join(heavy) or 'no heavy libraries'})")
+
+    if problems:
+        print("\n".join(f"❌ {p}" for p in problems))
+        sys.exit(1)
+    print("✅ Every command starts without heavy imports.")
+
+
+if __name__ == '__main__':
+    main()
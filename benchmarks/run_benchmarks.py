@@ -0,0 +1,214 @@
+"""End-to-end benchmark suite on synthetic data, with saved baselines.
+
+    python benchmarks/run_benchmarks.py --rows 10000,100000 --save   # record a baseline
+    python benchmarks/run_benchmarks.py --rows 10000,100000          # compare against it
+
+Cases, each on data from synthetic.py:
+    parse   listing_parser.parse_listing over generated listing pages
+    clean   data_cleaning.get_clean_data on a raw CSV
+    rollup  rollups.compute_rollups over the cleaned frame
+    plots   rendering the five plots from those rollups (one process)
+    load    data_loader.load_data_to_sql, mode='replace', into SQLite
+    upsert  mode='incremental' into a loaded SQLite table, 10% of prices changed
+
+Each case reports the best of --repeat runs. Results are appended to
+data/benchmarks/history.jsonl and compared to the baseline for the same
+row count; a case slower than the baseline by more than --tolerance is
+flagged and the exit status is 1. Baselines are per machine, so record
+one before comparing. Pipeline metrics are off while benchmarking.
+"""
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+os.environ.setdefault('BANGGOOD_METRICS', '0')
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+sys.path.append(str(Path(__file__).parent))
+from analysis import PLOTS, _render_plots, plot_data_from_rollups
+from data_cleaning import get_clean_data
+from data_loader import load_data_to_sql
+from db import create_db_engine
+from listing_parser import parse_listing
+from queries import FrameQueries
+from rollups import compute_rollups
+from synthetic import CATEGORIES, make_listing_page, write_raw_csv
+
+BENCH_DIR = Path(__file__).parent.parent / "data" / "benchmarks"
+BASELINE_FILE = BENCH_DIR / "baseline.json"
+HISTORY_FILE = BENCH_DIR / "history.jsonl"
+TOLERANCE = 0.20
+
+
+def _quiet(fn, *args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fn(*args, **kwargs)
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def bench_parse(ctx):
+    return len(ctx['pages']), _timed(lambda: [parse_listing(page, "Bench") for page in ctx['pages']])
+
+
+def bench_clean(ctx):
+    return ctx['raw_rows'], _timed(lambda: _quiet(get_clean_data, ctx['csv']))
+
+
+def bench_rollup(ctx):
+    return len(ctx['df']), _timed(lambda: compute_rollups(FrameQueries(ctx['df'])))
+
+
+def bench_plots(ctx):
+    data = plot_data_from_rollups(ctx['rollups'])
+    return len(PLOTS), _timed(lambda: _quiet(_render_plots, data, ctx['plot_dir'], workers=1, force=True))
+
+
+def _sqlite_engine(ctx, name):
+    path = ctx['tmp'] / f"{name}.db"
+    path.unlink(missing_ok=True)
+    return create_db_engine(f"sqlite:///{path}")
+
+
+def bench_load(ctx):
+    engine = _sqlite_engine(ctx, 'load')
+    try:
+        return len(ctx['df']), _timed(lambda: _quiet(load_data_to_sql, ctx['df'], 'replace', engine))
+    finally:
+        engine.dispose()
+
+
+def bench_upsert(ctx):
+    engine = _sqlite_engine(ctx, 'upsert')
+    try:
+        _quiet(load_data_to_sql, ctx['df'], 'incremental', engine)
+        changed = ctx['df'].copy()
+        changed.iloc[::10, changed.columns.get_loc('price')] *= 1.1
+        return len(changed), _timed(lambda: _quiet(load_data_to_sql, changed, 'incremental', engine))
+    finally:
+        engine.dispose()
+
+
+# name -> (function, unit)
+CASES = {
+    'parse': (bench_parse, 'pages/sec'),
+    'clean': (bench_clean, 'rows/sec'),
+    'rollup': (bench_rollup, 'rows/sec'),
+    'plots': (bench_plots, 'plots/sec'),
+    'load': (bench_load, 'rows/sec'),
+    'upsert': (bench_upsert, 'rows/sec'),
+}
+
+
+def prepare(tmp, rows, pages):
+    """Generates this size's inputs once; every case reads them"""
+    csv = write_raw_csv(tmp / f"raw_{rows}.csv", rows)
+    df = _quiet(get_clean_data, csv)
+    return {
+        'tmp': tmp,
+        'csv': csv,
+        'raw_rows': rows,
+        'df': df,
+        'rollups': compute_rollups(FrameQueries(df)),
+        'pages': [make_listing_page(CATEGORIES[p % len(CATEGORIES)], p) for p in range(1, pages + 1)],
+        'plot_dir': tmp / "plots",
+    }
+
+
+def run(rows, pages, cases, repeat):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        ctx = prepare(Path(tmp), rows, pages)
+        ctx['plot_dir'].mkdir()
+        for name in cases:
+            fn, unit = CASES[name]
+            best = min((fn(ctx) for _ in range(repeat)), key=lambda r: r[1])
+            units, seconds = best
+            results[name] = {'rate': units / seconds, 'unit': unit, 'seconds': seconds}
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Prints one line per case; returns the names of regressed cases"""
+    regressed = []
+    for name, r in results.items():
+        line = f"   {name:8s} {r['rate']:>14,.1f} {r['unit']:10s}"
+        base = (baseline or {}).get(name)
+        if base:
+            change = r['rate'] / base['rate'] - 1
+            if change < -tolerance:
+                regressed.append(name)
+                line += f" ⚠️ REGRESSION {change:+.1%} vs {base['rate']:,.1f}"
+            elif change > tolerance:
+                line += f" 🚀 {change:+.1%}"
+            else:
+                line += f" ✅ {change:+.1%}"
+        print(line)
+    return regressed
+
+
+def _load_baselines(path):
+    return json.loads(Path(path).read_text()) if Path(path).exists() else {}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', default='10000,100000', help="comma-separated raw row counts (up to 10M)")
+    parser.add_argument('--pages', type=int, default=50, help="listing pages for the parse case")
+    parser.add_argument('--cases', default=",".join(CASES))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--baseline', default=str(BASELINE_FILE))
+    parser.add_argument('--save', action='store_true', help="store this run as the baseline")
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE,
+                        help="allowed slowdown before a case is flagged (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    cases = [c for c in args.cases.split(',') if c]
+    unknown = set(cases) - set(CASES)
+    if unknown:
+        parser.error(f"unknown cases: {sorted(unknown)}")
+
+    baselines = _load_baselines(args.baseline)
+    run_info = {
+        'created_at': datetime.datetime.now().isoformat(timespec='seconds'),
+        'host': platform.node(), 'python': platform.python_version(), 'cpus': os.cpu_count(),
+    }
+    regressed = []
+    BENCH_DIR.mkdir(parents=True, exist_ok=True)
+
+    for rows in (int(x) for x in args.rows.split(',')):
+        print(f"📊 {rows:,} rows, {args.pages} pages (best of {args.repeat})")
+        results = run(rows, args.pages, cases, args.repeat)
+        key = str(rows)
+        regressed += [f"{name}@{rows}" for name in compare(results, baselines.get(key), args.tolerance)]
+
+        with open(HISTORY_FILE, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({**run_info, 'rows': rows, 'pages': args.pages, 'results': results}) + "\n")
+        if args.save:
+            baselines[key] = {**baselines.get(key, {}), **results}
+
+    if args.save:
+        Path(args.baseline).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.baseline).write_text(json.dumps(baselines, indent=1))
+        print(f"💾 Baseline saved: {args.baseline}")
+    elif not baselines:
+        print(f"ℹ️ No baseline at {args.baseline} yet; run with --save to record one.")
+
+    if regressed:
+        print(f"❌ Regressed: {', '.join(regressed)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
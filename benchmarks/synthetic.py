@@ -0,0 +1,180 @@
+"""Synthetic scrape inputs at any scale: raw CSVs and listing pages.
+
+    python benchmarks/synthetic.py csv --rows 10000000 --out data/synthetic_10m.csv
+    python benchmarks/synthetic.py html --pages 200 --out data/html_corpus
+
+Raw CSVs have the scraper's name,price,rating,reviews,category,url shape
+and the messy values real pages show: 'US$1,299.00', '$5', ' 19.99 ',
+'1,234 reviews', 'no reviews', blanks, names with commas and quotes,
+tracking query strings and re-listed (duplicate) product URLs. They are
+written in chunks, so 10M rows never sit in memory at once. Listing pages
+hold `div.p-wrap` cards in the markup listing_parser reads, with a few
+malformed cards (no link, no price) mixed in.
+"""
+import argparse
+import gzip
+import zlib
+from html import escape
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+CATEGORIES = [
+    'Tops', 'Hoodies', 'Jewelry', 'Dresses', 'RC Drones', 'Flashlights', 'Phone Cases',
+    'Smart Watches', 'Earphones', 'Power Tools', 'Camping Gear', '3D Printers',
+]
+ADJECTIVES = ['Mini', 'Portable', 'Wireless', 'Waterproof', 'Vintage', 'LED', 'Smart', 'Foldable']
+COLORS = ['Red', 'Black', 'White', 'Blue', 'Green', 'Pink']
+TRACKING = ['?rmmds=category', '?rmmds=search&cur_warehouse=CN', '?utm_source=nav&p=NS1', '#reviews']
+
+RAW_CHUNK_ROWS = 1_000_000
+CARDS_PER_PAGE = 60
+
+
+def _price_text(rng, prices):
+    """'US$1,299.00' / '$5' / ' 19.99 ' spellings, plus blanks and missing"""
+    style = rng.random(len(prices))
+    out = np.empty(len(prices), dtype=object)
+    for i, (price, s) in enumerate(zip(prices.tolist(), style.tolist())):
+        if s < 0.01:
+            out[i] = None
+        elif s < 0.015:
+            out[i] = ''
+        elif s < 0.75:
+            out[i] = f"US${price:,.2f}"
+        elif s < 0.9:
+            out[i] = f"${price:g}"
+        else:
+            out[i] = f" {price:.2f} "
+    return out
+
+
+def _review_text(rng, reviews):
+    style = rng.random(len(reviews))
+    out = np.empty(len(reviews), dtype=object)
+    for i, (count, s) in enumerate(zip(reviews.tolist(), style.tolist())):
+        if s < 0.03:
+            out[i] = None
+        elif s < 0.04:
+            out[i] = 'no reviews'
+        elif s < 0.06:
+            out[i] = str(count)
+        else:
+            out[i] = f"{count:,} reviews"
+    return out
+
+
+def make_raw(rows, seed=0, start=0):
+    """`rows` messy raw scrape rows in the scraper's CSV shape. `start`
+    offsets the product ids, so consecutive chunks don't collide."""
+    rng = np.random.default_rng([seed, start])
+    ids = np.arange(start, start + rows) + 1_000_000
+    relisted = rng.random(rows) < 0.02  # same product seen again on another page
+    if start + rows > 1:
+        ids[relisted] = rng.integers(1_000_000, 1_000_000 + start + rows, relisted.sum())
+
+    prices = rng.lognormal(3.2, 1.0, rows).round(2)
+    reviews = rng.geometric(0.01, rows) - 1
+    ratings = rng.choice(['0', '3.5', '4.0', '4.5', '4.6', '4.8', '5.0', ''], rows,
+                         p=[0.15, 0.05, 0.1, 0.25, 0.15, 0.15, 0.1, 0.05])
+
+    # Name and URL follow from the id, so a re-listed product keeps its URL
+    adjective = np.array(ADJECTIVES)[ids % len(ADJECTIVES)].tolist()
+    color = np.array(COLORS)[(ids // len(ADJECTIVES)) % len(COLORS)].tolist()
+    ids = ids.tolist()  # Python scalars: much faster to format than numpy ones
+    names = [f'{a} Product {i}, {c} "XL"' if i % 7 == 0 else f"{a} Product {i} {c}"
+             for a, i, c in zip(adjective, ids, color)]
+    slugs = [f"{a}-Product-{i}-{c}" for a, i, c in zip(adjective, ids, color)]
+
+    tracking = rng.choice(['', *TRACKING], rows, p=[0.6, 0.1, 0.1, 0.1, 0.1])
+    urls = [f"https://www.banggood.com/{slug}-p-{i}.html{t}" for slug, i, t in zip(slugs, ids, tracking.tolist())]
+
+    return pd.DataFrame({
+        'name': names,
+        'price': _price_text(rng, prices),
+        'rating': ratings,
+        'reviews': _review_text(rng, reviews),
+        'category': rng.choice(CATEGORIES, rows),
+        'url': urls,
+    })
+
+
+def write_raw_csv(path, rows, seed=0, chunk_rows=RAW_CHUNK_ROWS):
+    """Writes a `rows`-row raw CSV chunk by chunk. Returns the path."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        for start in range(0, rows, chunk_rows):
+            chunk = make_raw(min(chunk_rows, rows - start), seed, start)
+            chunk.to_csv(f, index=False, header=start == 0)
+    return path
+
+
+def _card(record, rng):
+    r = rng.random()
+    title = f'<a class="title" href="{record.url}" title="{record.name}">{record.name}</a>'
+    if r < 0.01:
+        title = f'<a class="title">{record.name}</a>'  # no link
+    price = f'<span class="price wh_cn">{record.price}</span>' if record.price and r >= 0.02 else ''
+    rating = f'<span class="review-text">{record.rating}</span>' if record.rating else ''
+    reviews = f'<a class="review" href="{record.url}#reviews">{record.reviews}</a>' if record.reviews else ''
+    return (f'<li><div class="p-wrap exclusive">'
+            f'<span class="img notranslate"><img data-src="//imgaz.staticbg.com/{zlib.crc32(record.url.encode()) & 0xffff}.jpg"></span>'
+            f'{title}<div class="price-box">{price}<span class="price-old">US$99.99</span></div>'
+            f'<div class="review-box">{rating}{reviews}</div>'
+            f'</div></li>')
+
+
+def make_listing_page(category, page, cards=CARDS_PER_PAGE, seed=0):
+    """One listing page of `cards` product cards, HTML-escaped like the site"""
+    raw = make_raw(cards, seed, start=page * cards).fillna('')
+    raw = raw.map(escape)
+    rng = np.random.default_rng([seed, page, 1])
+    body = "\n".join(_card(record, rng) for record in raw.itertuples(index=False))
+    return (f'<!DOCTYPE html><html><head><title>{escape(category)} - Banggood</title>'
+            f'<script>window.__INIT__ = {{"page": {page}}};</script></head><body>'
+            f'<div class="header"><a class="title" href="/">Banggood</a></div>'
+            f'<ul class="goodlist cf">\n{body}\n</ul>'
+            f'<div class="page-box"><a href="?page={page + 1}">Next</a></div></body></html>')
+
+
+def write_html_corpus(directory, pages, cards=CARDS_PER_PAGE, seed=0, compress=False):
+    """Writes `pages` listing pages (page-00001.html[.gz], ...) for
+    bench_parser. Returns the directory."""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    for page in range(1, pages + 1):
+        html = make_listing_page(CATEGORIES[page % len(CATEGORIES)], page, cards, seed).encode('utf-8')
+        if compress:
+            (directory / f"page-{page:05d}.html.gz").write_bytes(gzip.compress(html))
+        else:
+            (directory / f"page-{page:05d}.html").write_bytes(html)
+    return directory
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest='kind', required=True)
+    csv = sub.add_parser('csv', help="raw scrape CSV")
+    csv.add_argument('--rows', type=int, default=100_000)
+    csv.add_argument('--out', required=True)
+    pages = sub.add_parser('html', help="directory of listing pages")
+    pages.add_argument('--pages', type=int, default=100)
+    pages.add_argument('--cards', type=int, default=CARDS_PER_PAGE)
+    pages.add_argument('--out', required=True)
+    pages.add_argument('--gzip', action='store_true')
+    for p in (csv, pages):
+        p.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    if args.kind == 'csv':
+        path = write_raw_csv(args.out, args.rows, args.seed)
+        print(f"✅ Wrote {args.rows:,} raw rows to {path}")
+    else:
+        path = write_html_corpus(args.out, args.pages, args.cards, args.seed, args.gzip)
+        print(f"✅ Wrote {args.pages:,} listing pages to {path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,21 @@
+import sys
 import streamlit as st
 import pandas as pd
-from sqlalchemy import create_engine
-from sqlalchemy.engine import URL
 from pathlib import Path
-import plotly.express as px 
+import plotly.express as px
+import plotly.graph_objects as go
+from sqlalchemy import inspect
+
+sys.path.append(str(Path(__file__).parent / "src"))
+import db
+from filter_engine import Filters
+from price_history import PriceHistory
+from queries import DETAIL_COLUMNS, FrameQueries, SqlQueries
+from rollups import RollupQueries, read_rollups, read_rollups_sql, read_version, read_version_sql
+from storage import latest_crawl_date, read_clean_parquet
 
 st.set_page_config(
-    page_title="Banggood Analytics", 
+    page_title="Banggood Analytics",
     page_icon="🛍️",
     layout="wide"
 )
@@ -15,79 +24,145 @@ st.title("Banggood Product Analytics Dashboard")
 
 TABLE_NAME = 'banggood_products'
 CSV_PATH = Path("data") / "banggood_clean_data.csv"
-
-@st.cache_resource
-def get_database_connection():
+# Only the columns the dashboard shows are decoded from Parquet
+DASHBOARD_COLUMNS = DETAIL_COLUMNS
+
+# Query results are cached per (source, data version, query, filter);
+# the TTL only bounds staleness when the version stamp is not refreshed
+CACHE_TTL = 300
+PAGE_SIZE = 50
+SCATTER_POINTS = 5_000
+
+def get_database_engine():
+    """The shared pooled engine (db.get_engine is already process-wide).
+    Each query checks out its own connection, so sessions don't share one
+    and dropped links are replaced; not cached, so an outage at startup
+    is retried on the next load."""
     try:
-        db = st.secrets["database"]
-        connection_url = URL.create(
-            "mssql+pyodbc",
-            username=db["username"],
-            password=db["password"],
-            host=db["server"],
-            database=db["database"],
-            query={"driver": db["driver"]}
-        )
-        return create_engine(connection_url).connect()
-    except:
+        engine = db.get_engine()
+        db.run_with_retry(lambda: engine.connect().close())
+        return engine
+    except Exception:
         return None
 
-@st.cache_data
-def load_data():
-    #  Try SQL
-    conn = get_database_connection()
-    if conn:
+@st.cache_data(max_entries=1)
+def load_offline_data(version):
+    if latest_crawl_date():
+        return read_clean_parquet(columns=DASHBOARD_COLUMNS), "Parquet"
+    if CSV_PATH.exists():
+        return pd.read_csv(CSV_PATH), "CSV"
+    return pd.DataFrame(), None
+
+@st.cache_resource(max_entries=1)
+def get_offline_queries(version):
+    """FrameQueries (and its filter index) are built once per data version"""
+    return FrameQueries(load_offline_data(version)[0])
+
+@st.cache_resource(max_entries=2)
+def get_rollup_queries(source, version):
+    rollups = read_rollups_sql(get_database_engine()) if source == "sql" else read_rollups()
+    return RollupQueries(rollups)
+
+def get_queries(source, version):
+    if source == "sql":
+        return SqlQueries(get_database_engine())
+    return get_offline_queries(version)
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False, max_entries=256)
+def run_query(source, version, name, *args):
+    """Cached call of one query-layer method. The data version is part of
+    the key, so a pipeline run invalidates every cached result. Served from
+    the rollups when they cover the filters, else from live rows."""
+    filters = args[0] if args and isinstance(args[0], Filters) else None
+    if version is not None and name != "page" and RollupQueries.supports(filters):
+        return getattr(get_rollup_queries(source, version), name)(*args)
+    return getattr(get_queries(source, version), name)(*args)
+
+# Price history results are cached per history version (its manifest hash),
+# so each pipeline run that appends a crawl invalidates them
+@st.cache_data(show_spinner=False, max_entries=32)
+def history_trend(history_version, category):
+    return PriceHistory().price_trend(category)
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def history_changes(history_version, category, since):
+    return PriceHistory().price_changes(category, since)
+
+def pick_source():
+    """('sql' | 'offline', data version) when data is reachable, else (None, None).
+    The version is the rollup stamp; None when no rollups were built."""
+    engine = get_database_engine()
+    if engine is not None:
         try:
-            df = pd.read_sql(f"SELECT * FROM {TABLE_NAME}", conn)
-            st.toast("Live SQL Data Loaded", icon="🗄️")
-            return df
-        except:
+            version = read_version_sql(engine)
+            if version is not None or inspect(engine).has_table(TABLE_NAME):
+                st.toast("Live SQL Data Loaded", icon="🗄️")
+                return "sql", version
+        except Exception:
             pass
-    
-    if CSV_PATH.exists():
-        st.toast("SQL Offline. Using CSV Backup.", icon="⚠️")
-        return pd.read_csv(CSV_PATH)
-    
-    return pd.DataFrame()
 
-df = load_data()
+    version = read_version()
+    if version is None and load_offline_data(None)[0].empty:
+        return None, None
+    st.toast("SQL Offline. Using Offline Backup.", icon="⚠️")
+    return "offline", version
+
+source, version = pick_source()
+
+if source is not None:
 
-if not df.empty:
-    
     st.sidebar.header("🔍 Filter Data")
-    categories = ["All"] + sorted(df['category'].unique().tolist())
+    categories = ["All"] + run_query(source, version, "categories")
     cat_filter = st.sidebar.selectbox("Category", categories)
-    
-    # Apply Filter
-    if cat_filter != "All":
-        df_filtered = df[df['category'] == cat_filter]
-    else:
-        df_filtered = df
+
+    def range_slider(label, column, step):
+        lo, hi = run_query(source, version, "bounds", column)
+        if lo >= hi:
+            return None
+        chosen = st.sidebar.slider(label, lo, hi, (lo, hi), step=step)
+        # A full-width range is "no filter", so rows with missing values stay in
+        return None if chosen == (lo, hi) else chosen
+
+    filters = Filters(
+        category=None if cat_filter == "All" else cat_filter,
+        price=range_slider("Price Range ($)", "price", 0.5),
+        rating=range_slider("Rating Range", "rating", 0.1),
+    )
 
     # --- KPI ROW ---
+    kpis = run_query(source, version, "kpis", filters)
     col1, col2, col3, col4 = st.columns(4)
-    col1.metric("📦 Total Stock", f"{len(df_filtered)}")
-    col2.metric("💲 Avg Price", f"${df_filtered['price'].mean():.2f}")
-    col3.metric("⭐ Avg Rating", f"{df_filtered['rating'].mean():.1f}")
-    col4.metric("💬 Total Reviews", f"{df_filtered['reviews'].sum():,}")
-    
+    col1.metric("📦 Total Stock", f"{kpis['count']}")
+    col2.metric("💲 Avg Price", f"${kpis['avg_price'] or 0:.2f}")
+    col3.metric("⭐ Avg Rating", f"{kpis['avg_rating'] or 0:.1f}")
+    col4.metric("💬 Total Reviews", f"{kpis['total_reviews']:,}")
+
     st.divider()
 
     # --- ROW 1: STOCK & PRICE DISTRIBUTION ---
     c1, c2 = st.columns(2)
-    
+
     with c1:
         st.subheader("🔰 Stock Availability (Count per Category)")
         # Analysis 5: Stock availability analysis
-        stock_counts = df_filtered['category'].value_counts().reset_index()
+        stock_counts = run_query(source, version, "category_counts", filters)
         stock_counts.columns = ['Category', 'Count']
         fig_stock = px.pie(stock_counts, values='Count', names='Category', hole=0.4)
         st.plotly_chart(fig_stock, use_container_width=True)
 
     with c2:
         st.subheader("🔰 Price Distribution per Category")
-        # Analysis 1: Price distribution per category
-        fig_box = px.box(df_filtered, x="category", y="price", color="category")
+        # Analysis 1: Price distribution per category (five-number summaries from the query layer)
+        box = run_query(source, version, "price_box", filters)
+        fig_box = go.Figure([
+            go.Box(
+                name=row['category'], x=[row['category']],
+                lowerfence=[row['min']], q1=[row['q1']], median=[row['median']],
+                q3=[row['q3']], upperfence=[row['max']],
+            )
+            for _, row in box.iterrows()
+        ])
+        fig_box.update_layout(xaxis_title="category", yaxis_title="price")
         st.plotly_chart(fig_box, use_container_width=True)
 
     # --- ROW 2: CORRELATION & VIRAL PRODUCTS ---
@@ -97,8 +172,8 @@ if not df.empty:
         st.subheader("🔰 Rating vs. Price Correlation")
         # Analysis 2: Rating vs Price correlation
         fig_scatter = px.scatter(
-            df_filtered, x="price", y="rating", 
-            size="reviews", color="category", 
+            run_query(source, version, "scatter_sample", filters, SCATTER_POINTS), x="price", y="rating",
+            size="reviews", color="category",
             hover_name="name", log_x=True
         )
         st.plotly_chart(fig_scatter, use_container_width=True)
@@ -106,38 +181,70 @@ if not df.empty:
     with c4:
         st.subheader("🔰 Top 10 Reviewed Products")
         # Analysis 3: Top reviewed products
-        top_items = df_filtered.nlargest(10, 'reviews')
+        top_items = run_query(source, version, "top_reviewed", filters, 10)
         fig_bar = px.bar(
-            top_items, y="name", x="reviews", 
+            top_items, y="name", x="reviews",
             orientation='h', color="price",
             hover_data=["category", "price"]
         )
-        fig_bar.update_layout(yaxis={'visible': False, 'showticklabels': False}) 
+        fig_bar.update_layout(yaxis={'visible': False, 'showticklabels': False})
         st.plotly_chart(fig_bar, use_container_width=True)
 
     # --- ROW 3: VALUE ANALYSIS ---
     st.subheader("🔰 Best Value Metric per Category")
-    # Analysis 4: Best value metric (Rating / Price)
-    
-    # 1. Group by category
-    cat_stats = df.groupby('category')[['rating', 'price']].mean().reset_index()
-    # 2. Create Value Metric
-    cat_stats['Value Score'] = (cat_stats['rating'] / cat_stats['price']) * 10
-    
+    # Analysis 4: Best value metric (Rating / Price), averaged per category in the query layer
+    cat_stats = run_query(source, version, "category_value", filters)
+
     fig_value = px.scatter(
-        cat_stats, x="price", y="rating", 
-        size="Value Score", color="category", 
-        text="category", 
+        cat_stats, x="price", y="rating",
+        size="Value Score", color="category",
+        text="category",
         title="Category Sweet Spot: High Rating + Low Price = Best Value",
         labels={"price": "Average Price ($)", "rating": "Average Rating (0-5)"}
     )
     fig_value.update_traces(textposition='top center')
     st.plotly_chart(fig_value, use_container_width=True)
 
+    # --- ROW 4: PRICE HISTORY ---
+    history = PriceHistory()
+    if history.dates:
+        st.subheader("🔰 Price Trends Across Crawls")
+        trend = history_trend(history.version, filters.category)
+        c5, c6 = st.columns(2)
+        with c5:
+            fig_trend = px.line(trend, x="crawl_date", y="avg_price", color="category", markers=True,
+                                labels={"crawl_date": "Crawl", "avg_price": "Average Price ($)"})
+            st.plotly_chart(fig_trend, use_container_width=True)
+        with c6:
+            fig_changes = px.bar(trend, x="crawl_date", y="price_changes", color="category",
+                                 labels={"crawl_date": "Crawl", "price_changes": "Price Changes"})
+            st.plotly_chart(fig_changes, use_container_width=True)
+
+        since = st.selectbox("Price changes since crawl", history.dates[::-1],
+                             index=min(1, len(history.dates) - 1))
+        changes = history_changes(history.version, filters.category, since)
+        st.caption(f"{len(changes):,} price changes since {since}")
+        st.dataframe(changes.drop(columns=['product_key']).head(1000), use_container_width=True)
+
     # --- RAW DATA ---
     with st.expander("📂 View Detailed Data"):
-        st.dataframe(df_filtered)
+        # Keyset pagination: a stack of page-start keys, reset when the filter changes
+        if 'page_keys' not in st.session_state or st.session_state.page_filter != filters:
+            st.session_state.page_filter = filters
+            st.session_state.page_keys = [None]
+        page_keys = st.session_state.page_keys
+
+        rows, next_after = run_query(source, version, "page", filters, page_keys[-1], PAGE_SIZE)
+        st.dataframe(rows)
+
+        prev_col, info_col, next_col = st.columns([1, 4, 1])
+        if prev_col.button("⬅️ Prev", disabled=len(page_keys) == 1):
+            page_keys.pop()
+            st.rerun()
+        info_col.caption(f"Page {len(page_keys)} · {PAGE_SIZE} rows per page")
+        if next_col.button("Next ➡️", disabled=next_after is None):
+            page_keys.append(next_after)
+            st.rerun()
 
 else:
     st.error("No data found. Please run the pipeline first!")
-
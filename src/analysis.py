@@ -1,82 +1,220 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import matplotlib
+matplotlib.use('Agg')  # non-interactive: no GUI state, safe in worker processes
 import matplotlib.pyplot as plt
 import pandas as pd
+from dataclasses import dataclass
 from pathlib import Path
+import metrics
+from queries import FrameQueries
+from rollups import RollupQueries, compute_rollups, read_rollups, rollups_from_stats
+from sketches import StatsAccumulator
 
-def generate_all_plots(df):
-    print("--- 3. STARTING DATA ANALYSIS ---")
-    
+# Columns the plots read; everything else is skipped when loading Parquet
+PLOT_COLUMNS = ['name', 'price', 'rating', 'reviews', 'category', 'price_category']
+
+@dataclass
+class PlotData:
+    """Everything the five plots need, independent of how it was computed.
+    `price_box` is a per-category five-number summary (see queries.BOX_QUANTILES)."""
+    price_box: pd.DataFrame
+    scatter: pd.DataFrame
+    top_reviewed: pd.DataFrame
+    cat_counts: pd.Series
+    tier_counts: pd.Series = None
+
+def plot_data_from_rollups(rollups):
+    stats = rollups['category_stats']
+    queries = RollupQueries(rollups)
+    tiers = queries.tier_counts()
+    return PlotData(
+        price_box=rollups['price_box'],
+        scatter=queries.scatter_sample(),
+        top_reviewed=rollups['top_reviewed'].nlargest(10, 'reviews'),
+        cat_counts=stats.set_index('category')['count'].sort_values(ascending=False),
+        tier_counts=tiers.set_index('price_category')['count'] if not tiers.empty else None,
+    )
+
+def _get_plot_dir():
     plot_dir = Path(__file__).parent.parent / "data" / "plots"
     plot_dir.mkdir(parents=True, exist_ok=True)
-    
-    print(f"   📊 Saving plots to: {plot_dir}")
-
-    # --- Analysis 1: Price Distribution per Category (Box Plot)  ---
-    # Shows the price range (min, max, median) for each category
-    plt.figure(figsize=(12, 6))
-    categories = df['category'].unique()
-    data_to_plot = [df[df['category'] == cat]['price'] for cat in categories]
-    
-    plt.boxplot(data_to_plot, labels=categories)
-    plt.title('Price Distribution by Category')
-    plt.xlabel('Category')
-    plt.ylabel('Price (USD)')
-    plt.xticks(rotation=45)
-    plt.grid(axis='y', linestyle='--', alpha=0.7)
-    plt.tight_layout()
-    plt.savefig(plot_dir / '1_price_distribution.png')
-    print("   ✅ Saved: 1_price_distribution.png")
-
-    # --- Analysis 2: Rating vs. Price Correlation (Scatter Plot) ---
-    plt.figure(figsize=(10, 6))
-    plt.scatter(df['price'], df['rating'], alpha=0.6, color='purple')
-    plt.title('Correlation: Price vs. Rating')
-    plt.xlabel('Price (USD)')
-    plt.ylabel('Rating (0-5)')
-    plt.grid(True, linestyle='--', alpha=0.5)
-    plt.savefig(plot_dir / '2_rating_vs_price.png')
-    print("   ✅ Saved: 2_rating_vs_price.png")
-
-    # --- Analysis 3: Top 10 Most Reviewed Products (Bar Chart) ---
-    top_reviewed = df.nlargest(10, 'reviews')
-    plt.figure(figsize=(12, 6))
-    plt.barh(top_reviewed['name'].str[:40] + '...', top_reviewed['reviews'], color='teal')
-    plt.xlabel('Number of Reviews')
-    plt.title('Top 10 Most Reviewed Products')
-    plt.gca().invert_yaxis() 
-    plt.tight_layout()
-    plt.savefig(plot_dir / '3_top_reviews.png')
-    print("   ✅ Saved: 3_top_reviews.png")
-
-    # --- Analysis 4: Product Count per Category (Bar Chart) ---
-    cat_counts = df['category'].value_counts()
-    plt.figure(figsize=(10, 6))
-    cat_counts.plot(kind='bar', color='salmon')
-    plt.title('Inventory Count per Category')
-    plt.xlabel('Category')
-    plt.ylabel('Number of Products')
-    plt.xticks(rotation=45)
-    plt.tight_layout()
-    plt.savefig(plot_dir / '4_category_counts.png')
-    print("   ✅ Saved: 4_category_counts.png")
-
-    # --- Analysis 5: Price Tier Distribution (Pie Chart) ---
-    if 'price_category' in df.columns:
-        tier_counts = df['price_category'].value_counts()
-        plt.figure(figsize=(8, 8))
-        plt.pie(tier_counts, labels=tier_counts.index, autopct='%1.1f%%', colors=['#ff9999','#66b3ff','#99ff99'])
-        plt.title('Product Distribution by Price Tier')
-        plt.savefig(plot_dir / '5_price_tiers.png')
-        print("   ✅ Saved: 5_price_tiers.png")
-    
+    return plot_dir
+
+# --- Analysis 1: Price Distribution per Category (Box Plot)  ---
+# Shows the price range (min, max, median) for each category
+def _plot_price_distribution(box):
+    # Drawn from precomputed summaries, so whiskers span min..max
+    fig, ax = plt.subplots(figsize=(12, 6))
+    stats = [
+        {'label': row.category, 'whislo': row.min, 'q1': row.q1, 'med': row.median, 'q3': row.q3,
+         'whishi': row.max, 'fliers': []}
+        for row in box.itertuples(index=False)
+    ]
+    if stats:
+        ax.bxp(stats)
+    ax.set_title('Price Distribution by Category')
+    ax.set_xlabel('Category')
+    ax.set_ylabel('Price (USD)')
+    ax.tick_params(axis='x', labelrotation=45)
+    ax.grid(axis='y', linestyle='--', alpha=0.7)
+    fig.tight_layout()
+    return fig
+
+# --- Analysis 2: Rating vs. Price Correlation (Scatter Plot) ---
+def _plot_rating_vs_price(scatter):
+    fig, ax = plt.subplots(figsize=(10, 6))
+    ax.scatter(scatter['price'], scatter['rating'], alpha=0.6, color='purple')
+    ax.set_title('Correlation: Price vs. Rating')
+    ax.set_xlabel('Price (USD)')
+    ax.set_ylabel('Rating (0-5)')
+    ax.grid(True, linestyle='--', alpha=0.5)
+    return fig
+
+# --- Analysis 3: Top 10 Most Reviewed Products (Bar Chart) ---
+def _plot_top_reviews(top_reviewed):
+    fig, ax = plt.subplots(figsize=(12, 6))
+    ax.barh(top_reviewed['name'].str[:40] + '...', top_reviewed['reviews'], color='teal')
+    ax.set_xlabel('Number of Reviews')
+    ax.set_title('Top 10 Most Reviewed Products')
+    ax.invert_yaxis()
+    fig.tight_layout()
+    return fig
+
+# --- Analysis 4: Product Count per Category (Bar Chart) ---
+def _plot_category_counts(cat_counts):
+    fig, ax = plt.subplots(figsize=(10, 6))
+    cat_counts.plot(kind='bar', color='salmon', ax=ax)
+    ax.set_title('Inventory Count per Category')
+    ax.set_xlabel('Category')
+    ax.set_ylabel('Number of Products')
+    ax.tick_params(axis='x', labelrotation=45)
+    fig.tight_layout()
+    return fig
+
+# --- Analysis 5: Price Tier Distribution (Pie Chart) ---
+def _plot_price_tiers(tier_counts):
+    fig, ax = plt.subplots(figsize=(8, 8))
+    ax.pie(tier_counts, labels=tier_counts.index, autopct='%1.1f%%', colors=['#ff9999','#66b3ff','#99ff99'])
+    ax.set_title('Product Distribution by Price Tier')
+    return fig
+
+# file name -> (renderer, the PlotData input it reads)
+PLOTS = {
+    '1_price_distribution.png': (_plot_price_distribution, lambda d: d.price_box),
+    '2_rating_vs_price.png': (_plot_rating_vs_price, lambda d: d.scatter[['price', 'rating']]),
+    '3_top_reviews.png': (_plot_top_reviews, lambda d: d.top_reviewed[['name', 'reviews']]),
+    '4_category_counts.png': (_plot_category_counts, lambda d: d.cat_counts),
+    '5_price_tiers.png': (_plot_price_tiers, lambda d: d.tier_counts),
+}
+FINGERPRINT_FILE = '.fingerprints.json'
+PLOT_WORKERS = min(len(PLOTS), os.cpu_count() or 1)  # 1 -> render in-process
+
+def _fingerprint(filename, data):
+    """Hash of the plot's own input, so unchanged plots can be skipped"""
+    digest = hashlib.sha1(filename.encode())
+    digest.update(pd.util.hash_pandas_object(data, index=True).values.tobytes())
+    if isinstance(data, pd.DataFrame):
+        digest.update(",".join(map(str, data.columns)).encode())
+    return digest.hexdigest()
+
+def _render_job(filename, data, plot_dir):
+    """Runs in a worker process: draw one figure, save it, release it"""
+    start = time.perf_counter()
+    render, _ = PLOTS[filename]
+    fig = render(data)
+    try:
+        fig.savefig(Path(plot_dir) / filename)
+    finally:
+        plt.close(fig)
+    return time.perf_counter() - start
+
+def _render_plots(data, plot_dir, workers=PLOT_WORKERS, force=False):
+    """Renders each plot as an independent job on a process pool, skipping
+    plots whose input fingerprint matches the last render. Returns
+    {filename: seconds, or None if skipped}.
+
+    Workers are spawned, not forked: the pipeline calls this from one of
+    its threads while other stages run, and forking a multi-threaded
+    process can copy a lock some other thread holds and deadlock."""
+    fingerprint_path = plot_dir / FINGERPRINT_FILE
+    previous = json.loads(fingerprint_path.read_text()) if fingerprint_path.exists() else {}
+    fingerprints, jobs, timings = {}, {}, {}
+
+    for filename, (_, select) in PLOTS.items():
+        inputs = select(data)
+        if inputs is None:
+            continue
+        fingerprints[filename] = _fingerprint(filename, inputs)
+        if not force and previous.get(filename) == fingerprints[filename] and (plot_dir / filename).exists():
+            timings[filename] = None
+        else:
+            jobs[filename] = inputs
+
+    if len(jobs) > 1 and workers > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs)),
+                                 mp_context=multiprocessing.get_context('spawn')) as pool:
+            futures = {name: pool.submit(_render_job, name, inputs, plot_dir) for name, inputs in jobs.items()}
+            for name, future in futures.items():
+                timings[name] = future.result()
+    else:
+        for name, inputs in jobs.items():
+            timings[name] = _render_job(name, inputs, plot_dir)
+
+    fingerprint_path.write_text(json.dumps({**previous, **fingerprints}, indent=1))
+    for filename in PLOTS:
+        if filename in timings:
+            elapsed = timings[filename]
+            print(f"   ⏭️ Unchanged: {filename}" if elapsed is None else f"   ✅ Saved: {filename} ({elapsed:.2f}s)")
+            metrics.inc('plots_total', status='skipped' if elapsed is None else 'rendered')
+            metrics.observe('plot_render_seconds', elapsed, plot=filename)
+    return timings
+
+def generate_plots_from_rollups(rollups, workers=PLOT_WORKERS, force=False):
+    """Draws the plots straight from materialized rollups (see rollups.py)"""
+    print("--- 3. STARTING DATA ANALYSIS ---")
+
+    plot_dir = _get_plot_dir()
+    print(f"   📊 Saving plots to: {plot_dir} (rollups {rollups.version})")
+
+    _render_plots(plot_data_from_rollups(rollups), plot_dir, workers, force)
+
     print("Analysis Complete!")
 
+def generate_all_plots(df, workers=PLOT_WORKERS, force=False):
+    generate_plots_from_rollups(compute_rollups(FrameQueries(df)), workers, force)
+
+def generate_all_plots_from_chunks(chunks, max_points=5_000, accumulator=None, workers=PLOT_WORKERS, force=False):
+    """Same plots as generate_all_plots, fed by cleaned chunks (see
+    data_cleaning.iter_clean_chunks) in one pass through the mergeable
+    sketches of sketches.StatsAccumulator. Pass an `accumulator` that has
+    already seen the chunks to share the pass with another consumer.
+    Returns the rollups the plots were drawn from."""
+    accumulator = accumulator or StatsAccumulator(max_points=max_points)
+    for chunk in chunks:
+        accumulator.update(chunk)
+
+    rollups = rollups_from_stats(accumulator)
+    generate_plots_from_rollups(rollups, workers, force)
+    return rollups
+
 if __name__ == "__main__":
-  
+
     from data_cleaning import get_clean_data
+    from storage import latest_crawl_date, read_clean_parquet
     test_csv = Path(__file__).parent.parent / "data" / "banggood_raw_data.csv"
-    
-    if test_csv.exists():
+
+    rollups = read_rollups()
+    if rollups is not None:
+        generate_plots_from_rollups(rollups)
+    elif latest_crawl_date():
+        generate_all_plots(read_clean_parquet(columns=PLOT_COLUMNS))
+    elif test_csv.exists():
         df = get_clean_data(test_csv)
         generate_all_plots(df)
     else:
-        print("No data found to test.")
\ No newline at end of file
+        print("No data found to test.")
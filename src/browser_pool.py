@@ -0,0 +1,181 @@
+import queue
+import random
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from urllib.parse import urlparse
+
+
+class RateLimiter:
+    """Global + per-host request pacing shared by all pool workers.
+
+    Each call to wait() reserves the next free slot under a lock and then
+    sleeps outside of it, so workers never block each other while waiting.
+    Async callers sleep on reserve()'s delay themselves.
+    """
+
+    def __init__(self, global_interval=1.0, host_interval=3.0, jitter=1.0):
+        self.global_interval = global_interval
+        self.host_interval = host_interval
+        self.jitter = jitter
+        self._lock = threading.Lock()
+        self._next_global = 0.0
+        self._next_host = {}
+
+    def reserve(self, url):
+        """Books the next free slot for `url`; returns seconds until it"""
+        host = urlparse(url).netloc if url else None
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_global)
+            if host:
+                slot = max(slot, self._next_host.get(host, 0.0))
+            slot += random.uniform(0, self.jitter) if self.jitter else 0.0
+
+            self._next_global = slot + self.global_interval
+            if host:
+                self._next_host[host] = slot + self.host_interval
+
+        return max(slot - time.monotonic(), 0.0)
+
+    def wait(self, url):
+        delay = self.reserve(url)
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+
+@dataclass
+class TaskResult:
+    task: object
+    value: object = None
+    error: Exception = None
+    worker_id: int = None
+
+
+class BrowserPool:
+    """Pool of browser workers pulling tasks from a shared queue.
+
+    A task is any callable taking the worker's driver. Tasks exposing a
+    `url` attribute are paced through the pool's RateLimiter first.
+    Every worker launches its own driver with its own profile directory.
+    A worker whose driver fails to launch exits without taking tasks; the
+    queued tasks fail only once no worker is left to run them. close()
+    lets in-flight tasks finish and fails the ones not yet started.
+    """
+
+    _STOP = object()
+
+    def __init__(self, size, driver_factory, profile_root=None, rate_limiter=None):
+        self.size = max(1, int(size))
+        self.driver_factory = driver_factory
+        self.profile_root = Path(profile_root) if profile_root else None
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self._tasks = queue.Queue()
+        self._results = queue.Queue()
+        self._threads = []
+        self._started = False
+        self._lock = threading.Lock()
+        self._alive = 0
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _profile_dir(self, worker_id):
+        if not self.profile_root:
+            return None
+        path = self.profile_root / f"worker_{worker_id}"
+        path.mkdir(parents=True, exist_ok=True)
+        return str(path)
+
+    def _drain(self, error):
+        """Fails every task still in the queue with `error`"""
+        while True:
+            try:
+                task = self._tasks.get_nowait()
+            except queue.Empty:
+                return
+            if task is not self._STOP:
+                self._results.put(TaskResult(task, error=error))
+
+    def _fail_pending(self):
+        """Fails every queued task once no worker is alive (caller holds _lock)"""
+        if self._alive == 0:
+            self._drain(RuntimeError("browser unavailable"))
+
+    def _worker(self, worker_id):
+        try:
+            driver = self.driver_factory(self._profile_dir(worker_id))
+        except Exception as e:
+            print(f"   ❌ Worker {worker_id} failed to launch browser: {e}")
+            with self._lock:
+                self._alive -= 1
+                self._fail_pending()
+            return
+
+        try:
+            while True:
+                task = self._tasks.get()
+                if task is self._STOP:
+                    break
+                try:
+                    url = getattr(task, 'url', None)
+                    if url:
+                        self.rate_limiter.wait(url)
+                    self._results.put(TaskResult(task, value=task(driver), worker_id=worker_id))
+                except Exception as e:
+                    self._results.put(TaskResult(task, error=e, worker_id=worker_id))
+        finally:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+
+    def start(self):
+        if self._started:
+            return
+        print(f"   ...Starting browser pool with {self.size} worker(s)...")
+        self._alive = self.size
+        for worker_id in range(self.size):
+            t = threading.Thread(target=self._worker, args=(worker_id,), name=f"browser-{worker_id}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        self._started = True
+
+    def run(self, tasks):
+        """Queues all tasks and yields a TaskResult for each as it completes."""
+        tasks = list(tasks)
+        for task in tasks:
+            self._tasks.put(task)
+        with self._lock:
+            self._fail_pending()
+
+        for _ in range(len(tasks)):
+            yield self._results.get()
+
+    def call(self, task):
+        """Runs a single task on whichever worker is free and returns its value."""
+        result = next(self.run([task]))
+        if result.error:
+            raise result.error
+        return result.value
+
+    def close(self):
+        if not self._started:
+            return
+        print("🔌 Closing browser pool...")
+        # Tasks nobody has started yet are dropped, so only in-flight pages finish
+        self._drain(RuntimeError("browser pool closed"))
+        for _ in self._threads:
+            self._tasks.put(self._STOP)
+        for t in self._threads:
+            t.join()
+        # Workers that never launched left their stop markers behind
+        self._tasks = queue.Queue()
+        self._threads = []
+        self._started = False
@@ -0,0 +1,146 @@
+import sqlite3
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+from sqlalchemy import MetaData, Table, insert, text
+from sqlalchemy.engine import Engine
+
+import metrics
+
+# Max bind parameters per statement, per dialect
+PARAM_LIMITS = {
+    'mssql': 2100 - 1,
+    'sqlite': 32766 if sqlite3.sqlite_version_info >= (3, 32) else 999,
+}
+DEFAULT_PARAM_LIMIT = 999
+MSSQL_MAX_VALUES_ROWS = 1000  # SQL Server caps a VALUES list at 1000 rows
+
+STRATEGIES = ('executemany', 'multivalues', 'bulkcopy')
+
+
+def _records(df):
+    """Plain-Python row dicts with NaN -> None for the DB-API driver"""
+    obj = df.astype(object)
+    return obj.where(df.notna(), None).to_dict('records')
+
+
+def _tuples(df):
+    obj = df.astype(object)
+    return list(obj.where(df.notna(), None).itertuples(index=False, name=None))
+
+
+def _placeholder(conn):
+    """Positional DB-API placeholder, or None if the driver uses named params"""
+    return {'qmark': '?', 'format': '%s', 'pyformat': '%s'}.get(conn.dialect.paramstyle)
+
+
+def _insert_prefix(conn, table, columns):
+    quote = conn.dialect.identifier_preparer.quote
+    return f"INSERT INTO {quote(table.name)} ({', '.join(quote(c) for c in columns)}) VALUES "
+
+
+def _batches(df, batch_size, strategy):
+    """Row slices of `df`. Each one is timed as a load_batch span until the
+    caller asks for the next, i.e. over the batch's round trip."""
+    for start in range(0, len(df), batch_size):
+        batch = df.iloc[start:start + batch_size]
+        with metrics.span('load_batch', rows=len(batch), strategy=strategy):
+            yield batch
+
+
+def rows_per_statement(dialect, n_columns):
+    """How many rows fit in one multi-row VALUES insert"""
+    rows = PARAM_LIMITS.get(dialect, DEFAULT_PARAM_LIMIT) // max(n_columns, 1)
+    if dialect == 'mssql':
+        rows = min(rows, MSSQL_MAX_VALUES_ROWS)
+    return max(rows, 1)
+
+
+def _insert_executemany(conn, table, df, batch_size):
+    # With fast_executemany on pyodbc, each batch is one parameter-array round trip
+    mark = _placeholder(conn)
+    if mark is None:
+        for batch in _batches(df, batch_size, 'executemany'):
+            conn.execute(insert(table), _records(batch))
+        return
+
+    sql = _insert_prefix(conn, table, df.columns) + "(" + ", ".join([mark] * len(df.columns)) + ")"
+    for batch in _batches(df, batch_size, 'executemany'):
+        conn.exec_driver_sql(sql, _tuples(batch))
+
+
+def _insert_multivalues(conn, table, df, batch_size):
+    per_stmt = min(rows_per_statement(conn.dialect.name, len(df.columns)), batch_size)
+    mark = _placeholder(conn)
+    if mark is None:
+        for batch in _batches(df, per_stmt, 'multivalues'):
+            conn.execute(insert(table).values(_records(batch)))
+        return
+
+    row = "(" + ", ".join([mark] * len(df.columns)) + ")"
+    prefix = _insert_prefix(conn, table, df.columns)
+    statements = {}  # SQL text per row count; only the last batch differs
+    for batch in _batches(df, per_stmt, 'multivalues'):
+        n = len(batch)
+        if n not in statements:
+            statements[n] = prefix + ", ".join([row] * n)
+        params = tuple(value for record in _tuples(batch) for value in record)
+        conn.exec_driver_sql(statements[n], params)
+
+
+def _insert_bulkcopy(conn, table, df, batch_size, stage_dir=None):
+    """Stages the rows as a CSV file and bulk-loads it.
+
+    On SQL Server this is BULK INSERT, so `stage_dir` must be a path the
+    server can read too. Other dialects have no server-side file load;
+    the staged file is streamed back through executemany in batches.
+    """
+    with tempfile.NamedTemporaryFile('w', suffix='.csv', dir=stage_dir, delete=False,
+                                     newline='', encoding='utf-8') as f:
+        df.to_csv(f, index=False, lineterminator='\n')
+        stage_path = Path(f.name)
+
+    try:
+        if conn.dialect.name == 'mssql':
+            conn.execute(text(f"""
+                BULK INSERT {table.name} FROM '{stage_path}'
+                WITH (FORMAT = 'CSV', FIRSTROW = 2, ROWTERMINATOR = '0x0a',
+                      CODEPAGE = '65001', TABLOCK, BATCHSIZE = {batch_size})
+            """))
+            return
+
+        text_columns = {c: str for c in df.columns if not pd.api.types.is_numeric_dtype(df[c])}
+        with pd.read_csv(stage_path, chunksize=batch_size, dtype=text_columns, encoding='utf-8') as reader:
+            for batch in reader:
+                _insert_executemany(conn, table, batch, batch_size)
+    finally:
+        stage_path.unlink(missing_ok=True)
+
+
+def bulk_insert(df, table_name, conn, strategy='executemany', batch_size=10_000, stage_dir=None):
+    """Inserts `df` into an existing table with the chosen strategy.
+
+    strategy: 'executemany' (batched; fast_executemany on pyodbc),
+    'multivalues' (multi-row VALUES sized to the driver's parameter
+    limit) or 'bulkcopy' (staged file). Pass a Connection to join an
+    open transaction, or an Engine to run in a transaction of its own.
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown bulk load strategy: {strategy}")
+    if df.empty:
+        return 0
+
+    if isinstance(conn, Engine):
+        with conn.begin() as inner:
+            return bulk_insert(df, table_name, inner, strategy, batch_size, stage_dir)
+
+    table = Table(table_name, MetaData(), autoload_with=conn)
+    with metrics.span('load_insert', rows=len(df), strategy=strategy, table=table_name):
+        if strategy == 'executemany':
+            _insert_executemany(conn, table, df, batch_size)
+        elif strategy == 'multivalues':
+            _insert_multivalues(conn, table, df, batch_size)
+        else:
+            _insert_bulkcopy(conn, table, df, batch_size, stage_dir)
+    return len(df)
@@ -0,0 +1,149 @@
+import csv
+import json
+import os
+from pathlib import Path
+
+from listing_parser import CSV_FIELDS
+
+
+def _fsync(f):
+    f.flush()
+    os.fsync(f.fileno())
+
+
+class CheckpointedWriter:
+    """Streams scraped records to disk page by page so a crash loses at most
+    the pages since the last fsync.
+
+    Rows are appended to `<output>.partial`. A page is listed in the
+    `<output>.manifest.jsonl` checkpoint only after its rows have been
+    fsynced, so the manifest never claims work that isn't on disk.
+    finalize() dedupes the partial file into the real output atomically.
+    """
+
+    def __init__(self, output_csv, fsync_every=5):
+        self.output_csv = Path(output_csv)
+        self.partial_path = self.output_csv.with_name(self.output_csv.name + ".partial")
+        self.manifest_path = self.output_csv.with_name(self.output_csv.name + ".manifest.jsonl")
+        self.fsync_every = max(1, fsync_every)
+        self.run_info = None
+        self.completed = set()
+        self._pending = []
+        self._data = None
+        self._manifest = None
+        self._writer = None
+
+    def open(self, resume=False):
+        """Opens the writer; with resume=True, picks up an earlier run's
+        checkpoint and returns its run info (None if there is none)."""
+        self.output_csv.parent.mkdir(parents=True, exist_ok=True)
+
+        if resume and self.manifest_path.exists():
+            self._load_manifest()
+            self._truncate_partial_row()
+        else:
+            for path in (self.partial_path, self.manifest_path):
+                if path.exists():
+                    path.unlink()
+
+        self._data = open(self.partial_path, 'a', newline='', encoding='utf-8')
+        self._manifest = open(self.manifest_path, 'a', encoding='utf-8')
+        self._writer = csv.DictWriter(self._data, fieldnames=CSV_FIELDS, extrasaction='ignore', lineterminator='\n')
+        return self.run_info
+
+    def _load_manifest(self):
+        valid_end = 0
+        with open(self.manifest_path, 'rb+') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    break  # torn final line from a crash
+                valid_end += len(line)
+                if entry.get('type') == 'run':
+                    self.run_info = entry
+                elif entry.get('type') == 'page':
+                    self.completed.add((entry['category_url'], entry['page']))
+            f.truncate(valid_end)
+
+    def _truncate_partial_row(self):
+        """Drops a half-written last row (rows never contain raw newlines)"""
+        if not self.partial_path.exists():
+            return
+        with open(self.partial_path, 'rb+') as f:
+            data = f.read()
+            end = data.rfind(b'\n') + 1
+            if end != len(data):
+                f.truncate(end)
+
+    def start_run(self, categories, num_pages):
+        if self.run_info is None:
+            self.run_info = {'type': 'run', 'categories': list(categories), 'num_pages': num_pages}
+            self._manifest.write(json.dumps(self.run_info) + "\n")
+            _fsync(self._manifest)
+
+    def is_done(self, category_url, page):
+        return (category_url, page) in self.completed
+
+    def write_page(self, category_url, page, records):
+        for record in records:
+            row = record.as_dict()
+            for key, value in row.items():
+                if isinstance(value, str) and ('\n' in value or '\r' in value):
+                    row[key] = ' '.join(value.split())
+            self._writer.writerow(row)
+        self._pending.append((category_url, page, len(records)))
+        if len(self._pending) >= self.fsync_every:
+            self.flush()
+
+    def flush(self):
+        if not self._pending:
+            return
+        _fsync(self._data)
+        for category_url, page, rows in self._pending:
+            self._manifest.write(json.dumps({'type': 'page', 'category_url': category_url, 'page': page, 'rows': rows}) + "\n")
+            self.completed.add((category_url, page))
+        _fsync(self._manifest)
+        self._pending = []
+
+    def close(self):
+        if self._data is None:
+            return
+        self.flush()
+        self._data.close()
+        self._manifest.close()
+        self._data = self._manifest = self._writer = None
+
+    def finalize(self, clear=True):
+        """Writes the deduplicated output atomically. With clear=False the
+        checkpoint is kept so a later resume can retry unfinished pages.
+
+        Pages re-scraped after a crash can repeat rows; the last copy of
+        each (category, url) wins, in first-seen order.
+        """
+        self.close()
+        rows = {}
+        if self.partial_path.exists():
+            with open(self.partial_path, newline='', encoding='utf-8') as f:
+                for row in csv.DictReader(f, fieldnames=CSV_FIELDS):
+                    if None in row or any(row[k] is None for k in CSV_FIELDS):
+                        continue
+                    key = (row['category'], row['url']) if row['url'] else tuple(row.values())
+                    rows[key] = row
+
+        if rows:
+            self._replace_output(rows.values())
+        if clear:
+            for path in (self.partial_path, self.manifest_path):
+                if path.exists():
+                    path.unlink()
+        return len(rows)
+
+    def _replace_output(self, rows):
+        tmp_path = self.output_csv.with_name(self.output_csv.name + ".tmp")
+        with open(tmp_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+            _fsync(f)
+        os.replace(tmp_path, self.output_csv)
@@ -3,6 +3,8 @@ import numpy as np
 import sys
 from pathlib import Path
 
+import metrics
+
 def _clean_price(price_str):
     """Cleans 'US$20.99' -> 20.99"""
     if pd.isna(price_str): return np.nan
@@ -30,49 +32,167 @@ def _clean_reviews(review_str):
     except ValueError:
         return 0
 
-def get_clean_data(raw_csv_path):
-    print("\n--- 2. STARTING DATA CLEANING ---")
-    
-    try:
-        # encoding='utf-8' is safer for web scraped text
-        df = pd.read_csv(raw_csv_path, encoding='utf-8')
-    except FileNotFoundError:
-        print(f"❌ Error: '{raw_csv_path}' not found.")
-        sys.exit()
+def _categorize_price(p):
+    if pd.isna(p): return "Unknown"
+    if p < 20: return "Budget"
+    elif p < 50: return "Standard"
+    else: return "Premium"
+
+# --- Vectorized cleaners ---
+# Same results as the row-wise functions above. Values outside the fast
+# path (non-ASCII text, odd float spellings, huge digit runs) are rare
+# and are handed back to the row-wise function so semantics match exactly.
+
+_PLAIN_FLOAT = r'[+-]?(?:[0-9]+\.?[0-9]*|\.[0-9]+)(?:[eE][+-]?[0-9]+)?'
+
+def _clean_price_vectorized(prices):
+    """Vectorized _clean_price"""
+    if len(prices) == 0 or pd.api.types.is_bool_dtype(prices):
+        return prices.apply(_clean_price)
+    if pd.api.types.is_numeric_dtype(prices):
+        return prices.astype(float)
+
+    result = pd.Series(np.nan, index=prices.index)
+    present = prices.notna()
+    text = (prices[present].astype(str)
+            .str.replace('US$', '', regex=False)
+            .str.replace('$', '', regex=False)
+            .str.replace(',', '', regex=False)
+            .str.strip())
+
+    plain = text.str.fullmatch(_PLAIN_FLOAT).fillna(False).astype(bool)
+    result[plain[plain].index] = text[plain].astype(float)
+
+    # Anything else that float() might still accept ('inf', '1_000', ...)
+    odd = text[~plain & (text != '')]
+    if len(odd):
+        result[odd.index] = odd.apply(_clean_price)
+    return result
+
+def _clean_reviews_vectorized(reviews):
+    """Vectorized _clean_reviews"""
+    if len(reviews) == 0:
+        return reviews.apply(_clean_reviews)
+
+    result = pd.Series(0, index=reviews.index, dtype='int64')
+    present = reviews.notna()
+    text = reviews[present].astype(str)
+
+    # str.isdigit() accepts non-ASCII digits; leave those to the row-wise path
+    non_ascii = text.str.contains(r'[^\x00-\x7f]', regex=True).fillna(False).astype(bool)
+    digits = text[~non_ascii].str.replace(r'[^0-9]+', '', regex=True)
+
+    if (digits.str.len() > 18).any():
+        return reviews.apply(_clean_reviews)  # beyond int64, keep Python ints
+
+    has_digits = digits != ''
+    result[has_digits[has_digits].index] = digits[has_digits].astype('int64')
+    if non_ascii.any():
+        result[non_ascii[non_ascii].index] = text[non_ascii].apply(_clean_reviews)
+    return result
+
+def _categorize_price_vectorized(prices):
+    """Vectorized _categorize_price: [-inf, 20) Budget, [20, 50) Standard, rest Premium"""
+    if len(prices) == 0:
+        return prices.apply(_categorize_price)
+    values = prices.to_numpy(dtype=float, na_value=np.nan)
+    labels = np.select(
+        [values < 20, values < 50, ~np.isnan(values)],
+        ["Budget", "Standard", "Premium"],
+        default="Unknown",
+    ).astype(object)
+    return pd.Series(labels, index=prices.index)
+
+CLEANERS = {
+    'vectorized': (_clean_price_vectorized, _clean_reviews_vectorized, _categorize_price_vectorized),
+    'rowwise': (
+        lambda s: s.apply(_clean_price),
+        lambda s: s.apply(_clean_reviews),
+        lambda s: s.apply(_categorize_price),
+    ),
+}
+
+def clean_frame(df, engine='vectorized'):
+    """Cleans a raw scrape frame in place and adds the engineered features.
+    `engine` is 'vectorized' (default) or 'rowwise', the original per-row
+    .apply implementation."""
+    clean_price, clean_reviews, categorize_price = CLEANERS[engine]
+    # Each step is a metrics span, so the run summary shows rows/sec per step
+    step = lambda name: metrics.span('clean_step', rows=len(df), step=name, engine=engine)
 
     # 1. Clean Price
-    df['price'] = df['price'].apply(_clean_price)
+    with step('price'):
+        df['price'] = clean_price(df['price'])
     
     # 2. Clean Reviews
-    df['reviews'] = df['reviews'].apply(_clean_reviews)
+    with step('reviews'):
+        df['reviews'] = clean_reviews(df['reviews'])
     
     # 3. Clean Rating
     # If rating is 0 or missing, replace with NaN or keep as 0
-    df['rating'] = pd.to_numeric(df['rating'], errors='coerce').fillna(0)
+    with step('rating'):
+        df['rating'] = pd.to_numeric(df['rating'], errors='coerce').fillna(0)
 
     
     # Feature 1: Price Category
-    def categorize_price(p):
-        if pd.isna(p): return "Unknown"
-        if p < 20: return "Budget"
-        elif p < 50: return "Standard"
-        else: return "Premium"
-    
-    df['price_category'] = df['price'].apply(categorize_price)
+    with step('price_category'):
+        df['price_category'] = categorize_price(df['price'])
 
     # Feature 2: High Engagement
-    df['is_popular'] = (df['reviews'] > 0) & (df['rating'] >= 4.5)
+    with step('is_popular'):
+        df['is_popular'] = (df['reviews'] > 0) & (df['rating'] >= 4.5)
 
     # Drop rows where price is completely missing (useless data)
-    df.dropna(subset=['price'], inplace=True)
+    with step('dropna'):
+        rows_in = len(df)
+        df.dropna(subset=['price'], inplace=True)
+    metrics.inc('clean_rows_dropped_total', rows_in - len(df), reason='missing_price')
     
     # Fill missing names
-    df['name'] = df['name'].fillna("Unknown Product")
+    with step('name'):
+        df['name'] = df['name'].fillna("Unknown Product")
+    return df
+
+def get_clean_data(raw_csv_path, engine='vectorized'):
+    print("\n--- 2. STARTING DATA CLEANING ---")
+    
+    try:
+        # encoding='utf-8' is safer for web scraped text
+        with metrics.span('clean_read_csv') as span:
+            df = pd.read_csv(raw_csv_path, encoding='utf-8')
+            span['rows'] = len(df)
+    except FileNotFoundError:
+        print(f"❌ Error: '{raw_csv_path}' not found.")
+        sys.exit()
+
+    df = clean_frame(df, engine)
 
     print("✅ Data cleaning & Feature Engineering complete.")
     print(df.info())
     return df
 
+def iter_clean_chunks(raw_csv_path, chunksize=100_000, engine='vectorized'):
+    """Streams the raw CSV in `chunksize`-row chunks and yields each one
+    cleaned, so memory stays bounded by the chunk size, not the file."""
+    print(f"\n--- 2. STARTING CHUNKED DATA CLEANING ({chunksize:,} rows/chunk) ---")
+
+    try:
+        reader = pd.read_csv(raw_csv_path, encoding='utf-8', chunksize=chunksize)
+    except FileNotFoundError:
+        print(f"❌ Error: '{raw_csv_path}' not found.")
+        sys.exit()
+
+    rows_in = rows_out = chunks = 0
+    with reader:
+        for chunk in reader:
+            rows_in += len(chunk)
+            chunk = clean_frame(chunk, engine)
+            rows_out += len(chunk)
+            chunks += 1
+            yield chunk
+
+    print(f"✅ Cleaned {rows_out:,} of {rows_in:,} rows in {chunks} chunks.")
+
 if __name__ == '__main__':
     test_path = Path(__file__).parent.parent / "data" / "banggood_raw_data.csv"
     df = get_clean_data(test_path)
@@ -1,68 +1,216 @@
 import sys
 from pathlib import Path  
-import pandas as pd
-import toml
-from sqlalchemy import create_engine
-from sqlalchemy.engine import URL
+from sqlalchemy import String, inspect, select, table, text
+import db
+import metrics
 from data_cleaning import get_clean_data
+from utils.urls import product_key
+from bulk_load import bulk_insert
+from storage import latest_crawl_date, read_clean_parquet, restore_float64
 
 
 sys.path.append(str(Path(__file__).parent))
 
-def load_data_to_sql(df):
-    print("\n--- 4. STARTING DATA LOAD TO SQL ---")
-    
-    SECRETS_PATH = Path(__file__).parent.parent / ".streamlit" / "secrets.toml"
+TABLE_NAME = 'banggood_products'
+STAGING_TABLE = 'banggood_products_staging'
+
+# Bulk-load strategy (see bulk_load.bulk_insert) and rows per batch
+LOAD_STRATEGY = 'executemany'
+BATCH_SIZE = 10_000
 
+# Cleaned columns written to the table (product_key is added on load)
+LOAD_COLUMNS = ['name', 'price', 'rating', 'reviews', 'category', 'url', 'price_category', 'is_popular']
+
+# Bounded string types so the dashboard's filter/pagination columns are indexable
+KEY_DTYPES = {'product_key': String(40), 'category': String(100)}
+
+def get_engine():
+    """The shared pooled engine (see db.get_engine) and its database name"""
     try:
-        config = toml.load(SECRETS_PATH)
-        db = config['database'] 
-        
-        DRIVER = db['driver']
-        SERVER = db['server']
-        DATABASE = db['database']
-        USERNAME = db['username']
-        PASSWORD = db['password']
-        
+        engine = db.get_engine()
+        url = engine.url
     except FileNotFoundError:
-        print(f"❌ Secrets file not found at: {SECRETS_PATH}")
+        print(f"❌ Secrets file not found at: {db.SECRETS_PATH}")
         sys.exit()
     except KeyError as e:
         print(f"❌ Error in secrets file: Could not find key {e}")
         sys.exit()
 
-    TABLE_NAME = 'banggood_products'
-
-    print(f"   Connecting to: {SERVER}/{DATABASE} as {USERNAME}")
+    print(f"   Connecting to: {url.render_as_string(hide_password=True)}")
 
     try:
-        connection_url = URL.create(
-            "mssql+pyodbc",
-            username=USERNAME,
-            password=PASSWORD,
-            host=SERVER,
-            database=DATABASE,
-            query={"driver": DRIVER}
-        )
-        engine = create_engine(connection_url)
-        with engine.connect() as conn:
-            pass
+        db.run_with_retry(lambda: engine.connect().close())
         print("   ✅ Connection engine created successfully.")
-            
     except Exception as e:
         print(f"❌ Failed to create engine. Error: {e}")
         sys.exit()
 
+    return engine, url.database
+
+def _verify_load(engine):
+    try:
+        query = select(text("*")).select_from(table(TABLE_NAME)).limit(5)
+        df_from_db = db.read_sql(query, engine)
+        print("\n✅ Verification complete. Read 5 rows back from DB:")
+        print(df_from_db[['name', 'price', 'category']])
+    except Exception as e:
+        print(f"❌ Failed to read data back. Error: {e}")
+
+# Among rows with the same key, the one with the most reviews (the latest
+# listing) is kept; the other columns break ties, so row order never matters
+DEDUPE_ORDER = ['reviews', 'price', 'rating', 'name', 'url']
+
+def add_product_keys(df, dedupe=True):
+    """Adds the `product_key` column: one key per product per category (see
+    utils.urls.product_key), so cross-category listings stay separate rows.
+    With `dedupe`, keeps one row per key (see DEDUPE_ORDER)."""
+    fallback = df['name'].astype(str) + "|" + df['category'].astype(str)
+    categories = df['category'].astype(str)
+    keys = [product_key(url, fb, category) for url, fb, category in zip(df['url'], fallback, categories)]
+    df = df.assign(product_key=keys)
+    if not dedupe:
+        return df
+    order = ['product_key', *(c for c in DEDUPE_ORDER if c in df.columns)]
+    deduped = df.sort_values(order, kind='stable', na_position='first').drop_duplicates('product_key', keep='last')
+    return deduped.sort_index()
+
+def _write_table(df, conn, table_name, if_exists, strategy, batch_size):
+    """(Re)creates the table schema if needed, then bulk-inserts the rows"""
+    df.head(0).to_sql(
+        table_name,
+        con=conn,
+        if_exists=if_exists,
+        index=False,
+        dtype=KEY_DTYPES
+    )
+    bulk_insert(df, table_name, conn, strategy=strategy, batch_size=batch_size)
+
+def _create_indexes(conn, unique=True):
+    """product_key index (keyset pagination, upsert) and category index
+    (server-side dashboard filters)"""
+    kind = "UNIQUE INDEX ux" if unique else "INDEX ix"
+    conn.execute(text(f"CREATE {kind}_{TABLE_NAME}_listing_key ON {TABLE_NAME} (product_key)"))
+    conn.execute(text(f"CREATE INDEX ix_{TABLE_NAME}_category ON {TABLE_NAME} (category, price)"))
+
+def _write_replace(df, engine, if_exists='replace', strategy=LOAD_STRATEGY, batch_size=BATCH_SIZE):
+    with engine.begin() as conn:
+        _write_table(df, conn, TABLE_NAME, if_exists, strategy, batch_size)
+        if if_exists == 'replace':
+            _create_indexes(conn, unique=False)
+
+def _ensure_target(conn, df):
+    """Creates the keyed target table on first run. Returns False if a
+    table without a unique per-listing product_key is in the way (from
+    'replace' mode, or keyed on the URL alone before category was part
+    of the key)."""
+    inspector = inspect(conn)
+    if inspector.has_table(TABLE_NAME):
+        return any(ix['unique'] and ix['name'] == f"ux_{TABLE_NAME}_listing_key"
+                   for ix in inspector.get_indexes(TABLE_NAME))
+
+    df.head(0).to_sql(TABLE_NAME, con=conn, index=False, dtype=KEY_DTYPES)
+    _create_indexes(conn)
+    return True
+
+def _changed(dialect, columns, t='t', s='s'):
+    """SQL predicate: any non-key column differs (NULL-safe)"""
+    if dialect == 'mssql':
+        checks = [
+            f"({t}.{c} <> {s}.{c} OR ({t}.{c} IS NULL AND {s}.{c} IS NOT NULL) OR ({t}.{c} IS NOT NULL AND {s}.{c} IS NULL))"
+            for c in columns
+        ]
+    else:
+        checks = [f"{t}.{c} IS NOT {s}.{c}" for c in columns]
+    return "(" + " OR ".join(checks) + ")"
+
+def _merge_sql(dialect, columns):
+    cols = ", ".join(columns + ['product_key'])
+    if dialect == 'mssql':
+        updates = ", ".join(f"t.{c} = s.{c}" for c in columns)
+        values = ", ".join(f"s.{c}" for c in columns + ['product_key'])
+        return f"""
+            MERGE {TABLE_NAME} WITH (HOLDLOCK) AS t
+            USING {STAGING_TABLE} AS s ON t.product_key = s.product_key
+            WHEN MATCHED AND {_changed(dialect, columns)} THEN UPDATE SET {updates}
+            WHEN NOT MATCHED BY TARGET THEN INSERT ({cols}) VALUES ({values});
+        """
+    # SQLite / PostgreSQL upsert
+    updates = ", ".join(f"{c} = excluded.{c}" for c in columns)
+    return f"""
+        INSERT INTO {TABLE_NAME} ({cols})
+        SELECT {cols} FROM {STAGING_TABLE} WHERE true
+        ON CONFLICT (product_key) DO UPDATE SET {updates}
+        WHERE {_changed(dialect, columns, t=TABLE_NAME, s='excluded')}
+    """
+
+def upsert_to_sql(df, engine, strategy=LOAD_STRATEGY, batch_size=BATCH_SIZE):
+    """Applies `df` to the table with a set-based MERGE/upsert on product_key.
+
+    Rows go to a staging table first; only new or changed rows touch the
+    target. Returns {'inserted', 'updated', 'unchanged'} counts.
+    """
+    df = add_product_keys(df)
+    columns = [c for c in df.columns if c != 'product_key']
+    dialect = engine.dialect.name
+
+    with engine.begin() as conn:
+        if not _ensure_target(conn, df):
+            print(f"   ⚠️ '{TABLE_NAME}' has no unique per-listing product_key; rebuilding it once.")
+            _write_table(df, conn, TABLE_NAME, 'replace', strategy, batch_size)
+            _create_indexes(conn)
+            return {'inserted': len(df), 'updated': 0, 'unchanged': 0}
+
+        _write_table(df, conn, STAGING_TABLE, 'replace', strategy, batch_size)
+
+        with metrics.span('load_merge', rows=len(df), dialect=dialect):
+            inserted = conn.execute(text(f"""
+                SELECT COUNT(*) FROM {STAGING_TABLE} s
+                WHERE NOT EXISTS (SELECT 1 FROM {TABLE_NAME} t WHERE t.product_key = s.product_key)
+            """)).scalar()
+            updated = conn.execute(text(f"""
+                SELECT COUNT(*) FROM {STAGING_TABLE} s
+                JOIN {TABLE_NAME} t ON t.product_key = s.product_key
+                WHERE {_changed(dialect, columns)}
+            """)).scalar()
+
+            conn.execute(text(_merge_sql(dialect, columns)))
+        conn.execute(text(f"DROP TABLE {STAGING_TABLE}"))
+
+    return {'inserted': inserted, 'updated': updated, 'unchanged': len(df) - inserted - updated}
+
+def _record_counts(counts, mode):
+    for action, value in counts.items():
+        metrics.inc('load_rows_total', value, action=action, mode=mode)
+
+def _print_counts(counts):
+    print(f"   ➕ {counts['inserted']:,} inserted | ✏️ {counts['updated']:,} updated | "
+          f"= {counts['unchanged']:,} unchanged")
+
+def load_data_to_sql(df, mode='replace', engine=None, strategy=LOAD_STRATEGY, batch_size=BATCH_SIZE):
+    """Loads the cleaned frame. mode='replace' rewrites the table;
+    mode='incremental' upserts on product_key (see upsert_to_sql).
+    `engine` defaults to the shared pooled engine (see db.get_engine).
+    Rows are written with bulk_load.bulk_insert(`strategy`, `batch_size`)
+    in one transaction."""
+    print("\n--- 4. STARTING DATA LOAD TO SQL ---")
+
+    if engine is None:
+        engine, DATABASE = get_engine()
+    else:
+        DATABASE = engine.url.database
+
     # --- 3. DUMP DATAFRAME TO SQL ---
     try:
-        print(f"   Attempting to write {len(df)} rows to table '{TABLE_NAME}'...")
-        
-        df.to_sql(
-            TABLE_NAME,
-            con=engine,
-            if_exists='replace',
-            index=False
-        )
+        if mode == 'incremental':
+            print(f"   Upserting {len(df)} rows into '{TABLE_NAME}'...")
+            counts = db.run_with_retry(lambda: upsert_to_sql(df, engine, strategy, batch_size))
+            _print_counts(counts)
+        else:
+            print(f"   Attempting to write {len(df)} rows to table '{TABLE_NAME}'...")
+            keyed = add_product_keys(df, dedupe=False)
+            db.run_with_retry(lambda: _write_replace(keyed, engine, strategy=strategy, batch_size=batch_size))
+            counts = {'inserted': len(df), 'updated': 0, 'unchanged': 0}
+        _record_counts(counts, mode)
         print(f"✅ Success! Data dumped to '{TABLE_NAME}' in '{DATABASE}'.")
         
     except Exception as e:
@@ -70,22 +218,58 @@ def load_data_to_sql(df):
         sys.exit()
 
     # --- 4. VERIFY DATA ---
+    _verify_load(engine)
+    return counts
+
+def load_chunks_to_sql(chunks, mode='replace', engine=None, strategy=LOAD_STRATEGY, batch_size=BATCH_SIZE):
+    """Streams cleaned chunks into the table so only one chunk is in memory
+    at a time. In 'replace' mode the first chunk replaces the table and the
+    rest are appended; in 'incremental' mode every chunk is upserted."""
+    print("\n--- 4. STARTING CHUNKED DATA LOAD TO SQL ---")
+
+    if engine is None:
+        engine, DATABASE = get_engine()
+    else:
+        DATABASE = engine.url.database
+
+    total = 0
+    counts = {'inserted': 0, 'updated': 0, 'unchanged': 0}
     try:
-        with engine.connect() as connection:
-            query = f"SELECT TOP 5 * FROM {TABLE_NAME};"
-            df_from_db = pd.read_sql(query, con=connection)
-            print("\n✅ Verification complete. Read 5 rows back from DB:")
-            print(df_from_db[['name', 'price', 'category']])
+        for i, chunk in enumerate(chunks):
+            if mode == 'incremental':
+                chunk_counts = db.run_with_retry(lambda: upsert_to_sql(chunk, engine, strategy, batch_size))
+                for key, value in chunk_counts.items():
+                    counts[key] += value
+            else:
+                keyed = add_product_keys(chunk, dedupe=False)
+                if_exists = 'replace' if i == 0 else 'append'
+                db.run_with_retry(lambda: _write_replace(keyed, engine, if_exists, strategy, batch_size))
+                counts['inserted'] += len(chunk)
+            total += len(chunk)
+            print(f"   ...chunk {i + 1}: {total:,} rows written")
+        if mode == 'incremental':
+            _print_counts(counts)
+        _record_counts(counts, mode)
+        print(f"✅ Success! {total:,} rows dumped to '{TABLE_NAME}' in '{DATABASE}'.")
+
     except Exception as e:
-        print(f"❌ Failed to read data back. Error: {e}")
+        print(f"❌ Failed to dump data. Error: {e}")
+        sys.exit()
+
+    _verify_load(engine)
+    return counts
 
 if __name__ == '__main__':
     print("--- Running data_loader.py directly for testing... ---")
     
     csv_path = Path(__file__).parent.parent / "data" / "banggood_raw_data.csv"
     
-    if csv_path.exists():
+    if latest_crawl_date():
+        df = restore_float64(read_clean_parquet(columns=LOAD_COLUMNS))
+        load_data_to_sql(df)
+    elif csv_path.exists():
         df = get_clean_data(csv_path) 
         load_data_to_sql(df)
     else:
-        print(f"❌ Error: Could not find {csv_path}")
\ No newline at end of file
+        print(f"❌ Error: Could not find {csv_path}")
+    metrics.finish()
\ No newline at end of file
@@ -0,0 +1,165 @@
+import os
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import pandas as pd
+import toml
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.exc import DBAPIError, OperationalError
+
+SECRETS_PATH = Path(__file__).parent.parent / ".streamlit" / "secrets.toml"
+
+# Overrides secrets.toml, e.g. BANGGOOD_DB_URL=sqlite:///data/banggood.db
+DB_URL_ENV = 'BANGGOOD_DB_URL'
+
+# Sized for a handful of concurrent dashboard sessions plus a loader
+POOL_SIZE = 5
+MAX_OVERFLOW = 10
+POOL_TIMEOUT = 30
+POOL_RECYCLE = 1800  # seconds; below typical server/firewall idle cut-offs
+
+RETRIES = 3
+RETRY_BACKOFF = 0.5
+# SQLSTATEs worth retrying: link failures, timeouts, deadlock victim
+TRANSIENT_SQLSTATES = ('08S01', '08001', '08003', '08004', 'HYT00', 'HYT01', '40001', '1205')
+
+SLOW_QUERY_SECONDS = 2.0
+
+_engine = None
+_engine_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_query_stats = defaultdict(lambda: {'count': 0, 'total': 0.0, 'max': 0.0})
+
+
+def get_db_url(secrets_path=SECRETS_PATH):
+    """DB URL from $BANGGOOD_DB_URL, else the [database] section of
+    secrets.toml: either a full `url` or the SQL Server fields."""
+    if os.environ.get(DB_URL_ENV):
+        return make_url(os.environ[DB_URL_ENV])
+
+    db = toml.load(secrets_path)['database']
+    if 'url' in db:
+        return make_url(db['url'])
+    return URL.create(
+        "mssql+pyodbc",
+        username=db['username'],
+        password=db['password'],
+        host=db['server'],
+        database=db['database'],
+        query={"driver": db['driver']}
+    )
+
+
+def _pool_options(url):
+    options = {'pool_pre_ping': True}
+    if url.get_backend_name() == 'sqlite':
+        return options  # SQLite picks its own pool; size/recycle don't apply
+    options.update(pool_size=POOL_SIZE, max_overflow=MAX_OVERFLOW,
+                   pool_timeout=POOL_TIMEOUT, pool_recycle=POOL_RECYCLE)
+    if url.get_backend_name() == 'mssql':
+        options['fast_executemany'] = True
+    return options
+
+
+def _attach_timing(engine):
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _stop(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['query_start'].pop()
+        key = " ".join(statement.split())[:120]
+        with _stats_lock:
+            stats = _query_stats[key]
+            stats['count'] += 1
+            stats['total'] += elapsed
+            stats['max'] = max(stats['max'], elapsed)
+        if elapsed >= SLOW_QUERY_SECONDS:
+            print(f"   🐢 Slow query ({elapsed:.2f}s): {key}")
+
+    @event.listens_for(engine, "handle_error")
+    def _drop_timer(context):
+        starts = context.connection.info.get('query_start') if context.connection is not None else None
+        if starts:
+            starts.pop()
+
+
+def create_db_engine(url=None):
+    """New engine with the shared pool settings and query timing attached"""
+    url = make_url(url) if url is not None else get_db_url()
+    engine = create_engine(url, **_pool_options(url))
+    _attach_timing(engine)
+    return engine
+
+
+def get_engine():
+    """The process-wide pooled engine (created on first use)"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = create_db_engine()
+    return _engine
+
+
+def dispose_engine():
+    global _engine
+    with _engine_lock:
+        if _engine is not None:
+            _engine.dispose()
+            _engine = None
+
+
+def is_transient(exc):
+    if not isinstance(exc, DBAPIError):
+        return False
+    if exc.connection_invalidated:
+        return True
+    orig_args = getattr(exc.orig, 'args', ()) or ()
+    sqlstate = str(orig_args[0]) if orig_args else ''
+    if sqlstate in TRANSIENT_SQLSTATES:
+        return True
+    # SQLite reports lock contention as OperationalError "database is locked"
+    return isinstance(exc, OperationalError) and 'locked' in str(exc.orig).lower()
+
+
+def run_with_retry(fn, retries=RETRIES, backoff=RETRY_BACKOFF):
+    """Calls fn() and retries it on transient DB errors with exponential
+    backoff. fn should open its own connection/transaction so a retry
+    starts clean."""
+    for attempt in range(retries + 1):
+        try:
+            return fn()
+        except DBAPIError as e:
+            if attempt == retries or not is_transient(e):
+                raise
+            delay = backoff * 2 ** attempt
+            print(f"   ⚠️ Transient DB error, retrying in {delay:.1f}s: {e.orig}")
+            time.sleep(delay)
+
+
+def read_sql(query, engine=None, params=None, **kwargs):
+    """pd.read_sql on a pooled connection, with retries"""
+    engine = engine or get_engine()
+
+    def _read():
+        with engine.connect() as conn:
+            return pd.read_sql(query, conn, params=params, **kwargs)
+    return run_with_retry(_read)
+
+
+def query_stats(top=10):
+    """Per-statement count/total/max seconds, slowest total first"""
+    with _stats_lock:
+        rows = [{'statement': k, **v} for k, v in _query_stats.items()]
+    df = pd.DataFrame(rows, columns=['statement', 'count', 'total', 'max'])
+    return df.sort_values('total', ascending=False).head(top).reset_index(drop=True)
+
+
+def reset_query_stats():
+    with _stats_lock:
+        _query_stats.clear()
@@ -0,0 +1,147 @@
+import sqlite3
+import time
+from collections import Counter
+from pathlib import Path
+
+import metrics
+from utils.paths import get_data_path
+from utils.urls import product_identity
+
+DEDUP_DB = get_data_path("dedup_index.sqlite")
+MODES = ('mark', 'skip')
+LOOKUP_CHUNK = 500  # keys per IN (...) query, well under SQLite's parameter limit
+
+
+def delta_path(output_csv):
+    """Where mode='skip' writes the new/changed products of a crawl saved
+    to `output_csv`: '<name>.delta.csv' next to it"""
+    output_csv = Path(output_csv)
+    return output_csv.with_name(output_csv.stem + ".delta.csv")
+
+
+class SeenIndex:
+    """Persistent key-value index of every product seen by earlier runs.
+
+    Maps a product identity (see utils.urls.product_identity) to its URL,
+    last listed price and first/last-seen times, in a SQLite file next
+    to the page cache.
+    """
+
+    def __init__(self, path=DEDUP_DB):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(self.path)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS products (
+                product_id TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                price TEXT,
+                first_seen REAL NOT NULL,
+                last_seen REAL NOT NULL,
+                times_seen INTEGER NOT NULL DEFAULT 1
+            ) WITHOUT ROWID;
+        """)
+
+    def lookup(self, keys):
+        """{key: last price} for the keys already in the index"""
+        keys = list(keys)
+        found = {}
+        for start in range(0, len(keys), LOOKUP_CHUNK):
+            chunk = keys[start:start + LOOKUP_CHUNK]
+            rows = self.db.execute(
+                f"SELECT product_id, price FROM products WHERE product_id IN ({', '.join('?' * len(chunk))})", chunk)
+            found.update(rows)
+        return found
+
+    def record(self, products, seen_at=None):
+        """Upserts {key: (url, price)} in one transaction"""
+        seen_at = seen_at or time.time()
+        with self.db:
+            self.db.executemany("""
+                INSERT INTO products (product_id, url, price, first_seen, last_seen)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (product_id) DO UPDATE SET
+                    url = excluded.url, price = excluded.price,
+                    last_seen = excluded.last_seen, times_seen = times_seen + 1
+            """, [(key, url, price, seen_at, seen_at) for key, (url, price) in products.items()])
+
+    def __len__(self):
+        return self.db.execute("SELECT COUNT(*) FROM products").fetchone()[0]
+
+    def close(self):
+        self.db.close()
+
+
+class ProductDeduper:
+    """Classifies scraped records as new / changed / unchanged / duplicate.
+
+    duplicate  already emitted earlier in this run in the same category
+               (a product listed in two categories counts in both)
+    new        not in the persistent index
+    changed    in the index with a different last price
+    unchanged  in the index at the same price
+
+    Both modes drop only duplicates from the snapshot they return, so the
+    main output stays a full crawl (price history, the Parquet rollups and
+    the dashboard read it as a whole). mode='skip' also returns the new
+    and changed products, which the scraper writes to a separate delta
+    file (see delta_path); mode='mark' only reports the statuses in the
+    page log and metrics.
+
+    Index updates are held until commit(), which the scraper calls once
+    the output file is saved: a crashed run never marks products as seen
+    that it did not deliver.
+    """
+
+    def __init__(self, index=None, mode='mark'):
+        if mode not in MODES:
+            raise ValueError(f"Unknown dedup mode: {mode}")
+        self.index = index if index is not None else SeenIndex()
+        self.mode = mode
+        self.seen = set()
+        self.pending = {}
+        self.counts = Counter()
+
+    def filter(self, records):
+        """Returns (records for the snapshot, new or changed records for
+        the delta file (empty unless mode='skip'), Counter of statuses)"""
+        keys = [product_identity(record.url) for record in records]
+        known = self.index.lookup(set(keys))
+        emitted, delta, counts = [], [], Counter()
+
+        for record, key in zip(records, keys):
+            run_key = (key, record.category)
+            if run_key in self.seen:
+                counts['duplicate'] += 1
+                continue
+            self.seen.add(run_key)
+
+            if key not in known:
+                status = 'new'
+            elif known[key] != record.price:
+                status = 'changed'
+            else:
+                status = 'unchanged'
+            counts[status] += 1
+            self.pending[key] = (record.url, record.price)
+            emitted.append(record)
+            if status != 'unchanged' and self.mode == 'skip':
+                delta.append(record)
+
+        for status, n in counts.items():
+            metrics.inc('dedup_products_total', n, status=status, mode=self.mode)
+        self.counts.update(counts)
+        return emitted, delta, counts
+
+    def commit(self):
+        """Stores every product seen this run (with its latest price) in the index"""
+        if self.pending:
+            self.index.record(self.pending)
+            self.pending = {}
+
+    def summary(self):
+        parts = [f"{self.counts[s]:,} {s}" for s in ('new', 'changed', 'unchanged', 'duplicate') if self.counts[s]]
+        return ", ".join(parts) or "no products"
+
+    def close(self):
+        self.index.close()
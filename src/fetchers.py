@@ -0,0 +1,238 @@
+import asyncio
+import random
+import time
+from dataclasses import dataclass
+
+import aiohttp
+
+from browser_pool import BrowserPool, RateLimiter
+from page_readiness import wait_for_document, wait_for_listing, wait_for_stable
+
+DEFAULT_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+    ),
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.9",
+}
+
+# Markers of block / challenge pages that only a real browser gets past
+ANTI_BOT_MARKERS = (
+    "access denied",
+    "captcha",
+    "cf-challenge",
+    "_incapsula_",
+    "please enable javascript",
+    "are you a robot",
+)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+@dataclass
+class FetchResult:
+    url: str
+    page_source: str = None
+    backend: str = None
+    status: int = None
+    elapsed: float = 0.0
+    error: Exception = None
+    ready: object = None
+
+    @property
+    def ok(self):
+        return self.error is None and self.page_source is not None
+
+
+def needs_browser(page_source, marker='p-wrap'):
+    """True if a page is an anti-bot page or lacks the content `marker`"""
+    if not page_source:
+        return True
+    lowered = page_source[:20000].lower()
+    if any(m in lowered for m in ANTI_BOT_MARKERS):
+        return True
+    return marker is not None and marker not in page_source
+
+
+class Fetcher:
+    """Turns URLs into page sources.
+
+    fetch() yields one FetchResult per URL as pages complete, in any
+    order. `wait` is 'listing' for product listing pages or 'document'
+    for plain pages such as the sitemap.
+    """
+
+    name = "base"
+
+    def fetch(self, urls, wait='listing'):
+        raise NotImplementedError
+
+    def fetch_one(self, url, wait='document'):
+        return next(iter(self.fetch([url], wait=wait)))
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class HttpFetcher(Fetcher):
+    """asyncio/aiohttp backend with pooled keep-alive connections.
+
+    The event loop and client session live as long as the fetcher, so
+    connections are reused across fetch() calls. Every request attempt,
+    retries included, first waits for a slot from `rate_limiter` (shared
+    with the browser pool under the 'auto' backend).
+    """
+
+    name = "http"
+
+    def __init__(self, concurrency=8, per_host=4, retries=3, backoff=1.0, timeout=30, headers=None,
+                 rate_limiter=None):
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.headers = headers or DEFAULT_HEADERS
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self._loop = asyncio.new_event_loop()
+        self._session = None
+        self._semaphore = None
+
+    async def _ensure_session(self):
+        if self._session is None:
+            connector = aiohttp.TCPConnector(
+                limit=self.concurrency,
+                limit_per_host=self.per_host,
+                keepalive_timeout=30,
+                ttl_dns_cache=300,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers=self.headers,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._session
+
+    async def _get(self, url):
+        session = await self._ensure_session()
+        last_error = None
+        status = None
+
+        for attempt in range(self.retries + 1):
+            await asyncio.sleep(self.rate_limiter.reserve(url))
+            start = time.monotonic()
+            try:
+                async with self._semaphore:
+                    async with session.get(url) as resp:
+                        status = resp.status
+                        text = await resp.text(errors='replace')
+                elapsed = time.monotonic() - start
+
+                if status == 200:
+                    return FetchResult(url, text, self.name, status, elapsed)
+                if status not in RETRY_STATUSES:
+                    return FetchResult(url, text, self.name, status, elapsed, error=RuntimeError(f"HTTP {status}"))
+                last_error = RuntimeError(f"HTTP {status}")
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                last_error = e
+
+            if attempt < self.retries:
+                await asyncio.sleep(self.backoff * (2 ** attempt) * random.uniform(0.5, 1.5))
+
+        return FetchResult(url, None, self.name, status, error=last_error)
+
+    async def _fetch_batch(self, urls):
+        return await asyncio.gather(*(self._get(url) for url in urls))
+
+    def fetch(self, urls, wait='listing'):
+        urls = list(urls)
+        batch_size = self.concurrency * 2
+        for i in range(0, len(urls), batch_size):
+            yield from self._loop.run_until_complete(self._fetch_batch(urls[i:i + batch_size]))
+
+    def close(self):
+        if self._loop.is_closed():
+            return
+        if self._session is not None:
+            self._loop.run_until_complete(self._session.close())
+            self._session = None
+        self._loop.close()
+
+
+@dataclass
+class PageSourceTask:
+    """Browser pool task: load a URL, wait until ready, return FetchResult"""
+    url: str
+    wait: str = 'listing'
+    timeout: float = 20
+
+    def __call__(self, driver):
+        start = time.monotonic()
+        driver.get(self.url)
+        ready = None
+        if self.wait == 'listing':
+            # Scrolls until no new cards appear, then waits for images & layout
+            ready = wait_for_listing(driver, timeout=self.timeout)
+        else:
+            wait_for_document(driver, timeout=self.timeout)
+            wait_for_stable(driver, "return document.links.length;", timeout=self.timeout / 2)
+        return FetchResult(self.url, driver.page_source, SeleniumFetcher.name,
+                           elapsed=time.monotonic() - start, ready=ready)
+
+
+class SeleniumFetcher(Fetcher):
+    """Browser backend on top of BrowserPool. The pool starts on first use."""
+
+    name = "selenium"
+
+    def __init__(self, workers, driver_factory, profile_root=None, rate_limiter=None, page_timeout=20):
+        self.pool = BrowserPool(workers, driver_factory, profile_root=profile_root, rate_limiter=rate_limiter)
+        self.page_timeout = page_timeout
+
+    def fetch(self, urls, wait='listing'):
+        self.pool.start()
+        tasks = [PageSourceTask(url, wait, self.page_timeout) for url in urls]
+        for result in self.pool.run(tasks):
+            if result.error:
+                yield FetchResult(result.task.url, backend=self.name, error=result.error)
+            else:
+                yield result.value
+
+    def close(self):
+        self.pool.close()
+
+
+class FallbackFetcher(Fetcher):
+    """Tries `primary` first and re-fetches with `fallback` only the pages
+    that failed or that need a browser (anti-bot page / missing content)."""
+
+    name = "auto"
+
+    def __init__(self, primary, fallback):
+        self.primary = primary
+        self.fallback = fallback
+
+    def fetch(self, urls, wait='listing'):
+        marker = 'p-wrap' if wait == 'listing' else 'Wholesale-'
+        retry = []
+        for result in self.primary.fetch(urls, wait=wait):
+            if result.ok and not needs_browser(result.page_source, marker):
+                yield result
+            else:
+                retry.append(result.url)
+
+        if retry:
+            print(f"   ↪️ {len(retry)} page(s) need a browser, falling back to {self.fallback.name}...")
+            yield from self.fallback.fetch(retry, wait=wait)
+
+    def close(self):
+        self.primary.close()
+        self.fallback.close()
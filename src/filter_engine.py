@@ -0,0 +1,118 @@
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+
+
+class Filters(namedtuple('Filters', ['category', 'price', 'rating'], defaults=(None, None, None))):
+    """Dashboard filter tuple. `category` is a name or None (all);
+    `price`/`rating` are inclusive (lo, hi) ranges or None (no bound).
+    Hashable, so it doubles as a cache key."""
+
+    @property
+    def is_empty(self):
+        return self.category is None and self.price is None and self.rating is None
+
+
+class _SortedColumn:
+    """Row positions ordered by value, for range lookup by binary search"""
+
+    def __init__(self, values):
+        self.values = np.asarray(values, dtype='float64')
+        self.order = np.argsort(self.values, kind='stable')  # NaN sorts last
+        self.sorted = self.values[self.order]
+
+    def span(self, lo, hi):
+        """(start, stop) into `order` of the rows with lo <= value <= hi"""
+        return np.searchsorted(self.sorted, lo, side='left'), np.searchsorted(self.sorted, hi, side='right')
+
+    def positions(self, span):
+        return np.sort(self.order[span[0]:span[1]])
+
+    def contains(self, positions, lo, hi):
+        values = self.values[positions]
+        return (values >= lo) & (values <= hi)
+
+
+class FilterEngine:
+    """Indexes a frame once so category/price/rating selections never scan it.
+
+    Built per data load: a category -> row positions map and sorted price
+    and rating columns. A selection sizes every predicate without touching
+    rows (list length, or binary-search span), materializes only the most
+    selective one and checks the others on just those rows. Selections
+    (row positions, not frames) and derived chart data (see `cached`) are
+    kept in an LRU keyed by the filter tuple.
+    """
+
+    def __init__(self, df, cache_size=128):
+        self.df = df.reset_index(drop=True)
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._all = np.arange(len(self.df))
+        self._by_category = {
+            cat: np.asarray(positions)
+            for cat, positions in self.df.groupby('category', observed=True, sort=False).indices.items()
+        }
+        self._category_codes = np.full(len(self.df), -1, dtype='int32')  # -1: no category
+        self._code_of = {}
+        for code, (cat, positions) in enumerate(self._by_category.items()):
+            self._category_codes[positions] = code
+            self._code_of[cat] = code
+        self._columns = {name: _SortedColumn(self.df[name]) for name in ('price', 'rating')}
+
+    def bounds(self, column):
+        values = self._columns[column].sorted
+        values = values[~np.isnan(values)]
+        return (float(values[0]), float(values[-1])) if len(values) else (0.0, 0.0)
+
+    def cached(self, key, compute):
+        """LRU-cached compute() under `key` (include the Filters in it)"""
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+        value = compute()
+        self._cache[key] = value
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return value
+
+    def _positions(self, filters):
+        # (size, kind, key) for each active predicate; sizes cost O(log n)
+        predicates = []
+        if filters.category is not None:
+            if filters.category not in self._by_category:
+                return self._all[:0]
+            predicates.append((len(self._by_category[filters.category]), 'category', None))
+        for name in ('price', 'rating'):
+            bound = getattr(filters, name)
+            if bound is not None:
+                span = self._columns[name].span(*bound)
+                predicates.append((span[1] - span[0], name, span))
+        if not predicates:
+            return self._all
+
+        predicates.sort(key=lambda p: p[0])
+        _, kind, span = predicates[0]
+        if kind == 'category':
+            selected = self._by_category[filters.category]
+        else:
+            selected = self._columns[kind].positions(span)
+
+        for _, kind, _ in predicates[1:]:
+            if not len(selected):
+                break
+            if kind == 'category':
+                keep = self._category_codes[selected] == self._code_of[filters.category]
+            else:
+                keep = self._columns[kind].contains(selected, *getattr(filters, kind))
+            selected = selected[keep]
+        return selected
+
+    def select(self, filters=None):
+        """Sorted row positions matching `filters`"""
+        filters = filters or Filters()
+        return self.cached(('select', filters), lambda: self._positions(filters))
+
+    def frame(self, filters=None):
+        filters = filters or Filters()
+        return self.df if filters.is_empty else self.df.iloc[self.select(filters)]
@@ -0,0 +1,99 @@
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+
+from lxml import etree
+
+
+def _has_class(name):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+# Compiled once at import; same matching rules as BeautifulSoup's class_=
+CARD_XPATH = etree.XPath(f"//div[{_has_class('p-wrap')}]")
+TITLE_XPATH = etree.XPath(f"(.//a[{_has_class('title')}])[1]")
+PRICE_XPATH = etree.XPath(f"(.//span[{_has_class('price')}])[1]")
+RATING_XPATH = etree.XPath(f"(.//span[{_has_class('review-text')}])[1]")
+REVIEWS_XPATH = etree.XPath(f"(.//a[{_has_class('review')}])[1]")
+
+_PARSER = etree.HTMLParser(recover=True, remove_comments=True)
+
+CSV_FIELDS = ['name', 'price', 'rating', 'reviews', 'category', 'url']
+
+
+@dataclass(slots=True)
+class ProductRecord:
+    """One product card, with the raw strings shown on the listing page"""
+    name: str
+    price: str
+    url: str
+    rating: str = "0"
+    reviews: str = "0 reviews"
+    category: str = None
+
+    def as_dict(self):
+        return asdict(self)
+
+
+@dataclass
+class ParseResult:
+    records: list = field(default_factory=list)
+    cards: int = 0
+    malformed: Counter = field(default_factory=Counter)
+
+    @property
+    def malformed_count(self):
+        return sum(self.malformed.values())
+
+
+def _text(elements):
+    if not elements:
+        return None
+    return "".join(elements[0].itertext()).strip()
+
+
+def parse_listing(page_source, category_name=None):
+    """Extracts every `div.p-wrap` product card of a listing page.
+
+    Cards without a name, price or link are not returned but counted in
+    `malformed` by reason. Missing rating/review tags fall back to
+    "0" / "0 reviews", as the scraper always did.
+    """
+    result = ParseResult()
+    if not page_source:
+        return result
+
+    if isinstance(page_source, str):
+        page_source = page_source.encode('utf-8')
+    root = etree.fromstring(page_source, _PARSER)
+    if root is None:
+        return result
+
+    for card in CARD_XPATH(root):
+        result.cards += 1
+
+        title = TITLE_XPATH(card)
+        if not title:
+            result.malformed['missing_title'] += 1
+            continue
+        href = title[0].get('href')
+        if href is None:
+            result.malformed['missing_url'] += 1
+            continue
+        name = _text(title)
+        if not name:
+            result.malformed['empty_name'] += 1
+            continue
+        price = _text(PRICE_XPATH(card))
+        if not price:
+            result.malformed['missing_price'] += 1
+            continue
+
+        record = ProductRecord(name, price, href, category=category_name)
+        rating = _text(RATING_XPATH(card))
+        if rating is not None:
+            record.rating = rating
+        reviews = _text(REVIEWS_XPATH(card))
+        if reviews is not None:
+            record.reviews = reviews
+        result.records.append(record)
+
+    return result
@@ -1,27 +1,195 @@
-from web_scraper import scrape_and_save
-from data_cleaning import get_clean_data
-from analysis import generate_all_plots
-from data_loader import load_data_to_sql
+import argparse
+import sys
+from pathlib import Path
+
+# Only light modules here: each stage imports its own (pandas, selenium,
+# matplotlib, sqlalchemy, ...) when it runs, so `main.py load` never pays
+# for the scraper. benchmarks/bench_startup.py keeps it that way.
+import metrics
+from pipeline import Pipeline, Stage
 from utils.paths import get_data_path
 
 # constants
 RAW_DATA_PATH = get_data_path('banggood_raw_data3.csv')
 PAGES_TO_SCRAPE = 4
+SCRAPER_WORKERS = 2
+# Both keep RAW_DATA_PATH a full snapshot; 'skip' also writes the products new
+# or changed since earlier runs to a delta file (see dedup.ProductDeduper)
+SCRAPE_DEDUP = 'mark'
+
+# Streaming mode: clean/analyze/load in fixed-size chunks so memory is
+# bounded by CHUNK_SIZE rows instead of the raw file size
+STREAMING = False
+CHUNK_SIZE = 100_000
+
+# 'incremental' upserts on product_key; 'replace' rewrites the whole table
+LOAD_MODE = 'incremental'
+
+SRC_DIR = Path(__file__).parent
+# Same locations as storage.CLEAN_PARQUET_DIR, rollups.ROLLUP_DIR, the
+# analysis plot dir and price_history.HISTORY_DIR, spelled out so building the DAG imports no stage module
+CLEAN_PARQUET_DIR = Path(get_data_path("clean_parquet"))
+ROLLUP_DIR = Path(get_data_path("rollups"))
+PLOT_DIR = Path(get_data_path("plots"))
+HISTORY_DIR = Path(get_data_path("price_history"))
+
+# Scraping stays opt-in (--stages scrape,...), as it hits the live site
+DEFAULT_STAGES = ['clean', 'rollup', 'plots', 'history', 'load', 'sql_rollups']
+
+# CLI subcommand -> pipeline stages
+COMMANDS = {
+    'scrape': ['scrape'],
+    'clean': ['clean'],
+    'analyze': ['rollup', 'plots'],
+    'history': ['history'],
+    'load': ['load', 'sql_rollups'],
+}
+
+def _sources(*modules):
+    return [SRC_DIR / f"{name}.py" for name in modules]
+
+# --- Stages (imports are deferred to the stage that needs them) ---
+
+def scrape():
+    from web_scraper import scrape_and_save
+    scrape_and_save(PAGES_TO_SCRAPE, RAW_DATA_PATH, workers=SCRAPER_WORKERS, dedup=SCRAPE_DEDUP)
+
+def clean():
+    from data_cleaning import get_clean_data
+    from storage import raw_crawl_date, write_clean_parquet
+    write_clean_parquet(get_clean_data(RAW_DATA_PATH), raw_crawl_date(RAW_DATA_PATH))
+
+def rollup():
+    from analysis import PLOT_COLUMNS
+    from rollups import build_rollups
+    from storage import read_clean_parquet
+    build_rollups(read_clean_parquet(columns=PLOT_COLUMNS))
+
+def plots():
+    from analysis import generate_plots_from_rollups
+    from rollups import read_rollups
+    generate_plots_from_rollups(read_rollups())
+
+def history():
+    from price_history import update_price_history
+    update_price_history()
+
+def db_target():
+    """The load target's URL, password masked: part of the SQL stages'
+    cache key, so pointing BANGGOOD_DB_URL elsewhere reruns them"""
+    from db import get_db_url
+    try:
+        return get_db_url().render_as_string(hide_password=True)
+    except Exception as e:
+        return f"unconfigured ({e!r})"
+
+def load():
+    from data_loader import LOAD_COLUMNS, load_data_to_sql
+    from storage import read_clean_parquet, restore_float64
+    load_data_to_sql(restore_float64(read_clean_parquet(columns=LOAD_COLUMNS)), mode=LOAD_MODE)
+
+def sql_rollups():
+    from rollups import refresh_sql_rollups
+    refresh_sql_rollups()
+
+def build_pipeline():
+    """The pipeline DAG: scrape -> clean -> rollup -> plots
+                                        |-> history
+                                        \\-> load -> sql_rollups
+    Stages hand data over through files, so each one can be cached on the
+    content hash of what it reads (plus its own source code)."""
+    return Pipeline([
+        Stage('scrape', scrape, outputs=[RAW_DATA_PATH]),
+        Stage('clean', clean,
+              inputs=[RAW_DATA_PATH, *_sources('data_cleaning', 'storage')],
+              outputs=[CLEAN_PARQUET_DIR], deps=['scrape']),
+        Stage('rollup', rollup,
+              inputs=[CLEAN_PARQUET_DIR, *_sources('rollups', 'queries', 'filter_engine')],
+              outputs=[ROLLUP_DIR], deps=['clean']),
+        Stage('plots', plots,
+              inputs=[ROLLUP_DIR, *_sources('analysis', 'rollups')],
+              outputs=[PLOT_DIR], deps=['rollup']),
+        Stage('history', history,
+              inputs=[CLEAN_PARQUET_DIR, *_sources('price_history')],
+              outputs=[HISTORY_DIR], deps=['clean']),
+        Stage('load', load,
+              inputs=[CLEAN_PARQUET_DIR, *_sources('data_loader', 'bulk_load')],
+              params={'mode': LOAD_MODE, 'db': db_target}, deps=['clean']),
+        Stage('sql_rollups', sql_rollups, params={'db': db_target}, deps=['load']),
+    ])
+
+def run_pipeline(stages=None, force=()):
+    """Runs the selected stages (default: DEFAULT_STAGES), skipping any
+    whose inputs are unchanged since their last successful run"""
+    manifest = build_pipeline().run(stages or DEFAULT_STAGES, force)
+    if all(result['status'] in ('ran', 'skipped') for result in manifest['stages'].values()):
+        print("\n --- ENTIRE PIPELINE COMPLETED --- ")
+    return manifest
+
+def run_streaming_pipeline():
+    from analysis import generate_all_plots_from_chunks
+    from data_cleaning import iter_clean_chunks
+    from data_loader import load_chunks_to_sql
+    from price_history import update_price_history
+    from rollups import refresh_sql_rollups, write_rollups
+    from sketches import StatsAccumulator
+    from storage import CleanParquetWriter, raw_crawl_date
+
+    # 2. Transform -> 4. Load, one chunk at a time
+    stats = StatsAccumulator()
+    parquet = CleanParquetWriter(raw_crawl_date(RAW_DATA_PATH))
+
+    def observed(chunks):
+        # Feed each cleaned chunk to Parquet and the sketches on its way to SQL
+        for chunk in chunks:
+            with metrics.span('stream_observe', rows=len(chunk)):
+                parquet.write(chunk)
+                stats.update(chunk)
+            yield chunk
+
+    load_chunks_to_sql(observed(iter_clean_chunks(RAW_DATA_PATH, CHUNK_SIZE)), mode=LOAD_MODE)
+    refresh_sql_rollups()
+    update_price_history()
+
+    # 3. Analyze & Visualize from the one-pass sketches; they are also this crawl's rollups
+    write_rollups(generate_all_plots_from_chunks([], accumulator=stats))
 
-def run_pipeline():
-    # 1. Extract
-    # scrape_and_save(PAGES_TO_SCRAPE, RAW_DATA_PATH)
-    
-    # 2. Transform
-    clean_df = get_clean_data(RAW_DATA_PATH)
-    
-    # 3. Analyze & Visualize
-    generate_all_plots(clean_df)
-    
-    # 4. Load
-    load_data_to_sql(clean_df)
-    
     print("\n --- ENTIRE PIPELINE COMPLETED --- ")
 
+def _split(value):
+    return [s for s in value.split(",") if s]
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Run the Banggood ETL pipeline")
+    commands = parser.add_subparsers(dest="command")
+    for name, stages in COMMANDS.items():
+        command = commands.add_parser(name, help=f"run the {' + '.join(stages)} stage(s)")
+        command.add_argument("--force", action="store_true", help="rerun even if the inputs are unchanged")
+
+    run = commands.add_parser("run", help="run the pipeline DAG (default command)")
+    run.add_argument("--stages", default=",".join(DEFAULT_STAGES),
+                     help="comma-separated stages to run (scrape, clean, rollup, plots, history, load, sql_rollups)")
+    run.add_argument("--force", default="",
+                     help="comma-separated stages to rerun even if cached, or 'all'")
+    run.add_argument("--streaming", action="store_true", default=STREAMING,
+                     help="single fused chunked pass instead of the staged DAG")
+    return parser
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    # No subcommand (or just run's flags, as before subcommands existed) means `run`
+    if not argv or (argv[0].startswith("-") and argv[0] not in ("-h", "--help")):
+        argv = ["run", *argv]
+    args = build_parser().parse_args(argv)
+
+    if args.command == "run" and args.streaming:
+        run_streaming_pipeline()
+    elif args.command == "run":
+        run_pipeline(_split(args.stages), _split(args.force))
+    else:
+        stages = COMMANDS[args.command]
+        run_pipeline(stages, stages if args.force else ())
+    metrics.finish()
+
 if __name__ == "__main__":
-    run_pipeline()
\ No newline at end of file
+    main()
@@ -0,0 +1,234 @@
+import datetime
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from pathlib import Path
+
+from utils.paths import get_data_path
+
+# Set BANGGOOD_METRICS=0 to turn recording (and the JSON event log) off
+METRICS_ENV = 'BANGGOOD_METRICS'
+METRICS_DIR = Path(get_data_path("metrics"))
+EVENTS_FILE = 'events.jsonl'
+PROM_FILE = 'banggood.prom'
+PREFIX = 'banggood_'
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+COUNT_BUCKETS = (0, 1, 5, 10, 20, 40, 60, 80, 100, 150, 200)
+
+
+def _key(name, labels):
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items() if v is not None))
+
+
+def _label_text(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    escape = lambda v: v.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join(f'{k}="{escape(v)}"' for k, v in pairs) + '}'
+
+
+class Histogram:
+    """Bucketed observations plus count / sum / max"""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value) if self.count > 1 else value
+        i = bisect_left(self.buckets, value)
+        if i < len(self.buckets):
+            self.counts[i] += 1
+
+    @property
+    def mean(self):
+        return self.sum / self.count if self.count else 0.0
+
+
+class Registry:
+    """Process-wide counters, gauges and histograms, safe to update from
+    scraper/pipeline threads. Spans also append one JSON line each to the
+    event log, tagged with the run id."""
+
+    def __init__(self, directory=METRICS_DIR, enabled=None):
+        self.directory = Path(directory)
+        self.enabled = os.environ.get(METRICS_ENV, '1') != '0' if enabled is None else enabled
+        self.run_id = datetime.datetime.now().strftime('%Y%m%dT%H%M%S-%f')
+        self._lock = threading.Lock()
+        self._events = None
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.counters = {}
+            self.gauges = {}
+            self.histograms = {}
+
+    def inc(self, name, value=1, **labels):
+        if not self.enabled or not value:
+            return
+        key = _key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set_gauge(self, name, value, **labels):
+        if self.enabled:
+            with self._lock:
+                self.gauges[_key(name, labels)] = value
+
+    def observe(self, name, value, buckets=LATENCY_BUCKETS, **labels):
+        if not self.enabled or value is None:
+            return
+        key = _key(name, labels)
+        with self._lock:
+            if key not in self.histograms:
+                self.histograms[key] = Histogram(buckets)
+            self.histograms[key].observe(value)
+
+    def log(self, event, **fields):
+        """Appends one structured JSON line to the event log"""
+        if not self.enabled:
+            return
+        record = {'ts': datetime.datetime.now().isoformat(timespec='milliseconds'),
+                  'run_id': self.run_id, 'event': event, **fields}
+        line = json.dumps(record, default=str) + '\n'
+        with self._lock:
+            if self._events is None:
+                self.directory.mkdir(parents=True, exist_ok=True)
+                self._events = open(self.directory / EVENTS_FILE, 'a', encoding='utf-8')
+            self._events.write(line)
+            self._events.flush()
+
+    @contextmanager
+    def span(self, name, rows=None, **labels):
+        """Times the block into the `<name>_seconds` histogram. `rows`
+        (or span['rows'] set inside the block) feeds `<name>_rows_total`
+        so the report can show throughput."""
+        info = {'rows': rows}
+        start = time.perf_counter()
+        error = None
+        try:
+            yield info
+        except Exception as e:
+            error = repr(e)
+            raise
+        finally:
+            seconds = time.perf_counter() - start
+            self.observe(f"{name}_seconds", seconds, **labels)
+            self.inc(f"{name}_rows_total", info['rows'] or 0, **labels)
+            if error:
+                self.inc(f"{name}_errors_total", **labels)
+            fields = {'span': name, 'seconds': round(seconds, 6), **labels}
+            if info['rows'] is not None:
+                fields['rows'] = info['rows']
+                fields['rows_per_sec'] = round(info['rows'] / seconds, 1) if seconds else None
+            if error:
+                fields['error'] = error
+            self.log('span', **fields)
+
+    def prometheus_text(self):
+        """Prometheus text exposition format (counters, gauges, histograms)"""
+        with self._lock:
+            counters = sorted(self.counters.items())
+            gauges = sorted(self.gauges.items())
+            histograms = sorted(self.histograms.items(), key=lambda item: item[0])
+
+        lines, typed = [], set()
+
+        def header(name, kind):
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in counters:
+            header(PREFIX + name, 'counter')
+            lines.append(f"{PREFIX}{name}{_label_text(labels)} {value}")
+        for (name, labels), value in gauges:
+            header(PREFIX + name, 'gauge')
+            lines.append(f"{PREFIX}{name}{_label_text(labels)} {value}")
+        for (name, labels), hist in histograms:
+            full = PREFIX + name
+            header(full, 'histogram')
+            cumulative = 0
+            for bound, count in zip(hist.buckets, hist.counts):
+                cumulative += count
+                lines.append(f"{full}_bucket{_label_text(labels, [('le', repr(float(bound)))])} {cumulative}")
+            lines.append(f"{full}_bucket{_label_text(labels, [('le', '+Inf')])} {hist.count}")
+            lines.append(f"{full}_sum{_label_text(labels)} {hist.sum}")
+            lines.append(f"{full}_count{_label_text(labels)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, path=None):
+        """Writes the Prometheus text file (node_exporter textfile-collector
+        style: written to a temp file and renamed). Returns the path."""
+        path = Path(path) if path else self.directory / PROM_FILE
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(path.suffix + '.tmp')
+        tmp.write_text(self.prometheus_text())
+        tmp.replace(path)
+        return path
+
+    def report(self):
+        """Prints the end-of-run summary: every histogram (with rows/sec
+        for spans that counted rows), then the counters"""
+        if not self.enabled:
+            return
+        with self._lock:
+            counters = dict(self.counters)
+            histograms = sorted(self.histograms.items(), key=lambda item: item[0])
+        if not counters and not histograms:
+            return
+
+        print(f"\n--- METRICS (run {self.run_id}) ---")
+        if histograms:
+            print(f"   {'':62s} {'count':>7s} {'total':>9s} {'mean':>9s} {'max':>9s} {'rows/sec':>12s}")
+        for (name, labels), hist in histograms:
+            rate = ''
+            if name.endswith('_seconds'):
+                name = name[:-len('_seconds')]
+                rows = counters.get((name + '_rows_total', labels))
+                rate = f"{rows / hist.sum:12,.0f}" if rows and hist.sum else ''
+                cells = f"{hist.sum:8.2f}s {hist.mean * 1000:7.1f}ms {hist.max * 1000:7.1f}ms"
+            else:
+                cells = f"{hist.sum:9,.0f} {hist.mean:9.1f} {hist.max:9,.0f}"
+            print(f"   ⏱️ {name + _label_text(labels):60s} {hist.count:7,d} {cells} {rate:>12s}")
+        for (name, labels), value in sorted(counters.items()):
+            if not name.endswith('_rows_total') or not any(
+                    h[0] == name[:-len('_rows_total')] + '_seconds' and h[1] == labels for h, _ in histograms):
+                print(f"   🔢 {name + _label_text(labels):60s} {value:>17,}")
+
+    def close(self):
+        with self._lock:
+            if self._events is not None:
+                self._events.close()
+                self._events = None
+
+
+REGISTRY = Registry()
+
+inc = REGISTRY.inc
+set_gauge = REGISTRY.set_gauge
+observe = REGISTRY.observe
+log = REGISTRY.log
+span = REGISTRY.span
+reset = REGISTRY.reset
+
+
+def finish(path=None):
+    """End-of-run hook: prints the summary and writes the Prometheus file"""
+    if not REGISTRY.enabled:
+        return None
+    REGISTRY.report()
+    path = REGISTRY.export(path)
+    print(f"   📈 Metrics: {path} | events: {REGISTRY.directory / EVENTS_FILE}")
+    return path
@@ -0,0 +1,155 @@
+import gzip
+import hashlib
+import sqlite3
+import time
+from pathlib import Path
+
+from fetchers import Fetcher, FetchResult
+from utils.urls import normalize_url
+
+DEFAULT_TTL = 7 * 24 * 3600           # 7 days
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3     # 2 GB of compressed pages
+
+
+class PageCache:
+    """On-disk, content-addressed cache of fetched HTML pages.
+
+    Page bodies are gzip-compressed blobs named by their SHA-256, so
+    identical pages are stored once. A SQLite index maps each normalized
+    URL and fetch time to a blob. evict() enforces TTL and a size budget.
+    """
+
+    def __init__(self, root, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES):
+        self.root = Path(root)
+        self.blob_dir = self.root / "blobs"
+        self.blob_dir.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.db = sqlite3.connect(self.root / "index.sqlite")
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url_key TEXT NOT NULL,
+                url TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                content_hash TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_pages_url ON pages (url_key, fetched_at);
+            CREATE INDEX IF NOT EXISTS idx_pages_time ON pages (fetched_at);
+            CREATE TABLE IF NOT EXISTS blobs (
+                content_hash TEXT PRIMARY KEY,
+                size INTEGER NOT NULL
+            );
+        """)
+
+    def _blob_path(self, content_hash):
+        return self.blob_dir / content_hash[:2] / f"{content_hash}.html.gz"
+
+    def put(self, url, page_source, fetched_at=None):
+        data = page_source.encode('utf-8')
+        content_hash = hashlib.sha256(data).hexdigest()
+        path = self._blob_path(content_hash)
+        if not path.exists():
+            path.parent.mkdir(exist_ok=True)
+            tmp = path.with_suffix(".tmp")
+            tmp.write_bytes(gzip.compress(data, compresslevel=6))
+            tmp.replace(path)
+            self.db.execute("INSERT OR REPLACE INTO blobs VALUES (?, ?)", (content_hash, path.stat().st_size))
+
+        self.db.execute(
+            "INSERT INTO pages VALUES (?, ?, ?, ?)",
+            (normalize_url(url), url, fetched_at or time.time(), content_hash),
+        )
+        self.db.commit()
+        return content_hash
+
+    def get(self, url, max_age=None):
+        """Latest cached body for a URL, or None if missing/expired"""
+        row = self.db.execute(
+            "SELECT content_hash, fetched_at FROM pages WHERE url_key = ? ORDER BY fetched_at DESC LIMIT 1",
+            (normalize_url(url),),
+        ).fetchone()
+        if row is None:
+            return None
+        max_age = self.ttl if max_age is None else max_age
+        if max_age and time.time() - row[1] > max_age:
+            return None
+        try:
+            return gzip.decompress(self._blob_path(row[0]).read_bytes()).decode('utf-8')
+        except FileNotFoundError:
+            return None
+
+    def urls(self, contains=None):
+        """Original URLs of every cached page (latest fetch per URL)"""
+        query = "SELECT url, MAX(fetched_at) FROM pages GROUP BY url_key"
+        urls = [row[0] for row in self.db.execute(query)]
+        if contains:
+            urls = [u for u in urls if contains in u]
+        return urls
+
+    def evict(self):
+        """Drops entries older than the TTL, then the oldest entries until
+        the blobs fit in `max_bytes`, then any blob nothing points to."""
+        if self.ttl:
+            self.db.execute("DELETE FROM pages WHERE fetched_at < ?", (time.time() - self.ttl,))
+
+        total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+        if self.max_bytes and total > self.max_bytes:
+            rows = self.db.execute("""
+                SELECT p.rowid, b.content_hash, b.size FROM pages p
+                JOIN blobs b ON b.content_hash = p.content_hash
+                ORDER BY p.fetched_at
+            """).fetchall()
+            for rowid, content_hash, size in rows:
+                if total <= self.max_bytes:
+                    break
+                self.db.execute("DELETE FROM pages WHERE rowid = ?", (rowid,))
+                if not self.db.execute("SELECT 1 FROM pages WHERE content_hash = ? LIMIT 1", (content_hash,)).fetchone():
+                    total -= size
+
+        orphans = self.db.execute(
+            "SELECT content_hash FROM blobs WHERE content_hash NOT IN (SELECT content_hash FROM pages)"
+        ).fetchall()
+        for (content_hash,) in orphans:
+            self._blob_path(content_hash).unlink(missing_ok=True)
+            self.db.execute("DELETE FROM blobs WHERE content_hash = ?", (content_hash,))
+        self.db.commit()
+        return len(orphans)
+
+    def close(self):
+        self.db.close()
+
+
+class CachingFetcher(Fetcher):
+    """Passes fetches through to `inner` and stores every good page"""
+
+    def __init__(self, inner, cache):
+        self.inner = inner
+        self.cache = cache
+        self.name = inner.name
+
+    def fetch(self, urls, wait='listing'):
+        for result in self.inner.fetch(urls, wait=wait):
+            if result.ok:
+                self.cache.put(result.url, result.page_source)
+            yield result
+
+    def close(self):
+        self.inner.close()
+
+
+class ReplayFetcher(Fetcher):
+    """Serves pages from the cache only; never touches the network"""
+
+    name = "replay"
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def fetch(self, urls, wait='listing'):
+        for url in urls:
+            start = time.monotonic()
+            page_source = self.cache.get(url, max_age=0)
+            if page_source is None:
+                yield FetchResult(url, backend=self.name, error=KeyError(f"not cached: {url}"))
+            else:
+                yield FetchResult(url, page_source, self.name, elapsed=time.monotonic() - start)
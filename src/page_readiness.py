@@ -0,0 +1,99 @@
+import time
+from dataclasses import dataclass
+
+# One round trip per poll: [readyState, cards, pending card images, page height]
+LISTING_SNAPSHOT_JS = """
+const cards = document.querySelectorAll('div.p-wrap');
+const pending = Array.from(document.querySelectorAll('div.p-wrap img'))
+    .filter(img => !img.complete || img.naturalWidth === 0).length;
+return [document.readyState, cards.length, pending, document.body ? document.body.scrollHeight : 0];
+"""
+
+SCROLL_TO_BOTTOM_JS = "window.scrollTo(0, document.body.scrollHeight);"
+
+
+@dataclass
+class ReadyReport:
+    """How long a page took to become ready and why waiting stopped"""
+    elapsed: float
+    cards: int = 0
+    scrolls: int = 0
+    timed_out: bool = False
+
+
+def wait_until(predicate, timeout, poll=0.25):
+    """Polls predicate() until it is truthy or timeout runs out"""
+    deadline = time.monotonic() + timeout
+    while True:
+        if predicate():
+            return True
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(poll)
+
+
+def wait_for_document(driver, timeout=10, poll=0.25):
+    return wait_until(lambda: driver.execute_script("return document.readyState;") == "complete", timeout, poll)
+
+
+def wait_for_stable(driver, script, timeout=10, poll=0.25, stable_polls=3):
+    """Waits until `script` returns the same value for `stable_polls` polls in a row"""
+    state = {'value': None, 'streak': 0}
+
+    def settled():
+        value = driver.execute_script(script)
+        if value == state['value']:
+            state['streak'] += 1
+        else:
+            state['value'], state['streak'] = value, 0
+        return state['streak'] >= stable_polls
+
+    wait_until(settled, timeout, poll)
+    return state['value']
+
+
+def wait_for_listing(driver, timeout=20, poll=0.25, stable_polls=3, max_scrolls=10):
+    """Waits for a listing page to finish rendering its product cards.
+
+    Scrolls to the bottom until a scroll produces no new `div.p-wrap`
+    cards, then waits for card images to load and the page height to
+    stop changing. Never waits longer than `timeout` seconds in total.
+    """
+    start = time.monotonic()
+    deadline = start + timeout
+    report = ReadyReport(elapsed=0.0)
+
+    def remaining():
+        return max(deadline - time.monotonic(), 0)
+
+    def snapshot():
+        return driver.execute_script(LISTING_SNAPSHOT_JS)
+
+    wait_for_document(driver, remaining(), poll)
+
+    cards = snapshot()[1]
+    while report.scrolls < max_scrolls and remaining() > 0:
+        driver.execute_script(SCROLL_TO_BOTTOM_JS)
+        report.scrolls += 1
+
+        before = cards
+        grew = wait_until(lambda: snapshot()[1] > before, min(remaining(), poll * stable_polls), poll)
+        cards = snapshot()[1]
+        if not grew:
+            break
+
+    # Images loaded and layout stable for `stable_polls` consecutive polls
+    state = {'height': None, 'streak': 0}
+
+    def settled():
+        _, count, pending, height = snapshot()
+        report.cards = count
+        if pending == 0 and height == state['height']:
+            state['streak'] += 1
+        else:
+            state['height'], state['streak'] = height, 0
+        return state['streak'] >= stable_polls
+
+    report.timed_out = not wait_until(settled, remaining(), poll)
+    report.elapsed = time.monotonic() - start
+    return report
@@ -0,0 +1,187 @@
+import datetime
+import hashlib
+import json
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import metrics
+from utils.paths import get_data_path
+
+RUNS_DIR = Path(get_data_path("runs"))
+STATE_FILE = 'state.json'
+
+
+@dataclass
+class Stage:
+    """One pipeline step.
+
+    inputs:  files/directories whose contents decide whether to rerun
+             (include the stage's source modules to rerun on code changes)
+    params:  extra JSON-able settings that belong in the input hash; a
+             value may be a zero-argument callable, resolved only when the
+             stage is hashed (e.g. to defer an import)
+    outputs: files/directories the stage produces; a missing one forces a rerun
+    deps:    stages that must finish first
+    A stage with no inputs (e.g. one reading SQL) reruns when an upstream
+    stage ran in the same run, when its params changed, or, without
+    params either, when it has no deps.
+    """
+    name: str
+    func: callable
+    inputs: list = field(default_factory=list)
+    outputs: list = field(default_factory=list)
+    deps: list = field(default_factory=list)
+    params: dict = field(default_factory=dict)
+
+
+def _hash_file(path, digest):
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+
+
+def hash_path(path):
+    """Content hash of a file, or of every file under a directory. File
+    names are ignored (only the partition directories count), so
+    re-writing the same data under new part-*.parquet names is a no-op."""
+    path = Path(path)
+    if path.is_file():
+        digest = hashlib.sha1()
+        _hash_file(path, digest)
+        return digest.hexdigest()
+    if not path.exists():
+        return 'missing'
+    entries = []
+    for file in sorted(p for p in path.rglob('*') if p.is_file() and not p.name.startswith('.')):
+        digest = hashlib.sha1(str(file.parent.relative_to(path)).encode())
+        _hash_file(file, digest)
+        entries.append(digest.hexdigest())
+    return hashlib.sha1("".join(sorted(entries)).encode()).hexdigest()
+
+
+def input_hash(stage):
+    if not stage.inputs and not stage.params:
+        return None
+    params = {key: value() if callable(value) else value for key, value in stage.params.items()}
+    digest = hashlib.sha1(json.dumps(params, sort_keys=True, default=str).encode())
+    for path in stage.inputs:
+        digest.update(f"{path}:{hash_path(path)}".encode())
+    return digest.hexdigest()
+
+
+class Pipeline:
+    """Small DAG runner with input-hash stage caching.
+
+    A stage is skipped when its input hash equals the one recorded at its
+    last successful run and all its outputs exist. Independent stages run
+    concurrently on a thread pool. Every run writes a manifest with
+    per-stage status and timings to `runs_dir`.
+    """
+
+    def __init__(self, stages, runs_dir=RUNS_DIR, workers=4):
+        self.stages = {stage.name: stage for stage in stages}
+        self.runs_dir = Path(runs_dir)
+        self.workers = workers
+        for stage in stages:
+            unknown = set(stage.deps) - set(self.stages)
+            if unknown:
+                raise ValueError(f"Stage '{stage.name}' depends on unknown stages: {sorted(unknown)}")
+
+    def _load_state(self):
+        path = self.runs_dir / STATE_FILE
+        return json.loads(path.read_text()) if path.exists() else {}
+
+    def _save_state(self, state):
+        self.runs_dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.runs_dir / (STATE_FILE + '.tmp')
+        tmp.write_text(json.dumps(state, indent=1))
+        tmp.replace(self.runs_dir / STATE_FILE)
+
+    def _is_fresh(self, stage, digest, state, upstream_ran):
+        if not all(Path(p).exists() for p in stage.outputs):
+            return False
+        if digest is None:
+            return bool(stage.deps) and not upstream_ran and stage.name in state
+        if not stage.inputs and upstream_ran:
+            return False  # it reads what its deps wrote outside any hashed file
+        return state.get(stage.name) == digest
+
+    def _run_stage(self, stage, force, state, upstream_ran):
+        """Returns the manifest entry for one stage"""
+        start = time.perf_counter()
+        # Hashed when the stage starts, i.e. after its upstream stages wrote their outputs
+        digest = input_hash(stage)
+        if not force and self._is_fresh(stage, digest, state, upstream_ran):
+            return {'status': 'skipped', 'seconds': round(time.perf_counter() - start, 3), 'input_hash': digest}
+
+        print(f"\n▶️ Stage '{stage.name}'")
+        try:
+            with metrics.span('pipeline_stage', stage=stage.name):
+                stage.func()
+        except (Exception, SystemExit) as e:
+            return {'status': 'failed', 'seconds': round(time.perf_counter() - start, 3),
+                    'input_hash': digest, 'error': repr(e)}
+        return {'status': 'ran', 'seconds': round(time.perf_counter() - start, 3), 'input_hash': digest}
+
+    def run(self, selected=None, force=()):
+        """Runs `selected` stage names (default: all) in dependency order.
+        Deps outside the selection are taken as already satisfied. `force`
+        names stages to run regardless of their cache ('all' for every one)."""
+        selected = list(self.stages) if not selected else list(selected)
+        unknown = set(selected) - set(self.stages)
+        if unknown:
+            raise ValueError(f"Unknown stages: {sorted(unknown)}")
+        force = set(self.stages) if 'all' in force else set(force)
+
+        state = self._load_state()
+        run_id = datetime.datetime.now().strftime('%Y%m%dT%H%M%S-%f')
+        manifest = {'run_id': run_id, 'started': datetime.datetime.now().isoformat(timespec='seconds'), 'stages': {}}
+        pending = {name: [d for d in self.stages[name].deps if d in selected] for name in selected}
+        results = manifest['stages']
+        started = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            running = {}
+            while pending or running:
+                for name, deps in list(pending.items()):
+                    if any(results.get(d, {}).get('status') in ('failed', 'blocked') for d in deps):
+                        results[name] = {'status': 'blocked', 'seconds': 0}
+                        del pending[name]
+                    elif all(d in results for d in deps):
+                        upstream_ran = any(results[d]['status'] == 'ran' for d in deps)
+                        future = pool.submit(self._run_stage, self.stages[name], name in force, state, upstream_ran)
+                        running[future] = name
+                        del pending[name]
+                if not running:
+                    if pending:
+                        raise ValueError(f"Dependency cycle among stages: {sorted(pending)}")
+                    continue
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    results[name] = future.result()
+                    metrics.inc('pipeline_stages_total', status=results[name]['status'])
+                    if results[name]['status'] == 'ran':
+                        state[name] = results[name]['input_hash'] or 'done'
+                    elif results[name]['status'] == 'failed':
+                        state.pop(name, None)
+
+        manifest['finished'] = datetime.datetime.now().isoformat(timespec='seconds')
+        manifest['seconds'] = round(time.perf_counter() - started, 3)
+        self._save_state(state)
+        (self.runs_dir / f"run-{run_id}.json").write_text(json.dumps(manifest, indent=1))
+        self._print_summary(manifest)
+        return manifest
+
+    def _print_summary(self, manifest):
+        icons = {'ran': '✅', 'skipped': '⏭️', 'failed': '❌', 'blocked': '⛔'}
+        print(f"\n--- PIPELINE RUN {manifest['run_id']} ({manifest['seconds']:.1f}s) ---")
+        for name, result in manifest['stages'].items():
+            line = f"   {icons[result['status']]} {name:14s} {result['status']:8s} {result['seconds']:8.2f}s"
+            if 'error' in result:
+                line += f"  {result['error']}"
+            print(line)
+        print(f"   📝 Manifest: {self.runs_dir / ('run-' + manifest['run_id'] + '.json')}")
@@ -0,0 +1,383 @@
+import datetime
+import hashlib
+import json
+import shutil
+import uuid
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from storage import CLEAN_PARQUET_DIR, read_clean_parquet
+from utils.paths import get_data_path
+from utils.urls import product_key
+
+HISTORY_DIR = Path(get_data_path("price_history"))
+LOG_DIR = 'log'
+CHECKPOINT_DIR = 'checkpoints'
+CURRENT_FILE = 'current.parquet'
+MANIFEST_FILE = '_manifest.json'
+
+# Daily log partitions older than this (counted back from the latest crawl)
+# are merged into one partition per month by compact()
+KEEP_DAILY_DAYS = 31
+
+# Tracked fields and their bit in the `changed` mask of a log event. Products
+# are keyed per listing (URL + category, as in the SQL table), so a listing's
+# category never changes; it is the log's partition column instead.
+FIELDS = ('name', 'price', 'rating', 'reviews', 'url')
+FLAGS = {'name': 1, 'price': 2, 'rating': 4, 'reviews': 8, 'url': 16}
+NEW = 32        # first time the listing was seen; every field is set
+REMOVED = 64    # no longer listed; only prev_price is set
+
+# One event per product per crawl in which something changed. Unchanged
+# fields are null, so a crawl that changes 2% of prices stores ~2% of a
+# snapshot, and nulls cost next to nothing in Parquet.
+LOG_SCHEMA = pa.schema([
+    ('product_key', pa.string()),
+    ('crawl_date', pa.string()),
+    ('changed', pa.int16()),
+    ('name', pa.string()),
+    ('price', pa.float32()),
+    ('prev_price', pa.float32()),
+    ('rating', pa.float32()),
+    ('reviews', pa.int32()),
+    ('url', pa.string()),
+])
+# period=YYYY-MM-DD (daily) or period=YYYY-MM (compacted month)
+LOG_PARTITIONING = ds.partitioning(
+    pa.schema([('period', pa.string()), ('category', pa.string())]),
+    flavor='hive',
+)
+# Among rows with the same key, the one with the most reviews is kept (as
+# in data_loader.add_product_keys), whatever the row order
+DEDUPE_ORDER = ['product_key', 'reviews', 'price', 'rating', 'name', 'url']
+
+
+def _write_options():
+    return ds.ParquetFileFormat().make_write_options(compression='zstd')
+
+
+def _empty_state():
+    return pd.DataFrame({
+        'product_key': pd.Series(dtype=object), 'name': pd.Series(dtype=object),
+        'price': pd.Series(dtype='float32'), 'rating': pd.Series(dtype='float32'),
+        'reviews': pd.Series(dtype='Int32'), 'url': pd.Series(dtype=object),
+        'category': pd.Series(dtype=object), 'first_seen': pd.Series(dtype=object),
+        'last_changed': pd.Series(dtype=object),
+    }).set_index('product_key')
+
+
+def _snapshot(df):
+    """One crawl's cleaned rows -> tracked fields, one row per listing"""
+    categories = df['category'].astype(str)
+    fallback = df['name'].astype(str) + "|" + categories
+    keys = [product_key(url, fb, category) for url, fb, category in zip(df['url'], fallback, categories)]
+    df = df.assign(product_key=keys).sort_values(DEDUPE_ORDER, kind='stable', na_position='first')
+    df = df.drop_duplicates('product_key', keep='last')[['product_key', 'category', *FIELDS]]
+    return df.astype({'price': 'float32', 'rating': 'float32', 'reviews': 'Int32',
+                      'category': str, 'name': object, 'url': object}).set_index('product_key')
+
+
+def _differs(a, b):
+    return ~((a == b).fillna(False).astype(bool) | (a.isna() & b.isna()))
+
+
+def diff_snapshots(prev, snap, crawl_date):
+    """Log events turning state `prev` into snapshot `snap`.
+
+    A crawl samples only some categories, so a listing missing from `snap`
+    counts as removed only if its category was crawled. Listings of the
+    other categories keep their last known state ('carried') and are
+    diffed against it whenever their category is crawled again."""
+    crawled = prev['category'].isin(snap['category'].unique())
+    both = snap.index.intersection(prev.index)
+    new = snap.loc[snap.index.difference(prev.index)]
+    missing = prev.index.difference(snap.index)
+    gone = prev.loc[missing][crawled.loc[missing]]
+
+    cur, old = snap.loc[both], prev.loc[both]
+    changed = pd.Series(0, index=both, dtype='int16')
+    masks = {}
+    for field, flag in FLAGS.items():
+        masks[field] = _differs(cur[field], old[field])
+        changed |= masks[field].astype('int16') * flag
+    touched = changed != 0
+    upd = cur[touched].copy()
+    for field in FIELDS:
+        upd[field] = upd[field].where(masks[field][touched])
+    upd['changed'] = changed[touched]
+    upd['prev_price'] = old.loc[touched, 'price'].where(masks['price'][touched])
+
+    new = new.assign(changed=NEW | sum(FLAGS.values()), prev_price=None)
+    gone = pd.DataFrame({'category': gone['category'], 'prev_price': gone['price'], 'changed': REMOVED},
+                        index=gone.index)
+
+    events = pd.concat([e for e in (new, upd, gone) if len(e)]) if len(new) + len(upd) + len(gone) else pd.DataFrame()
+    counts = {'new': len(new), 'changed': len(upd), 'removed': len(gone),
+              'unchanged': len(both) - len(upd), 'carried': int((~crawled).sum())}
+    if events.empty:
+        return events, counts
+    events = events.rename_axis('product_key').reset_index().assign(crawl_date=crawl_date)
+    return events, counts
+
+
+def apply_events(state, events):
+    """Replays log events (any number of crawls, in date order) onto a state"""
+    if events.empty:
+        return state
+    state = state.copy()
+    for date, ev in events.sort_values('crawl_date', kind='stable').groupby('crawl_date', sort=True):
+        ev = ev.set_index('product_key')
+        removed = (ev['changed'] & REMOVED) != 0
+        fresh = (ev['changed'] & NEW) != 0
+        upd = ev[~removed & ~fresh]
+
+        state = state.drop(ev.index[removed], errors='ignore')
+        for field, flag in FLAGS.items():
+            hit = upd[(upd['changed'] & flag) != 0]
+            if len(hit):
+                state.loc[hit.index, field] = hit[field].astype(state[field].dtype)
+        state.loc[upd.index, 'last_changed'] = date
+        if fresh.any():
+            added = ev.loc[fresh, ['category', *FIELDS]].assign(first_seen=date, last_changed=date)
+            state = pd.concat([state, added.astype(state.dtypes.to_dict())]) if len(state) else added
+    return state.astype(_empty_state().dtypes.to_dict())
+
+
+class PriceHistory:
+    """Append-only, delta-compressed history of every product's listing.
+
+    <root>/log/period=<day or month>/category=<name>/part-*.parquet
+        change events (see LOG_SCHEMA); only changed fields are stored
+    <root>/current.parquet
+        last known state of every listing (from whichever crawl last covered
+        its category), which the next crawl is diffed against
+    <root>/checkpoints/as_of=<date>.parquet
+        full states written by compact(); as_of() replays the log from the
+        nearest one instead of from the first crawl
+    <root>/_manifest.json
+        crawl dates, checkpoints and how far the log is compacted
+    """
+
+    def __init__(self, root=HISTORY_DIR):
+        self.root = Path(root)
+        self.log_dir = self.root / LOG_DIR
+        self.checkpoint_dir = self.root / CHECKPOINT_DIR
+        self.manifest = self._read_manifest()
+
+    # --- Files -----------------------------------------------------------
+
+    def _read_manifest(self):
+        path = self.root / MANIFEST_FILE
+        if path.exists():
+            return json.loads(path.read_text())
+        return {'dates': [], 'checkpoints': [], 'compacted_through': None}
+
+    def _write_manifest(self):
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.root / (MANIFEST_FILE + '.tmp')
+        tmp.write_text(json.dumps(self.manifest, indent=1))
+        tmp.replace(self.root / MANIFEST_FILE)
+
+    def _write_state(self, state, path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix('.tmp')
+        state.reset_index().to_parquet(tmp, index=False, compression='zstd')
+        tmp.replace(path)
+
+    def _read_state(self, path):
+        return pd.read_parquet(path).set_index('product_key').astype(_empty_state().dtypes.to_dict())
+
+    def _write_events(self, events, directory, basename):
+        table = pa.Table.from_pandas(events[LOG_SCHEMA.names], schema=LOG_SCHEMA, preserve_index=False)
+        table = table.append_column('period', pa.array(events['period'], pa.string()))
+        table = table.append_column('category', pa.array(events['category'].astype(str), pa.string()))
+        ds.write_dataset(table, directory, format='parquet', partitioning=LOG_PARTITIONING,
+                         basename_template=basename, file_options=_write_options(),
+                         existing_data_behavior='overwrite_or_ignore')
+
+    def _log(self, after=None, until=None, categories=None, columns=None):
+        """Log events of crawls in (after, until], with partition pruning:
+        periods before `after`'s month and other categories are never opened"""
+        if not self.log_dir.exists():
+            return pd.DataFrame(columns=columns or [*LOG_SCHEMA.names, 'category'])
+        expr = None
+        def both(e):
+            return e if expr is None else expr & e
+        if after:
+            expr = both((ds.field('period') >= after[:7]) & (ds.field('crawl_date') > after))
+        if until:
+            expr = both(ds.field('crawl_date') <= until)
+        if categories:
+            expr = both(ds.field('category').isin(list(categories)))
+        dataset = ds.dataset(self.log_dir, format='parquet', partitioning=LOG_PARTITIONING)
+        df = dataset.to_table(columns=columns, filter=expr).to_pandas()
+        return df.drop(columns=['period'], errors='ignore')
+
+    @property
+    def dates(self):
+        return self.manifest['dates']
+
+    @property
+    def version(self):
+        """Changes whenever the history does (cache key for the dashboard)"""
+        return hashlib.sha1(json.dumps(self.manifest, sort_keys=True).encode()).hexdigest()[:16]
+
+    # --- Writing -----------------------------------------------------------
+
+    def append(self, df, crawl_date=None):
+        """Records one crawl's cleaned rows. Re-appending the latest date
+        replaces its events (a re-run of today's crawl); older dates are
+        immutable. Returns {'new', 'changed', 'unchanged', 'removed',
+        'carried'} (see diff_snapshots)."""
+        crawl_date = crawl_date or datetime.date.today().isoformat()
+        dates = self.dates
+        if dates and crawl_date < dates[-1]:
+            raise ValueError(f"History is append-only: {crawl_date} is before the last crawl {dates[-1]}")
+        if dates and crawl_date == dates[-1]:
+            if (self.manifest['compacted_through'] or '') >= crawl_date:
+                raise ValueError(f"Crawl {crawl_date} is already compacted")
+            prev = self.as_of(dates[-2]) if len(dates) > 1 else _empty_state()
+            shutil.rmtree(self.log_dir / f"period={crawl_date}", ignore_errors=True)
+            dates.pop()
+        else:
+            prev = self.current()
+
+        snap = _snapshot(df)
+        events, counts = diff_snapshots(prev, snap, crawl_date)
+        if not events.empty:
+            events['period'] = crawl_date
+            self._write_events(events, self.log_dir, f"part-{uuid.uuid4().hex[:8]}-{{i}}.parquet")
+
+        self._write_state(apply_events(prev, events), self.root / CURRENT_FILE)
+        dates.append(crawl_date)
+        self._write_manifest()
+        return counts
+
+    def compact(self, keep_daily_days=KEEP_DAILY_DAYS):
+        """Merges daily log partitions older than `keep_daily_days` before
+        the latest crawl into one partition per month (one sorted file per
+        category), and checkpoints the state at the last merged date.
+        Returns the number of daily partitions merged."""
+        if not self.dates:
+            return 0
+        cutoff = (datetime.date.fromisoformat(self.dates[-1]) - datetime.timedelta(days=keep_daily_days)).isoformat()
+        daily = sorted(p for p in self.log_dir.glob("period=*")
+                       if len(p.name.split('=', 1)[1]) == 10 and p.name.split('=', 1)[1] < cutoff)
+        if not daily:
+            return 0
+
+        months = sorted({p.name.split('=', 1)[1][:7] for p in daily})
+        staging = self.root / "_staging"
+        shutil.rmtree(staging, ignore_errors=True)
+        dataset = ds.dataset(self.log_dir, format='parquet', partitioning=LOG_PARTITIONING)
+        for month in months:
+            # The month's earlier compacted events plus its old daily partitions
+            periods = [month] + [p.name.split('=', 1)[1] for p in daily if p.name.split('=', 1)[1][:7] == month]
+            events = dataset.to_table(filter=ds.field('period').isin(periods)).to_pandas()
+            events = events.sort_values(['category', 'crawl_date', 'product_key'], kind='stable')
+            events['period'] = month
+            self._write_events(events, staging, "part-{i}.parquet")
+
+        # Swap in: drop the merged partitions, then move the month partitions into place
+        for month in months:
+            shutil.rmtree(self.log_dir / f"period={month}", ignore_errors=True)
+        for path in daily:
+            shutil.rmtree(path)
+        for path in staging.glob("period=*"):
+            path.rename(self.log_dir / path.name)
+        shutil.rmtree(staging, ignore_errors=True)
+
+        through = max(d for d in self.dates if d < cutoff)
+        self._write_state(self.as_of(through), self.checkpoint_dir / f"as_of={through}.parquet")
+        self.manifest['checkpoints'] = sorted({*self.manifest['checkpoints'], through})
+        self.manifest['compacted_through'] = through
+        self._write_manifest()
+        return len(daily)
+
+    # --- Reading -------------------------------------------------------------
+
+    def current(self):
+        path = self.root / CURRENT_FILE
+        return self._read_state(path) if path.exists() else _empty_state()
+
+    def as_of(self, date):
+        """Every listing's last known fields as of crawl `date` (indexed by
+        product_key): the nearest checkpoint plus the log events after it"""
+        if not self.dates or date < self.dates[0]:
+            return _empty_state()
+        if date >= self.dates[-1]:
+            return self.current()
+        base = max((c for c in self.manifest['checkpoints'] if c <= date), default=None)
+        state = self._read_state(self.checkpoint_dir / f"as_of={base}.parquet") if base else _empty_state()
+        return apply_events(state, self._log(after=base, until=date))
+
+    def price_changes(self, category=None, since=None, until=None):
+        """Price changes (not first listings or removals) in crawls from
+        `since` through `until`, newest first: crawl_date, product_key,
+        category, name, old_price, new_price, change_pct"""
+        after = (datetime.date.fromisoformat(since) - datetime.timedelta(days=1)).isoformat() if since else None
+        events = self._log(after, until, [category] if category else None,
+                           columns=['product_key', 'crawl_date', 'changed', 'price', 'prev_price', 'category'])
+        events = events[(events['changed'] & FLAGS['price'] != 0) & (events['changed'] & NEW == 0)]
+        names = self.current()['name']
+        out = pd.DataFrame({
+            'crawl_date': events['crawl_date'],
+            'product_key': events['product_key'],
+            'category': events['category'],
+            'name': events['product_key'].map(names),
+            'old_price': events['prev_price'].astype('float64').round(2),
+            'new_price': events['price'].astype('float64').round(2),
+        })
+        out['change_pct'] = ((out['new_price'] / out['old_price'] - 1) * 100).round(1)
+        return out.sort_values(['crawl_date', 'category'], ascending=[False, True], ignore_index=True)
+
+    def price_trend(self, category=None, since=None):
+        """Per crawl date and category: listed products, average price and
+        number of price changes, replayed forward through the log"""
+        columns = ['crawl_date', 'category', 'products', 'avg_price', 'price_changes']
+        if not self.dates:
+            return pd.DataFrame(columns=columns)
+        # Start from the state just before `since` and replay its events on
+        before = max((d for d in self.dates if since and d < since), default=None)
+        state = self.as_of(before) if before else _empty_state()
+        events = self._log(after=before)
+        by_date = dict(tuple(events.groupby('crawl_date'))) if len(events) else {}
+        rows = []
+        for date in (d for d in self.dates if not since or d >= since):
+            # Dates with no events still get a row: the state carries over
+            ev = by_date.get(date)
+            if ev is not None:
+                state = apply_events(state, ev)
+            view = state if category is None else state[state['category'] == category]
+            stats = view.groupby('category').agg(products=('price', 'size'), avg_price=('price', 'mean'))
+            changes = pd.Series(dtype='int64')
+            if ev is not None:
+                priced = ev[(ev['changed'] & FLAGS['price'] != 0) & (ev['changed'] & NEW == 0)]
+                changes = priced.groupby('category').size()
+            stats['price_changes'] = changes.reindex(stats.index).fillna(0).astype(int)
+            rows.append(stats.reset_index().assign(crawl_date=date))
+        out = pd.concat(rows, ignore_index=True)
+        out['avg_price'] = out['avg_price'].astype('float64').round(2)
+        return out[columns]
+
+
+def update_price_history(clean_root=CLEAN_PARQUET_DIR, root=HISTORY_DIR, keep_daily_days=KEEP_DAILY_DAYS):
+    """Appends every crawl in the cleaned Parquet dataset that the history
+    has not seen (the latest one again if it was re-cleaned), then compacts"""
+    history = PriceHistory(root)
+    last = history.dates[-1] if history.dates else None
+    crawl_dates = sorted(p.name.split('=', 1)[1] for p in Path(clean_root).glob("crawl_date=*") if p.is_dir())
+    for crawl_date in (d for d in crawl_dates if last is None or d >= last):
+        df = read_clean_parquet(clean_root, columns=['name', 'price', 'rating', 'reviews', 'url', 'category'],
+                                crawl_date=crawl_date)
+        counts = history.append(df, crawl_date)
+        print(f"   🕰️ History {crawl_date}: {counts['new']:,} new | {counts['changed']:,} changed | "
+              f"{counts['unchanged']:,} unchanged | {counts['removed']:,} removed | "
+              f"{counts['carried']:,} carried from uncrawled categories")
+    merged = history.compact(keep_daily_days)
+    if merged:
+        print(f"   🗜️ Compacted {merged} daily partitions (through {history.manifest['compacted_through']})")
+    return history
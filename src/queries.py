@@ -0,0 +1,266 @@
+import pandas as pd
+from sqlalchemy import BigInteger, Float, Integer, cast, column, func, or_, select, table
+
+import db
+from filter_engine import FilterEngine, Filters
+
+TABLE_NAME = 'banggood_products'
+
+DETAIL_COLUMNS = ['name', 'price', 'rating', 'reviews', 'category', 'price_category', 'url']
+BOX_QUANTILES = {'min': 0.0, 'q1': 0.25, 'median': 0.5, 'q3': 0.75, 'max': 1.0}
+
+products = table(
+    TABLE_NAME,
+    *(column(c) for c in DETAIL_COLUMNS + ['product_key', 'is_popular']),
+)
+
+
+def _without_category(filters):
+    return filters._replace(category=None) if filters is not None else None
+
+
+def price_box_frame(df):
+    """Five-number price summary per category from rows in memory"""
+    grouped = df.dropna(subset=['price']).groupby('category', observed=True)['price']
+    out = pd.DataFrame({name: grouped.quantile(q, interpolation='lower') for name, q in BOX_QUANTILES.items()})
+    out.insert(0, 'count', grouped.size())
+    return out.reset_index()
+
+
+def _empty_kpis():
+    return {'count': 0, 'avg_price': None, 'avg_rating': None, 'total_reviews': 0}
+
+
+class SqlQueries:
+    """Dashboard aggregates computed in the database.
+
+    Every method takes optional `filters` (filter_engine.Filters: category
+    and price/rating ranges) applied server-side, and returns a small
+    frame/dict, so a page view moves aggregates and one page of rows
+    rather than the whole table.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def _read(self, query):
+        return db.read_sql(query, self.engine)
+
+    @staticmethod
+    def _filtered(query, filters):
+        if filters is None:
+            return query
+        if filters.category is not None:
+            query = query.where(products.c.category == filters.category)
+        if filters.price is not None:
+            query = query.where(products.c.price.between(*filters.price))
+        if filters.rating is not None:
+            query = query.where(products.c.rating.between(*filters.rating))
+        return query
+
+    def categories(self):
+        query = select(products.c.category).distinct().order_by(products.c.category)
+        return self._read(query)['category'].tolist()
+
+    def bounds(self, column):
+        """(min, max) of price or rating, for the range sliders"""
+        col = products.c[column]
+        row = self._read(select(func.min(col).label('lo'), func.max(col).label('hi'))).to_dict('records')[0]
+        return (0.0, 0.0) if pd.isna(row['lo']) else (float(row['lo']), float(row['hi']))
+
+    def kpis(self, filters=None):
+        query = self._filtered(select(
+            func.count().label('count'),
+            func.avg(cast(products.c.price, Float)).label('avg_price'),
+            func.avg(cast(products.c.rating, Float)).label('avg_rating'),
+            func.coalesce(func.sum(cast(products.c.reviews, BigInteger)), 0).label('total_reviews'),
+        ), filters)
+        row = self._read(query).to_dict('records')[0]
+        if not row['count']:
+            return _empty_kpis()
+        return {
+            'count': int(row['count']),
+            'avg_price': float(row['avg_price']),
+            'avg_rating': float(row['avg_rating']),
+            'total_reviews': int(row['total_reviews']),
+        }
+
+    def category_counts(self, filters=None):
+        query = self._filtered(
+            select(products.c.category, func.count().label('count')).group_by(products.c.category),
+            filters,
+        ).order_by(func.count().desc())
+        return self._read(query)
+
+    def category_value(self, filters=None):
+        """Mean price/rating per category and Value Score = rating / price * 10.
+        Compares categories, so only the price/rating ranges apply."""
+        avg_price = func.avg(cast(products.c.price, Float))
+        avg_rating = func.avg(cast(products.c.rating, Float))
+        query = self._filtered(select(
+            products.c.category,
+            avg_price.label('price'),
+            avg_rating.label('rating'),
+        ), _without_category(filters)).group_by(products.c.category).order_by(products.c.category)
+        df = self._read(query)
+        df['Value Score'] = (df['rating'] / df['price']) * 10
+        return df
+
+    def category_stats(self, filters=None):
+        """Per-category count, means, review total and price/rating bounds"""
+        query = self._filtered(select(
+            products.c.category,
+            func.count().label('count'),
+            func.avg(cast(products.c.price, Float)).label('avg_price'),
+            func.avg(cast(products.c.rating, Float)).label('avg_rating'),
+            func.coalesce(func.sum(cast(products.c.reviews, BigInteger)), 0).label('total_reviews'),
+            func.min(products.c.price).label('min_price'),
+            func.max(products.c.price).label('max_price'),
+            func.min(products.c.rating).label('min_rating'),
+            func.max(products.c.rating).label('max_rating'),
+        ), filters).group_by(products.c.category).order_by(products.c.category)
+        return self._read(query)
+
+    def tier_counts(self, filters=None):
+        query = self._filtered(
+            select(products.c.price_category, func.count().label('count')).group_by(products.c.price_category),
+            filters,
+        ).order_by(func.count().desc())
+        return self._read(query)
+
+    def top_reviewed(self, filters=None, n=10):
+        query = self._filtered(select(products.c.name, products.c.reviews, products.c.price, products.c.category),
+                               filters)
+        return self._read(query.order_by(products.c.reviews.desc()).limit(n))
+
+    def price_box(self, filters=None):
+        """Five-number price summary per category (nearest-rank, like
+        Series.quantile(interpolation='lower')). Only the rows at the
+        quantile ranks leave the database."""
+        ranked = self._filtered(select(
+            products.c.category,
+            products.c.price,
+            func.row_number().over(partition_by=products.c.category, order_by=products.c.price).label('rn'),
+            func.count().over(partition_by=products.c.category).label('n'),
+        ).where(products.c.price.is_not(None)), filters).subquery()
+
+        ranks = [cast((ranked.c.n - 1) * q, Integer) + 1 for q in BOX_QUANTILES.values()]
+        query = select(ranked.c.category, ranked.c.price, ranked.c.rn, ranked.c.n).where(
+            or_(*(ranked.c.rn == rank for rank in ranks))
+        )
+        rows = self._read(query)
+
+        out = []
+        for cat, group in rows.groupby('category', sort=True):
+            n = int(group['n'].iloc[0])
+            by_rank = dict(zip(group['rn'], group['price']))
+            summary = {name: by_rank[int((n - 1) * q) + 1] for name, q in BOX_QUANTILES.items()}
+            out.append({'category': cat, 'count': n, **summary})
+        return pd.DataFrame(out, columns=['category', 'count', *BOX_QUANTILES])
+
+    def scatter_sample(self, filters=None, limit=5_000):
+        """Up to `limit` rows for the price/rating scatter. Ordering by the
+        product_key hash gives a stable pseudo-random sample."""
+        query = self._filtered(
+            select(products.c.name, products.c.price, products.c.rating, products.c.reviews, products.c.category),
+            filters,
+        )
+        return self._read(query.order_by(products.c.product_key).limit(limit))
+
+    def page(self, filters=None, after=None, page_size=50):
+        """One page of detail rows, keyset-paginated on product_key.
+        Returns (rows, next_after); next_after is None on the last page."""
+        query = self._filtered(select(*(products.c[c] for c in DETAIL_COLUMNS + ['product_key'])), filters)
+        if after is not None:
+            query = query.where(products.c.product_key > after)
+        rows = self._read(query.order_by(products.c.product_key).limit(page_size + 1))
+        next_after = rows['product_key'].iloc[page_size - 1] if len(rows) > page_size else None
+        return rows.head(page_size).drop(columns='product_key'), next_after
+
+
+class FrameQueries:
+    """Same interface as SqlQueries over an in-memory frame (the offline
+    Parquet/CSV fallback). Selections come from a FilterEngine built once
+    for the frame, and each result is LRU-cached by its filter tuple."""
+
+    def __init__(self, df, cache_size=128):
+        self.df = df
+        self.engine = FilterEngine(df, cache_size)
+
+    def _cached(self, name, filters, compute, *args):
+        filters = filters or Filters()
+        return self.engine.cached((name, filters, *args), lambda: compute(self.engine.frame(filters)))
+
+    def categories(self):
+        return sorted(self.df['category'].dropna().unique().tolist())
+
+    def bounds(self, column):
+        return self.engine.bounds(column)
+
+    def kpis(self, filters=None):
+        def compute(df):
+            if df.empty:
+                return _empty_kpis()
+            return {
+                'count': len(df),
+                'avg_price': float(df['price'].mean()),
+                'avg_rating': float(df['rating'].mean()),
+                'total_reviews': int(df['reviews'].sum()),
+            }
+        return self._cached('kpis', filters, compute)
+
+    def category_counts(self, filters=None):
+        def compute(df):
+            counts = df['category'].value_counts()
+            counts = counts[counts > 0]
+            return pd.DataFrame({'category': counts.index.astype(str), 'count': counts.values})
+        return self._cached('category_counts', filters, compute)
+
+    def category_value(self, filters=None):
+        def compute(df):
+            out = df.groupby('category', observed=True)[['price', 'rating']].mean().reset_index()
+            out['Value Score'] = (out['rating'] / out['price']) * 10
+            return out
+        return self._cached('category_value', _without_category(filters), compute)
+
+    def category_stats(self, filters=None):
+        def compute(df):
+            grouped = df.groupby('category', observed=True)
+            out = pd.DataFrame({
+                'count': grouped.size(),
+                'avg_price': grouped['price'].mean(),
+                'avg_rating': grouped['rating'].mean(),
+                'total_reviews': grouped['reviews'].sum(),
+                'min_price': grouped['price'].min(),
+                'max_price': grouped['price'].max(),
+                'min_rating': grouped['rating'].min(),
+                'max_rating': grouped['rating'].max(),
+            })
+            return out.reset_index().sort_values('category', ignore_index=True)
+        return self._cached('category_stats', filters, compute)
+
+    def tier_counts(self, filters=None):
+        def compute(df):
+            counts = df['price_category'].value_counts()
+            counts = counts[counts > 0]
+            return pd.DataFrame({'price_category': counts.index.astype(str), 'count': counts.values})
+        return self._cached('tier_counts', filters, compute)
+
+    def top_reviewed(self, filters=None, n=10):
+        return self._cached('top_reviewed', filters,
+                            lambda df: df.nlargest(n, 'reviews')[['name', 'reviews', 'price', 'category']], n)
+
+    def price_box(self, filters=None):
+        return self._cached('price_box', filters, price_box_frame)
+
+    def scatter_sample(self, filters=None, limit=5_000):
+        return self._cached('scatter_sample', filters,
+                            lambda df: df.sample(n=limit, random_state=0) if len(df) > limit else df, limit)
+
+    def page(self, filters=None, after=None, page_size=50):
+        """`after` is a row offset here; same (rows, next_after) contract"""
+        df = self.engine.frame(filters)
+        start = after or 0
+        rows = df.iloc[start:start + page_size]
+        next_after = start + page_size if start + page_size < len(df) else None
+        return rows[[c for c in DETAIL_COLUMNS if c in df.columns]], next_after
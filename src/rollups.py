@@ -0,0 +1,241 @@
+import datetime
+import hashlib
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import pandas as pd
+from sqlalchemy import inspect
+
+import db
+from filter_engine import Filters
+from queries import BOX_QUANTILES, FrameQueries, SqlQueries
+from utils.paths import get_data_path
+
+ROLLUP_DIR = Path(get_data_path("rollups"))
+VERSION_FILE = '_version.json'
+SQL_PREFIX = 'rollup_'
+SQL_VERSION_TABLE = 'rollup_version'
+
+ROLLUP_TABLES = ('category_stats', 'price_box', 'tier_counts', 'top_reviewed', 'scatter_sample')
+TOP_N = 10
+SCATTER_POINTS = 5_000
+
+TIER_COLUMNS = ['category', 'price_category', 'count']
+TOP_COLUMNS = ['name', 'reviews', 'price', 'category']
+SCATTER_COLUMNS = ['name', 'price', 'rating', 'reviews', 'category']
+
+
+@dataclass
+class Rollups:
+    """Pre-aggregated summary tables plus the data-version stamp they carry.
+
+    category_stats  per-category count, means, review total, price/rating bounds
+    price_box       per-category five-number price summary
+    tier_counts     rows per price tier within each category
+    top_reviewed    top TOP_N by reviews within each category
+    scatter_sample  up to SCATTER_POINTS price/rating rows per category
+    """
+    tables: dict
+    version: str
+    created_at: str = field(default_factory=lambda: datetime.datetime.now().isoformat(timespec='seconds'))
+
+    def __getitem__(self, name):
+        return self.tables[name]
+
+    @property
+    def rows(self):
+        return int(self.tables['category_stats']['count'].sum())
+
+
+def _version(tables):
+    digest = hashlib.sha1()
+    for name in ROLLUP_TABLES:
+        digest.update(name.encode())
+        digest.update(pd.util.hash_pandas_object(tables[name], index=False).values.tobytes())
+    return digest.hexdigest()[:16]
+
+
+def compute_rollups(queries, top_n=TOP_N, scatter_points=SCATTER_POINTS):
+    """Materializes the rollups through a query layer: SqlQueries to
+    aggregate in the database, FrameQueries for a cleaned frame."""
+    stats = queries.category_stats()
+    per_category = [Filters(category=cat) for cat in stats['category']]
+    top = [queries.top_reviewed(f, top_n) for f in per_category]
+    tiers = [queries.tier_counts(f).assign(category=f.category) for f in per_category]
+    sample = [queries.scatter_sample(f, scatter_points) for f in per_category]
+    tables = {
+        'category_stats': stats,
+        'price_box': queries.price_box(),
+        'tier_counts': _concat(tiers, TIER_COLUMNS),
+        'top_reviewed': _concat(top, TOP_COLUMNS),
+        'scatter_sample': _concat(sample, SCATTER_COLUMNS),
+    }
+    return _make_rollups(tables)
+
+
+def _concat(frames, columns):
+    return pd.concat(frames, ignore_index=True)[columns] if frames else pd.DataFrame(columns=columns)
+
+
+def rollups_from_stats(accumulator):
+    """Rollups from a one-pass sketches.StatsAccumulator (streamed chunks,
+    possibly merged across crawl files or workers)"""
+    return _make_rollups(accumulator.tables())
+
+
+def _make_rollups(tables):
+    for name, df in tables.items():
+        df = df.reset_index(drop=True)
+        if 'category' in df.columns:
+            df['category'] = df['category'].astype(str)
+        tables[name] = df
+    return Rollups(tables, _version(tables))
+
+
+def build_rollups(df, root=ROLLUP_DIR):
+    """Rollups of a cleaned frame, written alongside the cleaned data"""
+    rollups = compute_rollups(FrameQueries(df))
+    write_rollups(rollups, root)
+    print(f"   🧮 Rollups built from {rollups.rows:,} rows (version {rollups.version}): {root}")
+    return rollups
+
+
+def refresh_sql_rollups(engine=None):
+    """Recomputes the rollups from the loaded SQL table, inside the
+    database, and replaces the rollup tables"""
+    engine = engine or db.get_engine()
+    rollups = compute_rollups(SqlQueries(engine))
+    write_rollups_sql(rollups, engine)
+    print(f"   🧮 SQL rollups refreshed from {rollups.rows:,} rows (version {rollups.version})")
+    return rollups
+
+
+# --- Files -------------------------------------------------------------
+
+def write_rollups(rollups, root=ROLLUP_DIR):
+    """One Parquet file per table; the version file is replaced last, so
+    readers keyed on it never see a half-written set."""
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+    for name, df in rollups.tables.items():
+        df.to_parquet(root / f"{name}.parquet", index=False)
+
+    stamp = {'version': rollups.version, 'created_at': rollups.created_at, 'rows': rollups.rows}
+    tmp = root / (VERSION_FILE + '.tmp')
+    tmp.write_text(json.dumps(stamp))
+    tmp.replace(root / VERSION_FILE)
+
+
+def read_version(root=ROLLUP_DIR):
+    path = Path(root) / VERSION_FILE
+    return json.loads(path.read_text())['version'] if path.exists() else None
+
+
+def read_rollups(root=ROLLUP_DIR):
+    root = Path(root)
+    if not (root / VERSION_FILE).exists():
+        return None
+    stamp = json.loads((root / VERSION_FILE).read_text())
+    tables = {name: pd.read_parquet(root / f"{name}.parquet") for name in ROLLUP_TABLES}
+    return Rollups(tables, stamp['version'], stamp['created_at'])
+
+
+# --- SQL ---------------------------------------------------------------
+
+def write_rollups_sql(rollups, engine):
+    """Replaces every rollup table and the version row in one transaction"""
+    stamp = pd.DataFrame([{'version': rollups.version, 'created_at': rollups.created_at, 'rows': rollups.rows}])
+    with engine.begin() as conn:
+        for name, df in rollups.tables.items():
+            df.to_sql(SQL_PREFIX + name, con=conn, if_exists='replace', index=False)
+        stamp.to_sql(SQL_VERSION_TABLE, con=conn, if_exists='replace', index=False)
+
+
+def read_version_sql(engine):
+    if not inspect(engine).has_table(SQL_VERSION_TABLE):
+        return None
+    df = db.read_sql(f"SELECT version FROM {SQL_VERSION_TABLE}", engine)
+    return df['version'].iloc[0] if len(df) else None
+
+
+def read_rollups_sql(engine):
+    stamp = db.read_sql(f"SELECT * FROM {SQL_VERSION_TABLE}", engine).iloc[0]
+    tables = {name: db.read_sql(f"SELECT * FROM {SQL_PREFIX}{name}", engine) for name in ROLLUP_TABLES}
+    return Rollups(tables, stamp['version'], stamp['created_at'])
+
+
+# --- Query interface -----------------------------------------------------
+
+class RollupQueries:
+    """SqlQueries/FrameQueries interface answered from rollups alone.
+
+    Covers the category filter; price/rating ranges need row-level data,
+    so `supports` tells callers when to fall back to a live query layer.
+    """
+
+    def __init__(self, rollups):
+        self.rollups = rollups
+
+    @staticmethod
+    def supports(filters):
+        return filters is None or (filters.price is None and filters.rating is None)
+
+    def _by_category(self, name, filters):
+        df = self.rollups[name]
+        if filters is not None and filters.category is not None:
+            df = df[df['category'] == filters.category]
+        return df.reset_index(drop=True)
+
+    def categories(self):
+        return sorted(self.rollups['category_stats']['category'].tolist())
+
+    def bounds(self, column):
+        stats = self.rollups['category_stats']
+        if stats.empty:
+            return (0.0, 0.0)
+        return float(stats[f'min_{column}'].min()), float(stats[f'max_{column}'].max())
+
+    def kpis(self, filters=None):
+        stats = self._by_category('category_stats', filters)
+        count = int(stats['count'].sum())
+        if not count:
+            return {'count': 0, 'avg_price': None, 'avg_rating': None, 'total_reviews': 0}
+        return {
+            'count': count,
+            'avg_price': float((stats['avg_price'] * stats['count']).sum() / count),
+            'avg_rating': float((stats['avg_rating'] * stats['count']).sum() / count),
+            'total_reviews': int(stats['total_reviews'].sum()),
+        }
+
+    def category_counts(self, filters=None):
+        stats = self._by_category('category_stats', filters)
+        return stats[['category', 'count']].sort_values('count', ascending=False, ignore_index=True)
+
+    def category_value(self, filters=None):
+        stats = self.rollups['category_stats']
+        out = stats[['category']].assign(price=stats['avg_price'], rating=stats['avg_rating'])
+        out['Value Score'] = (out['rating'] / out['price']) * 10
+        return out
+
+    def tier_counts(self, filters=None):
+        tiers = self._by_category('tier_counts', filters)
+        counts = tiers.groupby('price_category', sort=False, dropna=False)['count'].sum()
+        return counts.sort_values(ascending=False).reset_index()
+
+    def top_reviewed(self, filters=None, n=TOP_N):
+        return self._by_category('top_reviewed', filters).nlargest(n, 'reviews')
+
+    def price_box(self, filters=None):
+        return self._by_category('price_box', filters)[['category', 'count', *BOX_QUANTILES]]
+
+    def scatter_sample(self, filters=None, limit=SCATTER_POINTS):
+        """A category's own sample, or across categories a share of each
+        sample proportional to the category's row count"""
+        sample = self._by_category('scatter_sample', filters)
+        counts = self._by_category('category_stats', filters).set_index('category')['count']
+        total = counts.sum()
+        if total <= limit:
+            return sample.head(limit)
+        quota = sample['category'].map(counts * limit // total).fillna(0)
+        return sample[sample.groupby('category', sort=False).cumcount() < quota].reset_index(drop=True)
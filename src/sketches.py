@@ -0,0 +1,270 @@
+import heapq
+import itertools
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from queries import BOX_QUANTILES
+
+
+class KLLSketch:
+    """Mergeable streaming quantile sketch (Karnin-Lang-Liberty).
+
+    Level h holds items of weight 2**h. A level that outgrows its capacity
+    is sorted and every other item (random offset) is promoted, so memory
+    stays O(k log(n/k)) and the rank error is about 1.7/k of n with high
+    probability. Exact (no compaction) until more than k values arrive.
+    """
+
+    def __init__(self, k=1024, seed=0):
+        self.k = k
+        self.rng = np.random.default_rng(seed)
+        self.levels = [np.empty(0)]
+        self.n = 0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def _capacity(self, h):
+        depth = len(self.levels) - h - 1
+        return max(int(np.ceil(self.k * (2 / 3) ** depth)), 2)
+
+    def _compress(self):
+        h = 0
+        while h < len(self.levels):
+            level = self.levels[h]
+            if len(level) > self._capacity(h):
+                if h + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                level = np.sort(level)
+                keep_odd = len(level) % 2
+                leftover, level = level[:keep_odd], level[keep_odd:]
+                promoted = level[self.rng.integers(2)::2]
+                self.levels[h] = leftover
+                self.levels[h + 1] = np.concatenate([self.levels[h + 1], promoted])
+            h += 1
+
+    def update(self, values):
+        values = np.asarray(values, dtype='float64')
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return self
+        self.n += len(values)
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+        return self
+
+    def merge(self, other):
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for h, level in enumerate(other.levels):
+            self.levels[h] = np.concatenate([self.levels[h], level])
+        self.n += other.n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    def quantiles(self, qs):
+        """Nearest-rank quantiles (Series.quantile(interpolation='lower')
+        when exact); min and max are always exact."""
+        if not self.n:
+            return [np.nan] * len(qs)
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level), 2 ** h) for h, level in enumerate(self.levels)])
+        order = np.argsort(values, kind='stable')
+        values, cumulative = values[order], np.cumsum(weights[order])
+        total = cumulative[-1]
+        out = []
+        for q in qs:
+            if q <= 0:
+                out.append(self.min)
+            elif q >= 1:
+                out.append(self.max)
+            else:
+                rank = np.floor(q * (total - 1)) + 1
+                out.append(values[np.searchsorted(cumulative, rank)])
+        return [float(v) for v in out]
+
+
+class TopN:
+    """Bounded min-heap of the n records with the largest `key`"""
+
+    def __init__(self, n=10, key='reviews'):
+        self.n = n
+        self.key = key
+        self.heap = []
+        self._seq = itertools.count()  # tie-breaker: records are never compared
+
+    def _push(self, score, record):
+        item = (score, -next(self._seq), record)
+        if len(self.heap) < self.n:
+            heapq.heappush(self.heap, item)
+        elif item > self.heap[0]:
+            heapq.heapreplace(self.heap, item)
+
+    def update(self, df):
+        # Only a chunk's own top n can enter the heap
+        for record in df.nlargest(self.n, self.key).to_dict('records'):
+            self._push(record[self.key], record)
+        return self
+
+    def merge(self, other):
+        for score, _, record in other.heap:
+            self._push(score, record)
+        return self
+
+    def frame(self, columns):
+        records = [record for _, _, record in sorted(self.heap, reverse=True)]
+        return pd.DataFrame(records, columns=columns)
+
+
+class RunningStats:
+    """Count / sum / min / max of a column, mergeable"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, values):
+        values = pd.Series(values).dropna()
+        if len(values):
+            self.count += len(values)
+            self.total += float(values.sum())
+            self.min = min(self.min, float(values.min()))
+            self.max = max(self.max, float(values.max()))
+        return self
+
+    def merge(self, other):
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else np.nan
+
+
+class _CategorySketch:
+    def __init__(self, k, top_n, max_points, seed):
+        self.rows = 0
+        self.max_points = max_points
+        self.price_quantiles = KLLSketch(k, seed)
+        self.price = RunningStats()
+        self.rating = RunningStats()
+        self.reviews = RunningStats()
+        self.top = TopN(top_n)
+        self.tiers = Counter()
+        self.sample = None
+
+    def update(self, chunk):
+        self.rows += len(chunk)
+        self.price_quantiles.update(chunk['price'])
+        self.price.update(chunk['price'])
+        self.rating.update(chunk['rating'])
+        self.reviews.update(chunk['reviews'])
+        self.top.update(chunk[['name', 'reviews', 'price', 'category']])
+        if 'price_category' in chunk.columns:
+            self.tiers.update(chunk['price_category'].dropna().astype(str).value_counts().to_dict())
+        self._keep_sample(chunk[['name', 'price', 'rating', 'reviews', 'category', '_key']])
+
+    def _keep_sample(self, sampled):
+        if self.sample is not None:
+            sampled = pd.concat([self.sample, sampled], ignore_index=True)
+        self.sample = sampled.nsmallest(self.max_points, '_key')
+
+    def merge(self, other):
+        self.rows += other.rows
+        for name in ('price_quantiles', 'price', 'rating', 'reviews', 'top'):
+            getattr(self, name).merge(getattr(other, name))
+        self.tiers.update(other.tiers)
+        if other.sample is not None:
+            self._keep_sample(other.sample)
+        return self
+
+
+class StatsAccumulator:
+    """One pass over cleaned chunks -> everything the rollups hold.
+
+    Per category: a KLL price sketch (box plots), a top-N heap by reviews,
+    running count/mean/min/max, exact price-tier counts and a bottom-k
+    uniform sample for scatter plots. Memory does not grow with the row
+    count, and accumulators from different crawl files or workers combine
+    with `merge`.
+
+    With seed=None each accumulator draws fresh entropy, so parallel
+    workers sample independently; `seed` records it for reproducing a run.
+    """
+
+    def __init__(self, k=1024, top_n=10, max_points=5_000, seed=None):
+        self.k = k
+        self.top_n = top_n
+        self.max_points = max_points
+        self._seeds = np.random.SeedSequence(seed)
+        self.seed = self._seeds.entropy
+        self.rng = np.random.default_rng(self._seeds.spawn(1)[0])
+        self.categories = {}
+
+    def _sketch(self, cat):
+        if cat not in self.categories:
+            self.categories[cat] = _CategorySketch(self.k, self.top_n, self.max_points, self._seeds.spawn(1)[0])
+        return self.categories[cat]
+
+    def update(self, chunk):
+        chunk = chunk.assign(category=chunk['category'].astype(str), _key=self.rng.random(len(chunk)))
+        for cat, group in chunk.groupby('category', sort=False):
+            self._sketch(cat).update(group)
+        return self
+
+    def merge(self, other):
+        """Folds `other` in; its sketches are copied, never shared"""
+        for cat, sketch in other.categories.items():
+            self._sketch(cat).merge(sketch)
+        return self
+
+    def tables(self):
+        """Rollup tables (see rollups.ROLLUP_TABLES) from the sketches"""
+        names = sorted(self.categories)
+        sketches = [self.categories[cat] for cat in names]
+        stats = pd.DataFrame({
+            'category': names,
+            'count': [s.rows for s in sketches],
+            'avg_price': [s.price.mean for s in sketches],
+            'avg_rating': [s.rating.mean for s in sketches],
+            'total_reviews': [int(s.reviews.total) for s in sketches],
+            'min_price': [s.price.min for s in sketches],
+            'max_price': [s.price.max for s in sketches],
+            'min_rating': [s.rating.min for s in sketches],
+            'max_rating': [s.rating.max for s in sketches],
+        })
+
+        box_rows = []
+        for cat, sketch in zip(names, sketches):
+            if sketch.price_quantiles.n:
+                values = sketch.price_quantiles.quantiles(list(BOX_QUANTILES.values()))
+                box_rows.append({'category': cat, 'count': sketch.price_quantiles.n, **dict(zip(BOX_QUANTILES, values))})
+        box = pd.DataFrame(box_rows, columns=['category', 'count', *BOX_QUANTILES])
+
+        tier_columns = ['category', 'price_category', 'count']
+        tiers = pd.DataFrame([(cat, tier, count) for cat, s in zip(names, sketches)
+                              for tier, count in s.tiers.most_common()], columns=tier_columns)
+        top_columns = ['name', 'reviews', 'price', 'category']
+        top = [s.top.frame(top_columns) for s in sketches]
+        top = pd.concat(top, ignore_index=True) if top else pd.DataFrame(columns=top_columns)
+        sample_columns = ['name', 'price', 'rating', 'reviews', 'category']
+        sample = [s.sample[sample_columns] for s in sketches if s.sample is not None]
+        sample = pd.concat(sample, ignore_index=True) if sample else pd.DataFrame(columns=sample_columns)
+
+        return {
+            'category_stats': stats,
+            'price_box': box,
+            'tier_counts': tiers,
+            'top_reviewed': top,
+            'scatter_sample': sample.reset_index(drop=True),
+        }
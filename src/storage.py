@@ -0,0 +1,128 @@
+import datetime
+import shutil
+import uuid
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from utils.paths import get_data_path
+
+CLEAN_PARQUET_DIR = Path(get_data_path("clean_parquet"))
+
+# Explicit, compact schema for the cleaned dataset. `category` and
+# `crawl_date` are not stored in the files: they are the hive partitions.
+CLEAN_SCHEMA = pa.schema([
+    ('name', pa.string()),
+    ('price', pa.float32()),
+    ('rating', pa.float32()),
+    ('reviews', pa.int32()),
+    ('url', pa.string()),
+    ('price_category', pa.dictionary(pa.int8(), pa.string())),
+    ('is_popular', pa.bool_()),
+])
+
+PARTITIONING = ds.partitioning(
+    pa.schema([('crawl_date', pa.string()), ('category', pa.string())]),
+    flavor='hive',
+)
+
+def _to_table(df):
+    df = df.copy()
+    df['price'] = df['price'].astype('float32')
+    df['rating'] = df['rating'].astype('float32')
+    df['reviews'] = df['reviews'].astype('int32')
+    df['price_category'] = df['price_category'].astype('category')
+    table = pa.Table.from_pandas(df[CLEAN_SCHEMA.names], schema=CLEAN_SCHEMA, preserve_index=False)
+    return table.append_column('category', pa.array(df['category'].astype(str), pa.string()))
+
+def raw_crawl_date(raw_csv_path):
+    """Crawl date of a raw scrape CSV: the day the scraper saved it (its
+    mtime), so re-cleaning an old file never makes a new crawl partition"""
+    return datetime.date.fromtimestamp(Path(raw_csv_path).stat().st_mtime).isoformat()
+
+class CleanParquetWriter:
+    """Writes cleaned frames/chunks as one crawl's partitioned dataset:
+    <root>/crawl_date=YYYY-MM-DD/category=<name>/part-*.parquet
+
+    `crawl_date` is the scrape's date (see raw_crawl_date), not the day
+    of cleaning. Opening the writer replaces any earlier output for the
+    same crawl date.
+    """
+
+    def __init__(self, crawl_date, root=CLEAN_PARQUET_DIR):
+        self.root = Path(root)
+        self.crawl_date = crawl_date
+        self.rows = 0
+        date_dir = self.root / f"crawl_date={self.crawl_date}"
+        if date_dir.exists():
+            shutil.rmtree(date_dir)
+
+    def write(self, df):
+        if df.empty:
+            return
+        table = _to_table(df)
+        table = table.append_column('crawl_date', pa.array([self.crawl_date] * len(table), pa.string()))
+        ds.write_dataset(
+            table,
+            self.root,
+            format='parquet',
+            partitioning=PARTITIONING,
+            basename_template=f"part-{uuid.uuid4().hex[:8]}-{{i}}.parquet",
+            existing_data_behavior='overwrite_or_ignore',
+        )
+        self.rows += len(df)
+
+def write_clean_parquet(df, crawl_date, root=CLEAN_PARQUET_DIR):
+    writer = CleanParquetWriter(crawl_date, root)
+    writer.write(df)
+    print(f"   💾 Saved {writer.rows:,} rows as Parquet: {writer.root} (crawl {writer.crawl_date})")
+    return writer.crawl_date
+
+def _dataset(root):
+    return ds.dataset(root, format='parquet', partitioning=PARTITIONING)
+
+def latest_crawl_date(root=CLEAN_PARQUET_DIR):
+    dates = sorted(p.name.split('=', 1)[1] for p in Path(root).glob("crawl_date=*") if p.is_dir())
+    return dates[-1] if dates else None
+
+def restore_float64(df, columns=('price', 'rating')):
+    """float32 -> float64 by shortest repr, so 27.51 comes back as 27.51
+    rather than 27.510000228881836 (for SQL loads and value comparisons)"""
+    df = df.copy()
+    for column in columns:
+        if column in df.columns and df[column].dtype == 'float32':
+            df[column] = df[column].astype(str).astype('float64')
+    return df
+
+def read_clean_parquet(root=CLEAN_PARQUET_DIR, columns=None, crawl_date='latest', categories=None, filter=None):
+    """Reads the cleaned dataset with column projection and predicate pushdown.
+
+    Only the requested `columns` are decoded. `crawl_date` ('latest' by
+    default, None for every crawl) and `categories` prune whole partition
+    directories before any file is opened; `filter` is an extra
+    pyarrow.dataset expression pushed down to row groups.
+    """
+    root = Path(root)
+    if not root.exists():
+        return pd.DataFrame(columns=columns)
+
+    expr = None
+    if crawl_date == 'latest':
+        crawl_date = latest_crawl_date(root)
+    if crawl_date:
+        expr = ds.field('crawl_date') == crawl_date
+    if categories:
+        cat_expr = ds.field('category').isin(list(categories))
+        expr = cat_expr if expr is None else expr & cat_expr
+    if filter is not None:
+        expr = filter if expr is None else expr & filter
+
+    table = _dataset(root).to_table(columns=columns, filter=expr)
+    df = table.to_pandas()
+    if 'category' in df.columns:
+        df['category'] = df['category'].astype('category')
+    if 'price_category' in df.columns:
+        df['price_category'] = df['price_category'].astype('category')
+    return df
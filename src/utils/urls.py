@@ -0,0 +1,54 @@
+# src/utils/urls.py
+import hashlib
+import re
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+
+def normalize_url(url):
+    """Canonical form of a URL: lowercase scheme/host, sorted query, no fragment"""
+    parts = urlsplit(url.strip())
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    path = parts.path or "/"
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, query, ""))
+
+
+def product_key(url, fallback=None, category=None):
+    """Stable 40-char product key: SHA-1 of the product URL without its
+    query string (tracking params) or fragment. Rows without a URL are
+    keyed on `fallback` (e.g. name + category) instead. With `category`,
+    the key is per listing: a product listed in two categories gets two."""
+    if isinstance(url, str) and url.strip():
+        parts = urlsplit(normalize_url(url))
+        basis = urlunsplit((parts.scheme, parts.netloc, parts.path, "", ""))
+    else:
+        basis = f"nourl:{fallback}"
+    if category is not None:
+        basis += f"|{category}"
+    return hashlib.sha1(basis.encode("utf-8")).hexdigest()
+
+
+# Query params that only track where a click came from; they never change the product
+TRACKING_PARAMS = {'rmmds', 'cur_warehouse', 'from', 'p', 'spm', 'gclid', 'fbclid', 'ref', 'akmclientcountry'}
+TRACKING_PREFIXES = ('utm_',)
+PRODUCT_ID_RE = re.compile(r'-p-(\d+)\.html', re.IGNORECASE)
+
+
+def strip_tracking(url):
+    """normalize_url without tracking params (see TRACKING_PARAMS)"""
+    parts = urlsplit(normalize_url(url))
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+             if k.lower() not in TRACKING_PARAMS and not k.lower().startswith(TRACKING_PREFIXES)]
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), ""))
+
+
+def product_id(url):
+    """Banggood product id from a '...-p-1234567.html' URL, or None"""
+    match = PRODUCT_ID_RE.search(url) if isinstance(url, str) else None
+    return match.group(1) if match else None
+
+
+def product_identity(url):
+    """Dedup key for a product URL: 'p:<product id>' when the URL has one
+    (the slug and query may vary), else 'u:<URL without tracking params>'"""
+    pid = product_id(url)
+    return f"p:{pid}" if pid else f"u:{strip_tracking(url)}"
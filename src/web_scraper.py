@@ -1,34 +1,66 @@
 import time
-import csv
+import argparse
 import sys
 import random
+import re
+from collections import Counter
 from bs4 import BeautifulSoup
 import undetected_chromedriver as uc
 from selenium.webdriver.common.by import By
+import metrics
+from listing_parser import parse_listing
+from browser_pool import RateLimiter
+from checkpoint import CheckpointedWriter
+from dedup import ProductDeduper, delta_path
+from fetchers import FallbackFetcher, HttpFetcher, SeleniumFetcher
+from page_cache import CachingFetcher, PageCache, ReplayFetcher
+from utils.paths import get_data_path
+from work_queue import default_worker_id
 
-def get_driver():
+def get_driver(profile_dir=None):
     """Sets up undetected_chromedriver"""
     options = uc.ChromeOptions()
     options.add_argument("--start-maximized")
     options.add_argument("--disable-popup-blocking")
+    if profile_dir:
+        options.add_argument(f"--user-data-dir={profile_dir}")
     print("   ...Launching Stealth Browser...")
     driver = uc.Chrome(options=options)
     return driver
 
-def discover_categories(driver, limit=10):
+def get_fetcher(backend='auto', workers=1, driver_factory=get_driver, rate_limiter=None, page_timeout=20):
+    """Builds the page fetcher: 'browser', 'http', or 'auto' (HTTP first,
+    browser only for pages that need JavaScript or hit an anti-bot page).
+    Both backends pace their requests through one shared `rate_limiter`."""
+    rate_limiter = rate_limiter or RateLimiter()
+
+    def browser():
+        return SeleniumFetcher(workers, driver_factory, profile_root=get_data_path("browser_profiles"),
+                               rate_limiter=rate_limiter, page_timeout=page_timeout)
+
+    if backend == 'browser':
+        return browser()
+    if backend == 'http':
+        return HttpFetcher(rate_limiter=rate_limiter)
+    if backend == 'auto':
+        return FallbackFetcher(HttpFetcher(rate_limiter=rate_limiter), browser())
+    raise ValueError(f"Unknown fetch backend: {backend}")
+
+def discover_categories(fetcher, limit=10):
    
     print("\n🔍 DISCOVERING CATEGORIES ...")
     
     start_url = "https://www.banggood.com/all-wholesale-products.html?from=nav"
     
     try:
-        driver.get(start_url)
-        time.sleep(5)
+        result = fetcher.fetch_one(start_url, wait='document')
+        if result.error:
+            raise result.error
         
-        soup = BeautifulSoup(driver.page_source, 'lxml')
+        soup = BeautifulSoup(result.page_source, 'lxml')
         all_links = soup.find_all('a', href=True)
         
-        valid_categories = []
+        valid_categories = {}  # insertion-ordered set: O(1) membership per link
 
         for link in all_links:
             href = link['href']
@@ -38,8 +70,9 @@ def discover_categories(driver, limit=10):
                 if not href.startswith("http"):
                     href = "https://www.banggood.com" + href.strip()
                 
-                if ("-c-" in href or "-ca-" in href) and href not in valid_categories:
-                    valid_categories.append(href)
+                if "-c-" in href or "-ca-" in href:
+                    valid_categories.setdefault(href)
+        valid_categories = list(valid_categories)
         
         print(f"   Found {len(valid_categories)} total categories on the sitemap.")
 
@@ -59,110 +92,293 @@ def discover_categories(driver, limit=10):
         print(f"   ❌ Discovery failed: {e}")
         return []
 
-def scrape_and_save(num_pages=2, output_csv='data/banggood_raw_data3.csv'):
+
+def get_category_name(category_url):
+    """Extracts a readable category name from its URL"""
+    try:
+        if '-ca-' in category_url:
+            raw_name = category_url.split('Wholesale-')[1].split('-ca-')[0]
+        elif '-c-' in category_url:
+            raw_name = category_url.split('Wholesale-')[1].split('-c-')[0]
+        else:
+            raw_name = "Unknown"
+        return raw_name.replace('-', ' ')
+    except:
+        return "Category"
+
+def build_page_url(category_url, page):
+    separator = "&" if "?" in category_url else "?"
+    return f"{category_url}{separator}page={page}"
+
+PAGE_URL_RE = re.compile(r"^(.*)[?&]page=(\d+)$")
+
+def split_page_url(url):
+    """Inverse of build_page_url: (category_url, page), or None"""
+    match = PAGE_URL_RE.match(url)
+    if not match:
+        return None
+    return match.group(1), int(match.group(2))
+
+def parse_result(result, category_name):
+    """Records one fetched listing page's metrics and parses it.
+    Returns (ParsedListing, or None if the fetch failed; a short
+    backend/timing note for the page log)"""
+    metrics.observe('scrape_fetch_seconds', result.elapsed, backend=result.backend)
+    if result.error:
+        metrics.inc('scrape_pages_total', status='error', backend=result.backend)
+        return None, None
+
+    with metrics.span('scrape_parse', category=category_name) as span:
+        parsed = parse_listing(result.page_source, category_name)
+        span['rows'] = len(parsed.records)
+    metrics.inc('scrape_pages_total', status='ok', backend=result.backend)
+    metrics.observe('scrape_cards_per_page', len(parsed.records), buckets=metrics.COUNT_BUCKETS)
+    metrics.inc('scrape_parse_failures_total', parsed.malformed_count)
+    if result.ready is not None:
+        metrics.observe('scrape_ready_seconds', result.ready.elapsed, timed_out=result.ready.timed_out)
+        ready = f"{result.backend}, ready in {result.ready.elapsed:.1f}s"
+        ready += " ⏱️ timed out" if result.ready.timed_out else ""
+    else:
+        ready = f"{result.backend}, {result.elapsed:.1f}s"
+    return parsed, ready
+
+def get_page_cache():
+    return PageCache(get_data_path("page_cache"))
+
+def scrape_and_save(num_pages=2, output_csv='data/banggood_raw_data3.csv', workers=1,
+                    categories=None, driver_factory=get_driver, rate_limiter=None, page_timeout=20,
+                    backend='auto', resume=False, use_cache=True, replay=False, dedup='mark'):
+    """Crawls listing pages through the chosen fetch backend.
+
+    Browser fetches run on a pool of `workers` drivers (see get_fetcher).
+
+    `categories` skips sitemap discovery (e.g. to point the crawl at a
+    local server of saved pages); `driver_factory(profile_dir)` builds
+    each worker's driver. `page_timeout` caps how long a single page may
+    take to become ready.
+
+    Records are streamed to disk as each page finishes (see
+    CheckpointedWriter); `resume=True` continues an interrupted run,
+    reusing its categories and skipping pages already on disk.
+
+    Every fetched page is stored in the raw page cache (`use_cache`).
+    `replay=True` re-runs extraction over every cached listing page
+    with no network access at all.
+
+    `dedup` ('mark', 'skip' or None) drops products repeated within the
+    run and checks each one against the persistent index of earlier runs
+    (see dedup.ProductDeduper). `output_csv` is always the full crawl;
+    'skip' also writes the new or changed products to dedup.delta_path.
+    """
     print("--- 1. STARTING DYNAMIC SCRAPER ---")
     
-    driver = get_driver()
-    all_products = []
+    ready_times = []
+    malformed_total = 0
+    completed = False
+    delta_saved = 0
+    writer = CheckpointedWriter(output_csv)
+    deduper = ProductDeduper(mode=dedup) if dedup else None
+    delta = CheckpointedWriter(delta_path(output_csv)) if dedup == 'skip' else None
+    run_info = writer.open(resume=resume)
+    if delta:
+        delta.open(resume=resume)
+    if run_info:
+        categories = run_info['categories']
+        print(f"   ♻️ Resuming: {len(writer.completed)} pages already done.")
+
+    cache = get_page_cache() if (use_cache or replay) else None
+    if replay:
+        cached_pages = [p for p in map(split_page_url, cache.urls(contains="page=")) if p]
+        categories = categories or list(dict.fromkeys(category_url for category_url, _ in cached_pages))
+        fetcher = ReplayFetcher(cache)
+        print(f"   📼 Replay mode: {len(cached_pages)} cached listing pages.")
+    else:
+        fetcher = get_fetcher(backend, workers, driver_factory, rate_limiter, page_timeout)
+        if cache:
+            fetcher = CachingFetcher(fetcher, cache)
 
     try:
         # 1. Discover (Pure Random from Sitemap)
-        categories_to_scrape = discover_categories(driver, limit=10)
+        categories_to_scrape = categories or discover_categories(fetcher, limit=10)
         
         if not categories_to_scrape:
              print("❌ Exiting: No categories found.")
              return
 
-        print(f"   Selected {len(categories_to_scrape)} random targets.")
+        writer.start_run(categories_to_scrape, num_pages)
+        print(f"   Selected {len(categories_to_scrape)} targets (backend: {fetcher.name}).")
 
         # 2. Scrape Loop
-        for category_url in categories_to_scrape:
-            try:
-                # Extract name dynamically from URL
-                if '-ca-' in category_url:
-                    raw_name = category_url.split('Wholesale-')[1].split('-ca-')[0]
-                elif '-c-' in category_url:
-                    raw_name = category_url.split('Wholesale-')[1].split('-c-')[0]
+        if replay:
+            plan = [(c, p) for c, p in cached_pages if c in categories_to_scrape]
+        else:
+            plan = [(c, p) for c in categories_to_scrape for p in range(1, num_pages + 1)]
+
+        pages = {}
+        for category_url, page in plan:
+            if not writer.is_done(category_url, page):
+                pages[build_page_url(category_url, page)] = (category_url, get_category_name(category_url), page)
+
+        for result in fetcher.fetch(pages):
+            category_url, category_name, page = pages[result.url]
+            label = f"   📄 [{category_name}] Page {page}"
+            parsed, ready = parse_result(result, category_name)
+            if parsed is None:
+                print(f"{label} -> Error: {result.error}")
+                continue
+
+            products = parsed.records
+            malformed_total += parsed.malformed_count
+            if result.ready is not None:
+                ready_times.append(result.ready.elapsed)
+
+            statuses = None
+            if deduper:
+                products, changed, statuses = deduper.filter(products)
+                if delta:
+                    # Before the snapshot: a page the main manifest calls done has its delta rows on disk
+                    delta.write_page(category_url, page, changed)
+
+            writer.write_page(category_url, page, products)
+            if not parsed.records:
+                print(f"{label} ⚠️ No items ({ready}).")
+            else:
+                skipped = f", {parsed.malformed_count} malformed" if parsed.malformed_count else ""
+                if statuses:
+                    skipped += ", " + ", ".join(f"{n} {s}" for s, n in sorted(statuses.items()))
+                    print(f"{label} -> Found {len(parsed.records)} items, kept {len(products)} ({ready}{skipped})")
                 else:
-                    raw_name = "Unknown"
-                category_name = raw_name.replace('-', ' ')
-            except:
-                category_name = "Category"
-            
-            print(f"\n📂 Scraping: {category_name}")
-            
-            for page in range(1, num_pages + 1):
-                separator = "&" if "?" in category_url else "?"
-                target_url = f"{category_url}{separator}page={page}"
-                
-                print(f"   📄 Page {page}...", end="", flush=True)
-                
-                try:
-                    driver.get(target_url)
-                    time.sleep(random.uniform(3, 6))
-                    
-                    # Scroll to trigger lazy loading
-                    driver.execute_script("window.scrollTo(0, document.body.scrollHeight / 2);")
-                    time.sleep(1)
-                    driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                    time.sleep(2)
-
-                    soup = BeautifulSoup(driver.page_source, 'lxml')
-                    product_cards = soup.find_all('div', class_='p-wrap')
-                    
-                    if not product_cards:
-                        print(" ⚠️ No items.")
-                        continue
-
-                    count_new = 0
-                    for card in product_cards:
-                        item = {}
-                        try:
-                            title_tag = card.find('a', class_='title')
-                            item['name'] = title_tag.text.strip() if title_tag else None
-                            
-                            price_tag = card.find('span', class_='price')
-                            item['price'] = price_tag.text.strip() if price_tag else None
-                            
-                            item['url'] = title_tag['href'] if title_tag else None
-                            
-                            try: item['rating'] = card.find('span', class_='review-text').text.strip()
-                            except: item['rating'] = "0"
-                            
-                            try: item['reviews'] = card.find('a', class_='review').text.strip()
-                            except: item['reviews'] = "0 reviews"
-
-                            item['category'] = category_name
-                            
-                            if item['name'] and item['price']:
-                                all_products.append(item)
-                                count_new += 1
-                        except:
-                            continue 
-                    print(f" -> Found {count_new} items")
-                    
-                except Exception as e:
-                    print(f" -> Error: {e}")
+                    print(f"{label} -> Found {len(products)} items ({ready}{skipped})")
 
+        completed = True
     except Exception as e:
         print(f"❌ Critical Error: {e}")
     finally:
-        print("🔌 Closing browser...")
-        driver.quit()
-
-    # Save Results
-    if all_products:
-        try:
-            keys = ['name', 'price', 'rating', 'reviews', 'category', 'url']
-            with open(output_csv, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.DictWriter(f, fieldnames=keys, extrasaction='ignore')
-                writer.writeheader()
-                writer.writerows(all_products)
-            print(f"\n✅ DONE! Saved {len(all_products)} products to {output_csv}")
-        except Exception as e:
-            print(f"Error saving CSV: {e}")
+        fetcher.close()
+        if delta:
+            delta.close()
+        writer.close()
+        if cache:
+            if not replay:
+                cache.evict()
+            cache.close()
+
+    if ready_times:
+        avg = sum(ready_times) / len(ready_times)
+        print(f"   ⏱️ Page readiness: avg {avg:.1f}s, max {max(ready_times):.1f}s over {len(ready_times)} browser pages")
+
+    if malformed_total:
+        print(f"   ⚠️ Skipped {malformed_total} malformed product cards")
+
+    # Save Results (keep the checkpoint if any page is still missing)
+    missing = [p for p in pages.values() if not writer.is_done(p[0], p[2])] if completed else True
+    try:
+        if delta:
+            delta_saved = delta.finalize(clear=not missing)
+            if not delta_saved and delta.output_csv.exists():
+                delta.output_csv.unlink()  # last run's delta, not this one's
+        saved = writer.finalize(clear=not missing)
+    except Exception as e:
+        print(f"Error saving CSV: {e}")
+        if deduper:
+            deduper.close()
+        return
+
+    if deduper:
+        # Only now that the output is on disk do this run's products count as seen
+        deduper.commit()
+        print(f"   🧬 Dedup ({deduper.mode}): {deduper.summary()}; {len(deduper.index):,} products indexed")
+        if delta_saved:
+            print(f"   🧬 {delta_saved} new or changed products saved to {delta.output_csv}")
+        deduper.close()
+
+    if saved:
+        print(f"\n✅ DONE! Saved {saved} products to {output_csv}")
     else:
         print("⚠️ No data collected.")
+    if missing:
+        print("   ♻️ Some pages did not finish. Re-run with --resume to continue.")
+
+def scrape_from_queue(queue, worker_id=None, batch=4, workers=1, driver_factory=get_driver, rate_limiter=None,
+                      page_timeout=20, backend='auto', use_cache=True, poll=5):
+    """Scraper worker for a shared work_queue.CrawlQueue.
+
+    Claims `batch` pages at a time, renews their leases while it fetches,
+    and writes each batch's rows to its own part file before marking the
+    pages done, so a page is never done without its rows on disk. Failed
+    fetches go back to the queue (see CrawlQueue.fail). Runs until no page
+    is pending or leased; work_queue.merge_outputs then combines the parts.
+    Start any number of these, on any number of machines.
+    """
+    worker_id = worker_id or default_worker_id()
+    print(f"--- 1. STARTING SCRAPER WORKER {worker_id} ---")
+
+    cache = get_page_cache() if use_cache else None
+    fetcher = get_fetcher(backend, workers, driver_factory, rate_limiter, page_timeout)
+    if cache:
+        fetcher = CachingFetcher(fetcher, cache)
+    counts = Counter()
+
+    try:
+        while True:
+            tasks = queue.claim(worker_id, batch)
+            if not tasks:
+                if not queue.active():
+                    break
+                # Other workers hold the remaining leases; wait for them to finish or expire
+                time.sleep(poll)
+                continue
+
+            pages = {build_page_url(t.category_url, t.page): t for t in tasks}
+            writer = CheckpointedWriter(queue.part_path(worker_id))
+            writer.open()
+            done = {}
+            for result in fetcher.fetch(pages):
+                task = pages[result.url]
+                category_name = get_category_name(task.category_url)
+                label = f"   📄 [{category_name}] Page {task.page}"
+                parsed, ready = parse_result(result, category_name)
+                if parsed is None:
+                    retry = queue.fail(worker_id, task, result.error)
+                    counts['failed'] += 1
+                    print(f"{label} -> Error: {result.error} ({'will retry' if retry else 'dead-lettered'})")
+                else:
+                    writer.write_page(task.category_url, task.page, parsed.records)
+                    done[task] = len(parsed.records)
+                    counts['pages'] += 1
+                    counts['rows'] += len(parsed.records)
+                    print(f"{label} -> Found {len(parsed.records)} items ({ready}, attempt {task.attempts})")
+                queue.renew(worker_id, [t for t in tasks if t not in done])
+
+            saved = writer.finalize()
+            if done:
+                queue.complete(worker_id, done, writer.output_csv if saved else None)
+    except Exception as e:
+        print(f"❌ Critical Error: {e}")
+    finally:
+        fetcher.close()
+        if cache:
+            cache.evict()
+            cache.close()
+
+    print(f"✅ Worker {worker_id} done: {counts['pages']} pages, {counts['rows']} products, "
+          f"{counts['failed']} failed fetches")
+    return counts
 
 if __name__ == "__main__":
-    scrape_and_save(num_pages=1)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Scrape Banggood listing pages to CSV")
+    parser.add_argument("--pages", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--backend", choices=["auto", "http", "browser"], default="auto")
+    parser.add_argument("--output", default=get_data_path("banggood_raw_data3.csv"))
+    parser.add_argument("--resume", action="store_true", help="continue the last interrupted run")
+    parser.add_argument("--replay", action="store_true", help="re-extract from the page cache, no network")
+    parser.add_argument("--no-cache", action="store_true", help="don't store fetched pages in the page cache")
+    parser.add_argument("--dedup", choices=["mark", "skip", "off"], default="mark",
+                        help="skip: also write products new or changed since earlier runs to <output>.delta.csv")
+    args = parser.parse_args()
+
+    scrape_and_save(num_pages=args.pages, output_csv=args.output, workers=args.workers,
+                    backend=args.backend, resume=args.resume, use_cache=not args.no_cache,
+                    replay=args.replay, dedup=None if args.dedup == "off" else args.dedup)
+    metrics.finish()
@@ -0,0 +1,295 @@
+import argparse
+import csv
+import os
+import socket
+import sqlite3
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+import metrics
+from listing_parser import CSV_FIELDS
+from utils.paths import get_data_path
+
+WORK_QUEUE_DB = get_data_path("crawl_queue.sqlite")
+LEASE_SECONDS = 300   # a worker that stops renewing for this long loses its pages
+MAX_ATTEMPTS = 3      # claims per page before it goes to the dead-letter list
+STATUSES = ('pending', 'leased', 'done', 'dead')
+
+
+@dataclass(frozen=True)
+class Task:
+    category_url: str
+    page: int
+    attempts: int = 0
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class CrawlQueue:
+    """Durable queue of (category_url, page) crawl tasks with leases.
+
+    One SQLite file (WAL mode) holds every task's state:
+
+    pending  waiting to be claimed
+    leased   claimed by a worker until `lease_expires`; workers renew the
+             lease while they fetch. An expired lease is up for grabs
+             again, so a crashed or stalled worker's pages get retried.
+    done     its rows are in the part file named by `output`
+    dead     failed (or lost its lease) `max_attempts` times; requeue_dead()
+             puts it back
+
+    Claims run in one IMMEDIATE transaction, so any number of worker
+    processes can share the file. Workers on several machines need it on a
+    filesystem with working locks.
+    """
+
+    def __init__(self, path=WORK_QUEUE_DB, lease_seconds=LEASE_SECONDS, max_attempts=MAX_ATTEMPTS):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.parts_dir = self.path.with_name(self.path.stem + "_parts")
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        # Autocommit; multi-statement changes open their own transaction
+        self.db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS tasks (
+                category_url TEXT NOT NULL,
+                page INTEGER NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                lease_owner TEXT,
+                lease_expires REAL,
+                last_error TEXT,
+                output TEXT,
+                rows INTEGER,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (category_url, page)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks (status, lease_expires);
+        """)
+
+    def _transaction(self, fn):
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            result = fn()
+        except BaseException:
+            self.db.execute("ROLLBACK")
+            raise
+        self.db.execute("COMMIT")
+        return result
+
+    def enqueue(self, categories, num_pages):
+        """Adds pages 1..num_pages of each category; pages already queued
+        (by this or another run) are left as they are. Returns how many
+        were added."""
+        now = time.time()
+        rows = [(c, p, now) for c in categories for p in range(1, num_pages + 1)]
+        def add():
+            before = self.db.total_changes
+            self.db.executemany(
+                "INSERT OR IGNORE INTO tasks (category_url, page, updated_at) VALUES (?, ?, ?)", rows)
+            return self.db.total_changes - before
+        return self._transaction(add)
+
+    def claim(self, worker_id, n=1):
+        """Leases up to `n` claimable tasks (pending, or leased with an
+        expired lease) to `worker_id`. Page 1 of every category comes
+        before any page 2, which spreads a crawl across categories."""
+        def take():
+            now = time.time()
+            # Expired leases that used up their attempts go to the dead-letter list
+            self.db.execute("""
+                UPDATE tasks SET status = 'dead', updated_at = ?,
+                    last_error = 'lease expired (' || lease_owner || ')', lease_owner = NULL
+                WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?
+            """, (now, now, self.max_attempts))
+            rows = self.db.execute("""
+                SELECT category_url, page, attempts FROM tasks
+                WHERE status = 'pending' OR (status = 'leased' AND lease_expires < ?)
+                ORDER BY page, attempts, category_url LIMIT ?
+            """, (now, n)).fetchall()
+            self.db.executemany("""
+                UPDATE tasks SET status = 'leased', lease_owner = ?, lease_expires = ?,
+                    attempts = attempts + 1, updated_at = ?
+                WHERE category_url = ? AND page = ?
+            """, [(worker_id, now + self.lease_seconds, now, c, p) for c, p, _ in rows])
+            return [Task(c, p, attempts + 1) for c, p, attempts in rows]
+        tasks = self._transaction(take)
+        metrics.inc('queue_claims_total', len(tasks))
+        return tasks
+
+    def renew(self, worker_id, tasks):
+        """Extends the worker's leases on `tasks`; returns how many it still holds"""
+        now = time.time()
+        cur = self.db.executemany("""
+            UPDATE tasks SET lease_expires = ?, updated_at = ?
+            WHERE category_url = ? AND page = ? AND status = 'leased' AND lease_owner = ?
+        """, [(now + self.lease_seconds, now, t.category_url, t.page, worker_id) for t in tasks])
+        return cur.rowcount
+
+    def complete(self, worker_id, rows_by_task, output):
+        """Marks tasks done with their rows stored in part file `output`.
+        A task whose lease expired is still accepted unless another worker
+        finished it first (the merge drops repeated rows either way)."""
+        now = time.time()
+        def finish():
+            cur = self.db.executemany("""
+                UPDATE tasks SET status = 'done', output = ?, rows = ?, lease_owner = ?,
+                    lease_expires = NULL, last_error = NULL, updated_at = ?
+                WHERE category_url = ? AND page = ? AND status != 'done'
+            """, [(str(output) if output else None, rows, worker_id, now, t.category_url, t.page)
+                  for t, rows in rows_by_task.items()])
+            return cur.rowcount
+        done = self._transaction(finish)
+        metrics.inc('queue_tasks_total', done, status='done')
+        return done
+
+    def fail(self, worker_id, task, error):
+        """Releases a failed task for a retry, or dead-letters it after
+        max_attempts claims"""
+        now = time.time()
+        self.db.execute("""
+            UPDATE tasks SET status = CASE WHEN attempts >= ? THEN 'dead' ELSE 'pending' END,
+                lease_owner = NULL, lease_expires = NULL, last_error = ?, updated_at = ?
+            WHERE category_url = ? AND page = ? AND status = 'leased' AND lease_owner = ?
+        """, (self.max_attempts, str(error)[:500], now, task.category_url, task.page, worker_id))
+        dead = task.attempts >= self.max_attempts
+        metrics.inc('queue_tasks_total', status='dead' if dead else 'retry')
+        return not dead
+
+    def requeue_dead(self):
+        """Moves every dead-lettered task back to pending with fresh attempts"""
+        cur = self.db.execute("""
+            UPDATE tasks SET status = 'pending', attempts = 0, updated_at = ?
+            WHERE status = 'dead'
+        """, (time.time(),))
+        return cur.rowcount
+
+    def counts(self):
+        counts = dict.fromkeys(STATUSES, 0)
+        counts.update(self.db.execute("SELECT status, COUNT(*) FROM tasks GROUP BY status"))
+        return counts
+
+    def active(self):
+        """True while any task is pending or leased"""
+        counts = self.counts()
+        return counts['pending'] + counts['leased'] > 0
+
+    def dead_letters(self):
+        return self.db.execute("""
+            SELECT category_url, page, attempts, last_error FROM tasks
+            WHERE status = 'dead' ORDER BY category_url, page
+        """).fetchall()
+
+    def outputs(self):
+        """Part files holding done tasks' rows, in completion order"""
+        rows = self.db.execute("""
+            SELECT output FROM tasks WHERE status = 'done' AND output IS NOT NULL
+            GROUP BY output ORDER BY MIN(updated_at)
+        """)
+        return [Path(output) for output, in rows]
+
+    def part_path(self, worker_id):
+        """A new part file name for one batch of `worker_id`'s pages"""
+        self.parts_dir.mkdir(parents=True, exist_ok=True)
+        return self.parts_dir / f"{worker_id}-{time.time_ns()}.csv"
+
+    def close(self):
+        self.db.close()
+
+
+def merge_outputs(queue, output_csv, partial=False):
+    """Merges the part files of every done task into `output_csv`
+    (atomically). Rows repeated across parts, e.g. from a page finished by
+    two workers after a lease expired, are kept once: the last copy of each
+    (category, url) wins, as in CheckpointedWriter.finalize. Refuses while
+    tasks are still pending or leased unless `partial`."""
+    if queue.active() and not partial:
+        raise RuntimeError(f"Crawl still running: {queue.counts()}")
+
+    rows = {}
+    for path in queue.outputs():
+        with open(path, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                key = (row['category'], row['url']) if row['url'] else tuple(row.values())
+                rows[key] = row
+
+    output_csv = Path(output_csv)
+    output_csv.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = output_csv.with_name(output_csv.name + ".tmp")
+    with open(tmp_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_FIELDS, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(rows.values())
+    os.replace(tmp_path, output_csv)
+    return len(rows)
+
+
+def print_status(queue):
+    counts = queue.counts()
+    print(f"📋 Queue {queue.path}: " + " | ".join(f"{counts[s]:,} {s}" for s in STATUSES))
+    for category_url, page, attempts, error in queue.dead_letters():
+        print(f"   ☠️ {category_url} page {page} ({attempts} attempts): {error}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Crawl Banggood listing pages through a shared work queue")
+    parser.add_argument("--queue", default=WORK_QUEUE_DB, help="queue database (shared by every worker)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    enqueue = commands.add_parser("enqueue", help="queue a crawl's pages")
+    enqueue.add_argument("--pages", type=int, default=1)
+    enqueue.add_argument("--categories", default="", help="comma-separated category URLs (default: discover)")
+    enqueue.add_argument("--limit", type=int, default=10, help="categories to pick when discovering")
+    enqueue.add_argument("--backend", choices=["auto", "http", "browser"], default="auto")
+
+    work = commands.add_parser("work", help="claim and scrape pages until the queue is drained")
+    work.add_argument("--id", default=None, help="worker id (default: host-pid)")
+    work.add_argument("--batch", type=int, default=4, help="pages claimed per lease")
+    work.add_argument("--workers", type=int, default=1, help="browser drivers in this process")
+    work.add_argument("--backend", choices=["auto", "http", "browser"], default="auto")
+    work.add_argument("--lease", type=float, default=LEASE_SECONDS, help="lease length in seconds")
+    work.add_argument("--no-cache", action="store_true", help="don't store fetched pages in the page cache")
+
+    merge = commands.add_parser("merge", help="merge the workers' part files into one CSV")
+    merge.add_argument("--output", default=get_data_path("banggood_raw_data3.csv"))
+    merge.add_argument("--partial", action="store_true", help="merge even though pages are still pending")
+
+    commands.add_parser("status", help="task counts and the dead-letter list")
+    commands.add_parser("requeue", help="retry every dead-lettered page")
+    args = parser.parse_args()
+
+    queue = CrawlQueue(args.queue, lease_seconds=getattr(args, 'lease', LEASE_SECONDS))
+    if args.command == "enqueue":
+        categories = [c for c in args.categories.split(",") if c]
+        if not categories:
+            from web_scraper import discover_categories, get_fetcher
+            with get_fetcher(args.backend) as fetcher:
+                categories = discover_categories(fetcher, limit=args.limit)
+        print(f"📥 Queued {queue.enqueue(categories, args.pages):,} new pages "
+              f"({len(categories)} categories x {args.pages} pages).")
+        print_status(queue)
+    elif args.command == "work":
+        from web_scraper import scrape_from_queue
+        scrape_from_queue(queue, worker_id=args.id, batch=args.batch, workers=args.workers,
+                          backend=args.backend, use_cache=not args.no_cache)
+        print_status(queue)
+    elif args.command == "merge":
+        print_status(queue)
+        try:
+            saved = merge_outputs(queue, args.output, partial=args.partial)
+        except RuntimeError as e:
+            print(f"❌ {e}. Wait for the workers, or use --partial.")
+            sys.exit(1)
+        print(f"✅ Merged {saved:,} products from {len(queue.outputs())} part files into {args.output}")
+    elif args.command == "status":
+        print_status(queue)
+    elif args.command == "requeue":
+        print(f"♻️ Requeued {queue.requeue_dead():,} dead-lettered pages.")
+    queue.close()
+    metrics.finish()
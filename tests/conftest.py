@@ -0,0 +1,7 @@
+import os
+import sys
+from pathlib import Path
+
+# The src modules import each other by bare name, as when run as scripts
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+os.environ.setdefault('BANGGOOD_METRICS', '0')
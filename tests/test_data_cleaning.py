@@ -0,0 +1,80 @@
+"""The vectorized cleaning engine must match the original row-wise one."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_cleaning import clean_frame, get_clean_data
+
+
+def raw_frame(price, rating, reviews, name=None):
+    n = len(price)
+    return pd.DataFrame({
+        'name': name if name is not None else [f'Product {i}' for i in range(n)],
+        'price': price,
+        'rating': rating,
+        'reviews': reviews,
+        'category': ['Tops'] * n,
+        'url': [f'https://www.banggood.com/x-p-{i}.html' for i in range(n)],
+    })
+
+
+FIXTURES = {
+    'missing_prices': raw_frame(
+        price=[None, np.nan, '', 'US$12.50', 'abc', '$', 'nan', '  '],
+        rating=['4.5'] * 8,
+        reviews=['3 reviews'] * 8,
+    ),
+    'price_spellings': raw_frame(
+        price=['US$1,299.00', '$5', ' 19.99 ', 'inf', '-3', '1e2', '1_000', 'US$20', '$50.00', '.5'],
+        rating=['4'] * 10,
+        reviews=['1'] * 10,
+    ),
+    'malformed_ratings': raw_frame(
+        price=['$10'] * 9,
+        rating=[None, '', 'x', '4.5 stars', '5', '0', '-1', '4,5', 'nan'],
+        reviews=['2'] * 9,
+    ),
+    'malformed_reviews': raw_frame(
+        price=['$10'] * 10,
+        rating=['4.6'] * 10,
+        reviews=['1,234 reviews', None, '', 'no reviews', '²', '٣ reviews', '12 (34)',
+                 '99999999999999999999', ' 8 ', 'reviews'],
+    ),
+    'missing_names': raw_frame(
+        price=['$10', '$60'],
+        rating=['4.9', '3'],
+        reviews=['7', '0'],
+        name=[None, 'B'],
+    ),
+    'all_prices_missing': raw_frame(price=[None, ''], rating=['4', '5'], reviews=['1', '2']),
+    'numeric_columns': raw_frame(price=[5.0, np.nan, 49.99, 50.0], rating=[4.5, np.nan, 3.0, 5.0],
+                                 reviews=[10, np.nan, 0, 3]),
+    'empty': raw_frame(price=[], rating=[], reviews=[]),
+}
+
+
+@pytest.mark.parametrize('name', FIXTURES)
+def test_engines_agree_on_frames(name):
+    expected = clean_frame(FIXTURES[name].copy(), engine='rowwise')
+    actual = clean_frame(FIXTURES[name].copy(), engine='vectorized')
+    pd.testing.assert_frame_equal(actual, expected)
+
+
+@pytest.mark.parametrize('name', FIXTURES)
+def test_engines_agree_through_csv(name, tmp_path, capsys):
+    csv_path = tmp_path / "raw.csv"
+    FIXTURES[name].to_csv(csv_path, index=False)
+    expected = get_clean_data(csv_path, engine='rowwise')
+    actual = get_clean_data(csv_path, engine='vectorized')
+    pd.testing.assert_frame_equal(actual, expected)
+
+
+def test_missing_prices_are_dropped():
+    df = clean_frame(FIXTURES['missing_prices'].copy())
+    assert df['price'].tolist() == [12.5]
+
+
+def test_empty_frame_keeps_columns():
+    df = clean_frame(FIXTURES['empty'].copy())
+    assert df.empty
+    assert {'price_category', 'is_popular'} <= set(df.columns)
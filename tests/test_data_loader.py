@@ -0,0 +1,67 @@
+"""Incremental loads into a throwaway SQLite database."""
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, text
+
+from data_loader import TABLE_NAME, load_data_to_sql, upsert_to_sql
+
+
+def products(ids, price=10.0):
+    return pd.DataFrame({
+        'name': [f'Product {i}' for i in ids],
+        'price': [price] * len(ids),
+        'rating': [4.5] * len(ids),
+        'reviews': [3] * len(ids),
+        'category': ['Tops'] * len(ids),
+        'url': [f'https://www.banggood.com/x-p-{i}.html?rmmds=category' for i in ids],
+        'price_category': ['Budget'] * len(ids),
+        'is_popular': [True] * len(ids),
+    })
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'products.db'}")
+    yield engine
+    engine.dispose()
+
+
+def row_count(engine):
+    with engine.connect() as conn:
+        return conn.execute(text(f"SELECT COUNT(*) FROM {TABLE_NAME}")).scalar()
+
+
+def test_upsert_counts_inserted_updated_unchanged(engine):
+    first = products(range(10))
+    assert upsert_to_sql(first, engine) == {'inserted': 10, 'updated': 0, 'unchanged': 0}
+
+    second = pd.concat([first, products(range(10, 13))], ignore_index=True)
+    second.loc[[2, 5], 'price'] = 12.5
+    assert upsert_to_sql(second, engine) == {'inserted': 3, 'updated': 2, 'unchanged': 8}
+    assert row_count(engine) == 13
+
+    with engine.connect() as conn:
+        prices = dict(conn.execute(text(f"SELECT name, price FROM {TABLE_NAME}")).all())
+    assert prices['Product 2'] == prices['Product 5'] == 12.5
+    assert prices['Product 3'] == 10.0
+
+
+def test_upsert_keeps_one_row_per_listing(engine):
+    df = pd.concat([products([1]), products([1], price=11.0)], ignore_index=True)
+    df.loc[1, 'reviews'] = 9  # the latest listing has the most reviews
+    other_category = products([1]).assign(category='Hoodies')
+
+    counts = upsert_to_sql(pd.concat([df, other_category], ignore_index=True), engine)
+    assert counts['inserted'] == 2
+    with engine.connect() as conn:
+        rows = conn.execute(text(f"SELECT category, price FROM {TABLE_NAME} ORDER BY category")).all()
+    assert [tuple(r) for r in rows] == [('Hoodies', 10.0), ('Tops', 11.0)]
+
+
+def test_incremental_load_rebuilds_a_replace_mode_table_once(engine, capsys):
+    load_data_to_sql(products(range(5)), mode='replace', engine=engine)
+    assert load_data_to_sql(products(range(6)), mode='incremental', engine=engine) == {
+        'inserted': 6, 'updated': 0, 'unchanged': 0}
+    assert load_data_to_sql(products(range(6)), mode='incremental', engine=engine) == {
+        'inserted': 0, 'updated': 0, 'unchanged': 6}
+    assert row_count(engine) == 6
@@ -0,0 +1,211 @@
+"""Fetchers and the browser pool against pages served from a local http.server."""
+import http.server
+import itertools
+import threading
+import time
+import urllib.request
+from collections import Counter
+from dataclasses import dataclass
+
+import pytest
+
+from browser_pool import BrowserPool, RateLimiter
+from fetchers import HttpFetcher
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    """/page/<n>: listing page; /flaky/<n>: 503 on the first hit, then 200;
+    /down/<n>: always 503; /slow/<n>: listing page after 0.2s; anything
+    else: 404."""
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.hits[self.path] += 1
+            server.arrivals.append(time.monotonic())
+            hits = server.hits[self.path]
+
+        kind = self.path.split('/')[1]
+        if kind == 'slow':
+            time.sleep(0.2)
+        if kind in ('page', 'slow') or (kind == 'flaky' and hits > 1):
+            status, body = 200, f'<div class="p-wrap">{self.path}</div>'
+        elif kind in ('flaky', 'down'):
+            status, body = 503, 'busy'
+        else:
+            status, body = 404, 'not found'
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/html')
+        self.end_headers()
+        self.wfile.write(body.encode())
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    httpd.lock = threading.Lock()
+    httpd.hits = Counter()
+    httpd.arrivals = []
+    httpd.base = f"http://127.0.0.1:{httpd.server_address[1]}"
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def no_pacing():
+    return RateLimiter(global_interval=0, host_interval=0, jitter=0)
+
+
+def fetch_all(fetcher, urls):
+    with fetcher:
+        return {r.url: r for r in fetcher.fetch(urls)}
+
+
+def test_http_fetcher_returns_every_page(server):
+    urls = [f"{server.base}/page/{i}" for i in range(20)]
+    results = fetch_all(HttpFetcher(concurrency=4, rate_limiter=no_pacing()), urls)
+
+    assert set(results) == set(urls)
+    for url, result in results.items():
+        assert result.ok and result.status == 200
+        assert url.split(server.base)[1] in result.page_source
+
+
+def test_http_fetcher_retries_retryable_statuses(server):
+    url = f"{server.base}/flaky/1"
+    result = fetch_all(HttpFetcher(retries=2, backoff=0, rate_limiter=no_pacing()), [url])[url]
+
+    assert result.ok and result.status == 200
+    assert server.hits['/flaky/1'] == 2
+
+
+def test_http_fetcher_gives_up_after_retries(server):
+    url = f"{server.base}/down/1"
+    result = fetch_all(HttpFetcher(retries=2, backoff=0, rate_limiter=no_pacing()), [url])[url]
+
+    assert not result.ok and result.status == 503
+    assert server.hits['/down/1'] == 3
+
+
+def test_http_fetcher_does_not_retry_client_errors(server):
+    url = f"{server.base}/missing"
+    result = fetch_all(HttpFetcher(retries=2, backoff=0, rate_limiter=no_pacing()), [url])[url]
+
+    assert not result.ok and result.status == 404
+    assert server.hits['/missing'] == 1
+
+
+def test_http_fetcher_is_paced_by_rate_limiter(server):
+    interval = 0.2
+    limiter = RateLimiter(global_interval=interval, host_interval=0, jitter=0)
+    urls = [f"{server.base}/page/{i}" for i in range(4)]
+    fetch_all(HttpFetcher(concurrency=4, rate_limiter=limiter), urls)
+
+    gaps = [b - a for a, b in zip(server.arrivals, server.arrivals[1:])]
+    assert len(gaps) == 3
+    assert min(gaps) >= interval * 0.8
+
+
+# --- Browser pool ----------------------------------------------------------
+
+class FakeDriver:
+    """Just enough of a WebDriver for pool tasks: get() over plain HTTP"""
+
+    def __init__(self):
+        self.page_source = None
+
+    def get(self, url):
+        with urllib.request.urlopen(url) as resp:
+            self.page_source = resp.read().decode()
+
+    def quit(self):
+        pass
+
+
+@dataclass
+class LoadTask:
+    url: str
+
+    def __call__(self, driver):
+        driver.get(self.url)
+        return driver.page_source
+
+
+def failing_factory(failures):
+    """Driver factory whose first `failures` launches raise"""
+    launches = itertools.count()
+
+    def factory(profile_dir):
+        if next(launches) < failures:
+            raise RuntimeError("no browser")
+        return FakeDriver()
+    return factory
+
+
+def run_pool(pool, urls):
+    with pool:
+        return list(pool.run([LoadTask(url) for url in urls]))
+
+
+def test_browser_pool_runs_every_task(server):
+    urls = [f"{server.base}/page/{i}" for i in range(12)]
+    results = run_pool(BrowserPool(3, lambda profile_dir: FakeDriver(), rate_limiter=no_pacing()), urls)
+
+    assert sorted(r.task.url for r in results) == sorted(urls)
+    assert all(r.error is None and r.task.url.split(server.base)[1] in r.value for r in results)
+    assert {r.worker_id for r in results} <= {0, 1, 2}
+
+
+def test_browser_pool_reports_task_errors(server):
+    results = run_pool(BrowserPool(2, lambda profile_dir: FakeDriver(), rate_limiter=no_pacing()),
+                       [f"{server.base}/page/1", f"{server.base}/missing"])
+
+    errors = {r.task.url.split(server.base)[1]: r.error for r in results}
+    assert errors['/page/1'] is None
+    assert errors['/missing'] is not None
+
+
+def test_browser_pool_is_paced_by_rate_limiter(server):
+    interval = 0.2
+    limiter = RateLimiter(global_interval=interval, host_interval=0, jitter=0)
+    urls = [f"{server.base}/page/{i}" for i in range(4)]
+    run_pool(BrowserPool(4, lambda profile_dir: FakeDriver(), rate_limiter=limiter), urls)
+
+    gaps = [b - a for a, b in zip(server.arrivals, server.arrivals[1:])]
+    assert len(gaps) == 3
+    assert min(gaps) >= interval * 0.8
+
+
+def test_browser_pool_survives_a_worker_without_browser(server):
+    urls = [f"{server.base}/page/{i}" for i in range(10)]
+    results = run_pool(BrowserPool(2, failing_factory(1), rate_limiter=no_pacing()), urls)
+
+    assert len(results) == len(urls)
+    assert all(r.error is None for r in results)
+
+
+def test_browser_pool_fails_tasks_when_no_browser_launches(server):
+    urls = [f"{server.base}/page/{i}" for i in range(5)]
+    results = run_pool(BrowserPool(2, failing_factory(2), rate_limiter=no_pacing()), urls)
+
+    assert len(results) == len(urls)
+    assert all(str(r.error) == "browser unavailable" for r in results)
+    assert server.hits == Counter()
+
+
+def test_browser_pool_close_skips_tasks_not_started(server):
+    pool = BrowserPool(2, lambda profile_dir: FakeDriver(), rate_limiter=no_pacing())
+    pool.start()
+    results = pool.run([LoadTask(f"{server.base}/slow/{i}") for i in range(40)])
+    next(results)
+
+    start = time.monotonic()
+    pool.close()
+    assert time.monotonic() - start < 1.0
+    assert sum(server.hits.values()) <= 4
@@ -0,0 +1,43 @@
+"""FilterEngine selections must match a plain boolean-mask scan."""
+import numpy as np
+import pandas as pd
+
+from filter_engine import FilterEngine, Filters
+
+
+def scan(df, filters):
+    mask = pd.Series(True, index=df.index)
+    if filters.category is not None:
+        mask &= df['category'] == filters.category
+    for name in ('price', 'rating'):
+        bound = getattr(filters, name)
+        if bound is not None:
+            mask &= df[name].between(*bound)
+    return np.flatnonzero(mask.to_numpy())
+
+
+def test_rows_without_category_never_match_a_category():
+    # The price filter is the most selective here, so the category is
+    # checked through the per-row codes
+    df = pd.DataFrame({
+        'category': ['A'] * 200 + [None] * 5 + ['B'] * 3,
+        'price': [float(i) for i in range(200)] + [5.0] * 5 + [5.0] * 3,
+        'rating': [4.0] * 208,
+    })
+    engine = FilterEngine(df)
+    for category in ('A', 'B'):
+        filters = Filters(category=category, price=(5.0, 5.0))
+        np.testing.assert_array_equal(engine.select(filters), scan(df, filters))
+
+
+def test_selections_match_scan():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        'category': rng.choice(['A', 'B', 'C', None], 2_000),
+        'price': rng.uniform(0, 100, 2_000).round(1),
+        'rating': rng.uniform(0, 5, 2_000).round(1),
+    })
+    engine = FilterEngine(df)
+    for filters in (Filters(), Filters(category='B'), Filters(price=(10, 20)), Filters(rating=(4.5, 5)),
+                    Filters(category='A', price=(0, 90), rating=(1, 2)), Filters(category='missing')):
+        np.testing.assert_array_equal(engine.select(filters), scan(df, filters))
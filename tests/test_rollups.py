@@ -0,0 +1,59 @@
+"""Rollups from the one-pass sketches must match the exact ones."""
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from data_cleaning import clean_frame
+from filter_engine import Filters
+from queries import FrameQueries
+from rollups import RollupQueries, TIER_COLUMNS, compute_rollups, rollups_from_stats
+from sketches import StatsAccumulator
+
+sys.path.append(str(Path(__file__).parent.parent / "benchmarks"))
+from synthetic import make_raw
+
+
+@pytest.fixture(scope='module')
+def cleaned():
+    return clean_frame(make_raw(3_000))
+
+
+def test_sketched_tables_match_exact(cleaned):
+    sketched = rollups_from_stats(StatsAccumulator().update(cleaned))
+    exact = compute_rollups(FrameQueries(cleaned))
+    assert list(exact['tier_counts'].columns) == TIER_COLUMNS
+    for name in ('category_stats', 'price_box', 'tier_counts', 'top_reviewed'):
+        pd.testing.assert_frame_equal(sketched[name], exact[name], check_dtype=False)
+
+
+def test_category_filters_match_live_queries(cleaned):
+    live = FrameQueries(cleaned)
+    rollups = RollupQueries(compute_rollups(live))
+    for category in live.categories():
+        filters = Filters(category=category)
+        pd.testing.assert_frame_equal(
+            rollups.tier_counts(filters).sort_values('price_category', ignore_index=True),
+            live.tier_counts(filters).sort_values('price_category', ignore_index=True),
+            check_dtype=False,
+        )
+        assert len(rollups.scatter_sample(filters)) == len(live.scatter_sample(filters))
+
+
+def test_merged_accumulator_does_not_share_sketches(cleaned):
+    half = len(cleaned) // 2
+    first = StatsAccumulator().update(cleaned.iloc[:half])
+    second = StatsAccumulator().update(cleaned.iloc[half:])
+    merged = StatsAccumulator().merge(first).merge(second)
+    before = merged.tables()['category_stats']
+
+    first.update(cleaned.iloc[:half])
+    pd.testing.assert_frame_equal(merged.tables()['category_stats'], before)
+    assert int(before['count'].sum()) == len(cleaned)
+
+
+def test_accumulators_sample_independently(cleaned):
+    samples = [StatsAccumulator(max_points=20).update(cleaned).tables()['scatter_sample'] for _ in range(2)]
+    assert StatsAccumulator().seed != StatsAccumulator().seed
+    assert set(samples[0]['name']) != set(samples[1]['name'])
@@ -0,0 +1,29 @@
+"""Clean Parquet partitions are dated by the scrape, not by the clean run."""
+import datetime
+import os
+import sys
+import time
+from pathlib import Path
+
+from data_cleaning import get_clean_data
+from storage import latest_crawl_date, raw_crawl_date, read_clean_parquet, write_clean_parquet
+
+sys.path.append(str(Path(__file__).parent.parent / "benchmarks"))
+from synthetic import make_raw
+
+
+def test_recleaning_an_old_crawl_reuses_its_partition(tmp_path, capsys):
+    raw_csv = tmp_path / "raw.csv"
+    make_raw(200).to_csv(raw_csv, index=False)
+    three_days_ago = time.time() - 3 * 86400
+    os.utime(raw_csv, (three_days_ago, three_days_ago))
+    scraped_on = datetime.date.fromtimestamp(three_days_ago).isoformat()
+    root = tmp_path / "clean"
+
+    for _ in range(2):
+        df = get_clean_data(raw_csv)
+        assert write_clean_parquet(df, raw_crawl_date(raw_csv), root) == scraped_on
+
+    assert [p.name for p in root.iterdir()] == [f"crawl_date={scraped_on}"]
+    assert latest_crawl_date(root) == scraped_on
+    assert len(read_clean_parquet(root)) == len(df)